@@ -0,0 +1,3 @@
+"""
+Benchmarks für die Visualisierungs-Pipeline
+"""
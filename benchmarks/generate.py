@@ -0,0 +1,72 @@
+"""
+Generator für synthetische Migrationsdaten
+Erzeugt CSV-Dateien im Format von 'Aussenwanderung_nach_Herkunfts_Ziel-Staat'
+"""
+
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import List, Optional
+
+CONTINENTS = ['Europa', 'Afrika', 'Amerika', 'Asien', 'Australien Ozeanien']
+MISSING_MARKERS = ['-', 'nan', '']
+SOURCE = 'Stadt Konstanz - Eigene Einwohnerfortschreibung'
+
+
+def generate_csv(path: Path, n_countries: int = 55, n_years: int = 14, n_continents: int = 5,
+                 missing_rate: float = 0.02, first_year: int = 2010, seed: Optional[int] = 0) -> Path:
+    """
+    Schreibt eine synthetische Migrations-CSV
+
+    Args:
+        path: Zieldatei
+        n_countries: Anzahl Länderspalten (zusätzlich 'sonstige_staaten' und 'unbekannt_ohne_angaben')
+        n_years: Anzahl Jahre (jeweils eine Zeile Zuzug und Wegzug, neueste zuerst)
+        n_continents: Anzahl verschiedener Kontinente in der Zeile 'Kontinent'
+        missing_rate: Anteil der Zellen mit Fehlwert-Markierung ('-', 'nan' oder leer)
+        first_year: erstes Jahr der Reihe
+        seed: Startwert des Zufallsgenerators
+
+    Returns:
+        Pfad der geschriebenen Datei
+    """
+    rng = np.random.default_rng(seed)
+    continents = (CONTINENTS * (n_continents // len(CONTINENTS) + 1))[:n_continents]
+
+    countries = [f"{100 + i}_land_{i}" for i in range(n_countries)]
+    header = ['herkunftsgebiet_wegzugsgebiet'] + countries + ['sonstige_staaten', 'unbekannt_ohne_angaben', 'quelle']
+    continent_row = ['Kontinent'] + [continents[i % n_continents] for i in range(n_countries)] + ['.', '.', SOURCE]
+
+    # Grundniveau je Land (log-normal, wenige große Herkunftsgebiete)
+    base = rng.lognormal(mean=2.5, sigma=1.3, size=n_countries + 2)
+
+    lines: List[str] = [';'.join(header), ';'.join(continent_row)]
+    for year in range(first_year + n_years - 1, first_year - 1, -1):
+        for direction in ('Zuzug', 'Wegzug'):
+            values = rng.poisson(base).astype(str).astype(object)
+            missing = rng.random(values.size) < missing_rate
+            values[missing] = rng.choice(MISSING_MARKERS, size=int(missing.sum()))
+            lines.append(';'.join([f'{year}_ {direction}'] + values.tolist() + [SOURCE]))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetische Migrations-CSV erzeugen")
+    parser.add_argument('path', type=Path, help="Zieldatei")
+    parser.add_argument('--countries', type=int, default=55)
+    parser.add_argument('--years', type=int, default=14)
+    parser.add_argument('--continents', type=int, default=5)
+    parser.add_argument('--missing-rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generate_csv(args.path, args.countries, args.years, args.continents, args.missing_rate, seed=args.seed)
+    print(args.path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Lasttest der JSON-Schnittstelle (src/api.py)
+Mehrere Threads senden Anfragen über Keep-Alive-Verbindungen; gemeldet werden Durchsatz und Latenzen
+
+Aufruf:
+    python -m benchmarks.load_test                          # startet den Server im Prozess
+    python -m benchmarks.load_test --url http://127.0.0.1:8502 --clients 32 --requests 500
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from src import DEFAULT_SOURCE
+from src.api import make_server
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent / 'output'
+
+PATHS = [
+    '/api/version',
+    '/api/totals',
+    '/api/saldo',
+    '/api/countries',
+    '/api/top?year={last}&direction=Zuzug&n=10',
+    '/api/top?year={last}&direction=Wegzug&n=10',
+    '/api/range?from={first}&to={last}&n=10',
+]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(url: str, clients: int, requests: int, conditional: bool) -> Dict:
+    """
+    Führt den Lasttest gegen eine laufende Schnittstelle aus
+
+    Args:
+        clients: Anzahl paralleler Threads (je eine Verbindung)
+        requests: Anfragen pro Thread
+        conditional: If-None-Match mitsenden (prüft den 304-Pfad)
+    """
+    target = urlsplit(url)
+    probe = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+    probe.request('GET', '/api/version')
+    years = json.loads(probe.getresponse().read())['years']
+    probe.close()
+    paths = [path.format(first=years[0], last=years[-1]) for path in PATHS]
+
+    latencies: List[float] = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def client(offset: int):
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+        etags = {}
+        own_latencies, own_statuses = [], Counter()
+        for i in range(requests):
+            path = paths[(offset + i) % len(paths)]
+            headers = {'If-None-Match': etags[path]} if conditional and path in etags else {}
+            start = time.perf_counter()
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            own_latencies.append(time.perf_counter() - start)
+            own_statuses[response.status] += 1
+            if response.getheader('ETag'):
+                etags[path] = response.getheader('ETag')
+        connection.close()
+        with lock:
+            latencies.extend(own_latencies)
+            statuses.update(own_statuses)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'url': url,
+        'clients': clients,
+        'requests': len(latencies),
+        'conditional': conditional,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 3),
+            'p50': round(_percentile(latencies, 0.50) * 1000, 3),
+            'p95': round(_percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(_percentile(latencies, 0.99) * 1000, 3),
+            'max': round(max(latencies) * 1000, 3),
+        },
+        'statuses': dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest der JSON-Schnittstelle")
+    parser.add_argument('--url', default=None, help="laufende Schnittstelle; ohne Angabe wird ein Server gestartet")
+    parser.add_argument('--source', type=Path, default=DEFAULT_SOURCE, help="CSV für den eingebauten Server")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help="Anfragen pro Client")
+    parser.add_argument('--conditional', action='store_true', help="If-None-Match senden (304-Antworten)")
+    parser.add_argument('--output', type=Path, default=None, help="Ziel-JSON (Standard: output/load_test_<zeit>.json)")
+    args = parser.parse_args()
+
+    server: Optional[object] = None
+    url = args.url
+    if url is None:
+        server = make_server(args.source, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        report = run(url, args.clients, args.requests, args.conditional)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    latency = report['latency_ms']
+    print(f"{report['requests']} Anfragen in {report['seconds']} s: {report['throughput_rps']} Anfragen/s, "
+          f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, Status {report['statuses']}")
+    output = args.output or OUTPUT_DIR / f"load_test_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"Ergebnisse geschrieben: {output}")
+
+
+if __name__ == '__main__':
+    main()
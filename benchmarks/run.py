@@ -0,0 +1,139 @@
+"""
+Benchmark der Visualisierungs-Pipeline auf synthetischen Daten
+Misst Laufzeit und Speicherspitze je Stufe über mehrere Datengrößen und schreibt JSON nach output/
+
+Aufruf:
+    python -m benchmarks.run
+    python -m benchmarks.run --countries 55 500 2000 --years 14 100 --repeat 5
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from benchmarks.generate import generate_csv
+from src.figures import payload_bytes
+from src.rankings import RANKING_CRITERIA, chart_cache, rank_countries, ranking_cache
+from src.storage import load_cube
+from src.visualizer import DataVisualizer
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent / 'output'
+
+
+def _clear_caches():
+    """Leert die prozessweiten Caches, damit jede Messung die volle Berechnung enthält"""
+    ranking_cache.clear()
+    chart_cache.clear()
+
+
+def _measure(func: Callable, repeat: int) -> Dict[str, float]:
+    """Laufzeit (Median/Minimum über repeat Läufe) und Speicherspitze (eigener Lauf mit tracemalloc)"""
+    timings = []
+    for _ in range(repeat):
+        _clear_caches()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    _clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'peak_mb': peak / (1024 * 1024),
+    }
+
+
+def run_case(path: Path, repeat: int) -> Tuple[Dict[str, Dict[str, float]], List[int]]:
+    """Misst alle Stufen für eine Datei, dazu die Payload-Größe der Grafiken in Bytes"""
+    cube = load_cube(path, processed_dir=None)
+    # Rohes DataFrame wie in der App vor dem Schema-Parser: der Konstruktor erkennt das Layout und baut den Würfel
+    frame = pd.read_csv(path, sep=';')
+    _clear_caches()
+    visualizer = DataVisualizer.from_cube(cube)
+    figures, years = visualizer.plot_migration_data()
+    last_year = years[-1]
+
+    def serialize():
+        for fig in figures:
+            fig.to_json()
+
+    stages = {
+        'load_data': _measure(lambda: load_cube(path, processed_dir=None), repeat),
+        'DataVisualizer.__init__': _measure(lambda: DataVisualizer(frame), repeat),
+        'plot_migration_data': _measure(lambda: DataVisualizer.from_cube(cube).plot_migration_data(), repeat),
+        'plot_top_countries_by_year': _measure(
+            lambda: DataVisualizer.from_cube(cube).plot_top_countries_by_year(last_year), repeat
+        ),
+        'figure_serialization': _measure(serialize, repeat),
+        'rank_countries': _measure(
+            lambda: [rank_countries(cube, 5, criterion) for criterion in RANKING_CRITERIA], repeat
+        ),
+    }
+    return stages, [payload_bytes(fig) for fig in figures]
+
+
+def run(countries: List[int], years: List[int], missing_rate: float, repeat: int) -> Dict:
+    """Führt alle Kombinationen aus Länder- und Jahresanzahl aus"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_years in years:
+            for n_countries in countries:
+                path = generate_csv(Path(tmp) / f'bench_{n_countries}x{n_years}.csv',
+                                    n_countries=n_countries, n_years=n_years, missing_rate=missing_rate)
+                stages, payloads = run_case(path, repeat)
+                results.append({
+                    'countries': n_countries,
+                    'years': n_years,
+                    'cells': (n_countries + 2) * n_years * 2,
+                    'file_bytes': path.stat().st_size,
+                    'stages': stages,
+                    'payload_bytes': payloads,
+                })
+                print(f"{n_countries:>6} Länder × {n_years:>4} Jahre: " + ', '.join(
+                    f"{name} {stage['median_s'] * 1000:.1f} ms" for name, stage in stages.items()
+                ))
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'missing_rate': missing_rate,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Visualisierungs-Pipeline")
+    parser.add_argument('--countries', type=int, nargs='+', default=[55, 500, 2000])
+    parser.add_argument('--years', type=int, nargs='+', default=[14, 100])
+    parser.add_argument('--missing-rate', type=float, default=0.02)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=Path, default=None, help="Ziel-JSON (Standard: output/benchmark_<zeit>.json)")
+    args = parser.parse_args()
+
+    report = run(args.countries, args.years, args.missing_rate, args.repeat)
+    output = args.output or OUTPUT_DIR / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"Ergebnisse geschrieben: {output}")
+
+
+if __name__ == '__main__':
+    main()
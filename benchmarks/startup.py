@@ -0,0 +1,124 @@
+"""
+Kaltstart-Messung: Importzeit und Zeit bis zur ersten Grafik
+Jeder Lauf startet einen frischen Python-Prozess (wie ein neuer Container) und misst die Phasen
+in der Reihenfolge der App: Streamlit (Seitengerüst), Datenmodule, Daten laden, erste Grafik
+
+Aufruf:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 10 --cold
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src import DEFAULT_SOURCE
+
+ROOT = Path(__file__).resolve().parent.parent
+OUTPUT_DIR = ROOT / 'output'
+
+# Läuft im Kindprozess; gibt die Phasendauern in ms als JSON aus
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+phases = {}
+def mark(name):
+    global start
+    now = time.perf_counter()
+    phases[name] = (now - start) * 1000
+    start = now
+import streamlit
+mark('import_streamlit')
+from src.storage import load_cube
+from src.visualizer import DataVisualizer
+mark('import_modules')
+from pathlib import Path
+kwargs = {'processed_dir': Path(sys.argv[2])} if len(sys.argv) > 2 else {}
+cube = load_cube(sys.argv[1], **kwargs)
+mark('load_data')
+DataVisualizer.from_cube(cube).plot_totals().to_json()
+mark('first_chart')
+print(json.dumps(phases))
+'''
+
+
+def _probe(source: Path, processed_dir: Optional[Path]) -> Dict[str, float]:
+    args = [sys.executable, '-c', PROBE, str(source)] + ([str(processed_dir)] if processed_dir else [])
+    result = subprocess.run(args, cwd=ROOT, capture_output=True, text=True, check=True)
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    phases['time_to_first_chart'] = sum(phases.values())
+    return phases
+
+
+def import_profile(limit: int = 10) -> List[Dict[str, object]]:
+    """Teuerste Pakete beim Import der Datenmodule (kumuliert, aus python -X importtime)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.visualizer, src.storage'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        # Pakete (ohne Punkt im Namen) auf jeder Ebene; verschachtelte Pakete sind in ihren Eltern enthalten
+        name = parts[2].strip()
+        if '.' not in name:
+            packages[name] = max(packages.get(name, 0.0), int(parts[1]) / 1000)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{'module': name, 'cumulative_ms': round(ms, 1)} for name, ms in ranked]
+
+
+def run(source: Path, repeat: int, cold: bool) -> Dict:
+    """
+    Misst repeat frische Prozesse
+
+    Args:
+        cold: ohne geparsten Cache (jeder Lauf liest die CSV über einen leeren data/processed-Ersatz)
+    """
+    runs = []
+    for _ in range(repeat):
+        if cold:
+            with tempfile.TemporaryDirectory() as tmp:
+                runs.append(_probe(source, Path(tmp)))
+        else:
+            runs.append(_probe(source, None))
+    phases = {name: round(statistics.median(run[name] for run in runs), 1) for name in runs[0]}
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'source': str(source),
+        'cold_cache': cold,
+        'repeat': repeat,
+        'median_ms': phases,
+        'runs': runs,
+        'imports': import_profile(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importzeit und Zeit bis zur ersten Grafik in frischen Prozessen")
+    parser.add_argument('--source', type=Path, default=DEFAULT_SOURCE, help="CSV-Datei")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cold', action='store_true', help="ohne geparsten Cache in data/processed")
+    parser.add_argument('--output', type=Path, default=None, help="Ziel-JSON (Standard: output/startup_<zeit>.json)")
+    args = parser.parse_args()
+
+    report = run(args.source, args.repeat, args.cold)
+    print(', '.join(f"{name} {value:.0f} ms" for name, value in report['median_ms'].items()))
+    output = args.output or OUTPUT_DIR / f"startup_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"Ergebnisse geschrieben: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,11 @@ Konstanz Open Data Explorer
 Prototyp eines Werkzeugs zur Analyse und Strukturierung offener Statistikdaten der Stadt Konstanz
 """
 
-__version__ = "0.1.0"
-
+from pathlib import Path
 
+__version__ = "0.1.0"
 
+# Mitgelieferter Datensatz, Standardquelle von App, API und Benchmarks (hier, damit ein Import
+# des Pfads keine Datenmodule lädt)
+DEFAULT_SOURCE = Path(__file__).resolve().parent.parent / 'data' / 'raw' / \
+    'Aussenwanderung_nach_Herkunfts_Ziel-Staat_2010-2023_0_0.csv'
@@ -0,0 +1,284 @@
+"""
+Erkennung des Tabellenlayouts aus Kopfzeile und ersten Zeilen
+Registrierte Adapter prüfen eine kleine Stichprobe vom Dateianfang (keine vollständige Datei)
+und liefern das MigrationSchema, mit dem der gemeinsame Parser (src.schema) die Datei liest
+
+Abgedeckte Layouts: breite Tabellen mit Schlüsselzeilen '<Jahr>_ <Richtung>', optionaler
+Metadatenzeile 'Kontinent' und optionaler Quellspalte (meist am Ende)
+
+Aufruf:
+    python -m src.adapters data/raw/            # Layout aller CSVs eines Verzeichnisses
+"""
+
+import argparse
+import csv
+import io
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.cube import CONTINENT_KEY, DIRECTIONS, KEY_COL, KEY_PATTERN, MISSING_MARKERS, SOURCE_COL
+from src.schema import MigrationSchema
+
+logger = logging.getLogger(__name__)
+
+# Stichprobe vom Dateianfang: SNIFF_LINES Zeilen nach der Kopfzeile, blockweise gelesen und
+# höchstens SNIFF_MAX_BYTES (sehr breite Tabellen haben Zeilen von mehreren 100 KB)
+SNIFF_LINES = 20
+SNIFF_BLOCK = 64 * 1024
+SNIFF_MAX_BYTES = 16 * 1024 * 1024
+
+DELIMITERS = (';', ',', '\t')
+
+# utf-8-sig liest Dateien mit und ohne BOM; cp1252 für Exporte aus Excel
+ENCODINGS = ('utf-8-sig', 'cp1252')
+
+# Mindestanteil Zahlen bzw. Fehlwert-Markierungen in den Wertzellen der Schlüsselzeilen
+MIN_NUMERIC_SHARE = 0.9
+
+# Schreibweisen der Richtungen in anderen Tabellen des Portals
+DIRECTION_NAMES = {
+    'Zuzug': 'Zuzug', 'Zuzüge': 'Zuzug', 'Zuzuege': 'Zuzug',
+    'Wegzug': 'Wegzug', 'Wegzüge': 'Wegzug', 'Wegzuege': 'Wegzug',
+    'Fortzug': 'Wegzug', 'Fortzüge': 'Wegzug', 'Fortzuege': 'Wegzug',
+}
+
+# Namen einer Quellspalte (Groß-/Kleinschreibung egal)
+SOURCE_NAMES = (SOURCE_COL, 'quellen', 'source', 'datenquelle')
+
+# Zahlen je Dezimaltrennzeichen; mit Dezimalkomma sind Punkte nur als Tausendertrennzeichen ('1.234,5') gültig
+_NUMBER = {
+    ',': re.compile(r'^[+-]?(\d+|\d{1,3}(\.\d{3})+)(,\d+)?$'),
+    '.': re.compile(r'^[+-]?\d+(\.\d+)?$'),
+}
+
+
+class Sample:
+    """
+    Stichprobe vom Dateianfang: Kopfzeile und erste Zeilen als Zellen
+
+    Args:
+        header: Spaltennamen
+        rows: erste Zeilen (höchstens SNIFF_LINES)
+        delimiter: erkanntes Spaltentrennzeichen
+        encoding: Zeichenkodierung, mit der die Stichprobe lesbar war
+    """
+
+    def __init__(self, header: List[str], rows: List[List[str]], delimiter: str = ';', encoding: str = 'utf-8'):
+        self.header = header
+        self.rows = rows
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+    @classmethod
+    def from_file(cls, path: Path, max_lines: int = SNIFF_LINES, max_bytes: int = SNIFF_MAX_BYTES) -> 'Sample':
+        """
+        Liest Kopfzeile und max_lines Zeilen vom Dateianfang (eine unvollständige letzte Zeile wird verworfen)
+
+        Raises:
+            ValueError: wenn die Kopfzeile länger als max_bytes ist oder die Stichprobe in keiner
+                Kodierung aus ENCODINGS lesbar ist
+        """
+        data = bytearray()
+        complete = False
+        with open(path, 'rb') as f:
+            while data.count(b'\n') <= max_lines and len(data) < max_bytes:
+                block = f.read(SNIFF_BLOCK)
+                if not block:
+                    complete = True
+                    break
+                data += block
+        if not complete:
+            end = data.rfind(b'\n')
+            if end < 0:
+                raise ValueError(f"Kopfzeile länger als {max_bytes // 2**20} MB")
+            del data[end + 1:]
+        data = bytes(data)
+        for encoding in ENCODINGS:
+            try:
+                text = data.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError(f"Zeichenkodierung nicht erkannt (versucht: {', '.join(ENCODINGS)})")
+
+        first_line = text.split('\n', 1)[0]
+        delimiter = max(DELIMITERS, key=first_line.count)
+        lines = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+        header = lines[0] if lines else []
+        return cls(header, lines[1:max_lines + 1], delimiter, encoding)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, max_lines: int = SNIFF_LINES) -> 'Sample':
+        """
+        Stichprobe eines bereits eingelesenen DataFrames (erste Zeilen als Text)
+
+        Bereits als Zahl gelesene Zellen werden mit Dezimalkomma geschrieben, wie in der
+        Semikolon-CSV, für die die Stichprobe geprüft wird (sonst gälte 12.5 als Tausenderpunkt).
+        """
+        head = df.head(max_lines)
+        rows = [
+            ['' if pd.isna(cell) else str(cell).replace('.', ',') if isinstance(cell, (float, np.floating)) else str(cell)
+             for cell in row]
+            for row in head.astype(object).values.tolist()
+        ]
+        return cls([str(col) for col in df.columns], rows)
+
+
+class DatasetAdapter:
+    """
+    Layout mit Schlüsselzeilen '<Jahr>_ <Richtung>' in einer Schlüsselspalte und einer Spalte pro Gebiet
+
+    Args:
+        name: Name im Register
+        description: Beschreibung für Meldungen und die Übersicht
+        key: Name der Schlüsselspalte; None = erste Spalte, deren Werte in der Stichprobe
+            als Schlüssel erkannt werden
+        key_pattern: Regex der Schlüssel (Gruppen year und direction); None = aus directions gebildet
+        directions: Richtungsbezeichnungen der Datei -> Eintrag aus DIRECTIONS
+        metadata_key: Schlüssel der Metadatenzeile mit den Kontinenten
+    """
+
+    def __init__(self, name: str, description: str, key: Optional[str] = None,
+                 key_pattern: Optional[str] = None, directions: Optional[Dict[str, str]] = None,
+                 metadata_key: str = CONTINENT_KEY):
+        self.name = name
+        self.description = description
+        self.key = key
+        self.directions = directions
+        if key_pattern is None:
+            names = '|'.join(re.escape(label) for label in sorted(directions or DIRECTIONS, key=len, reverse=True))
+            key_pattern = rf'^\s*(?P<year>\d{{4}})\s*_?\s*(?P<direction>{names})\s*$'
+        self.key_pattern = key_pattern
+        self.metadata_key = metadata_key
+        self._key_regex = re.compile(key_pattern)
+
+    def _key_column(self, sample: Sample) -> int:
+        if self.key is not None:
+            if self.key not in sample.header:
+                raise ValueError(f"Spalte '{self.key}' fehlt")
+            return sample.header.index(self.key)
+        for pos in range(len(sample.header)):
+            if any(pos < len(row) and self._key_regex.match(row[pos]) for row in sample.rows):
+                return pos
+        raise ValueError("keine Spalte mit Schlüsseln '<Jahr>_ <Richtung>'")
+
+    def match(self, sample: Sample) -> MigrationSchema:
+        """
+        Prüft die Stichprobe und liefert das Schema zum Einlesen der ganzen Datei
+
+        Raises:
+            ValueError: mit dem Grund, wenn das Layout nicht passt
+        """
+        key_pos = self._key_column(sample)
+        key_rows = [row for row in sample.rows if key_pos < len(row) and self._key_regex.match(row[key_pos])]
+        if not key_rows:
+            raise ValueError(f"keine Schlüsselzeilen in den ersten {len(sample.rows)} Zeilen")
+
+        sources = [pos for pos, name in enumerate(sample.header) if name.lower() in SOURCE_NAMES]
+        value_columns = [pos for pos in range(len(sample.header)) if pos != key_pos and pos not in sources]
+        if not value_columns:
+            raise ValueError("keine Wertspalten")
+        # Kommagetrennte Dateien können kein Dezimalkomma ohne Anführungszeichen haben
+        decimal = '.' if sample.delimiter == ',' else ','
+        cells = [row[pos].strip() for row in key_rows for pos in value_columns if pos < len(row)]
+        numbers = [cell for cell in cells if _NUMBER[decimal].match(cell)]
+        numeric = len(numbers) + sum(cell in MISSING_MARKERS for cell in cells)
+        if cells and numeric / len(cells) < MIN_NUMERIC_SHARE:
+            raise ValueError(f"nur {numeric} von {len(cells)} Wertzellen der Schlüsselzeilen sind Zahlen")
+        grouped = decimal == ',' and any('.' in cell for cell in numbers)
+
+        return MigrationSchema(
+            key=sample.header[key_pos],
+            source=sample.header[sources[-1]] if sources else SOURCE_COL,
+            key_pattern=self.key_pattern,
+            metadata_key=self.metadata_key,
+            directions=self.directions,
+            decimal=decimal,
+            thousands='.' if grouped else None,
+            delimiter=sample.delimiter,
+            encoding=sample.encoding,
+        )
+
+
+# Registrierte Adapter in Prüfreihenfolge (spezifische zuerst)
+ADAPTERS: List[DatasetAdapter] = []
+
+
+def register(adapter: DatasetAdapter, first: bool = False) -> DatasetAdapter:
+    """Nimmt einen Adapter ins Register auf (first: vor allen bisherigen prüfen)"""
+    if any(existing.name == adapter.name for existing in ADAPTERS):
+        raise ValueError(f"Adapter '{adapter.name}' ist bereits registriert")
+    ADAPTERS.insert(0 if first else len(ADAPTERS), adapter)
+    return adapter
+
+
+register(DatasetAdapter(
+    'aussenwanderung', "Außenwanderung nach Herkunfts-/Zielstaat",
+    key=KEY_COL, key_pattern=KEY_PATTERN,
+))
+register(DatasetAdapter(
+    'jahr_richtung', "Breite Tabelle mit Schlüsselzeilen '<Jahr>_ Zuzug/Wegzug' (auch Zuzüge/Fortzüge)",
+    directions=DIRECTION_NAMES,
+))
+
+
+def detect_sample(sample: Sample, adapters: Optional[Sequence[DatasetAdapter]] = None) -> Tuple[DatasetAdapter, MigrationSchema]:
+    """
+    Erster passender Adapter für eine Stichprobe
+
+    Raises:
+        ValueError: wenn kein Adapter passt (mit den Gründen aller Adapter)
+    """
+    reasons = []
+    for adapter in ADAPTERS if adapters is None else adapters:
+        try:
+            return adapter, adapter.match(sample)
+        except ValueError as e:
+            reasons.append(f"{adapter.name}: {e}")
+    raise ValueError(f"Kein passendes Layout ({'; '.join(reasons) or 'keine Adapter registriert'})")
+
+
+def detect(path: Path, adapters: Optional[Sequence[DatasetAdapter]] = None) -> Tuple[DatasetAdapter, MigrationSchema]:
+    """
+    Erkennt das Layout einer Datei aus den ersten SNIFF_BYTES
+
+    Raises:
+        ValueError: wenn die Datei nicht lesbar ist oder kein Adapter passt
+    """
+    try:
+        sample = Sample.from_file(path)
+    except OSError as e:
+        raise ValueError(f"Datei nicht lesbar: {e}") from None
+    return detect_sample(sample, adapters)
+
+
+def detect_schema(path: Path) -> MigrationSchema:
+    """Schema des erkannten Layouts (für src.storage)"""
+    return detect(path)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Layout von CSV-Dateien erkennen")
+    parser.add_argument('paths', type=Path, nargs='+', help="CSV-Dateien oder Verzeichnisse")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        files.extend(sorted(path.glob('*.csv')) if path.is_dir() else [path])
+    for path in files:
+        try:
+            adapter, schema = detect(path)
+            print(f"{path.name}: {adapter.name} (Schlüssel '{schema.key}', Trennzeichen {schema.delimiter!r}, "
+                  f"{schema.encoding})")
+        except ValueError as e:
+            print(f"{path.name}: nicht unterstützt - {e}")
+
+
+if __name__ == '__main__':
+    main()
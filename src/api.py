@@ -0,0 +1,320 @@
+"""
+JSON-Schnittstelle über die geparsten Migrationsdaten
+Kleiner HTTP-Dienst (Standardbibliothek) für andere Dashboards; Antworten werden pro
+Datensatz-Version gecacht und mit ETag ausgeliefert
+
+Aufruf:
+    python -m src.api
+    python -m src.api --source data/raw/<datei>.csv --port 8502
+
+Endpunkte (alle GET):
+    /api/version                              Datensatz-Version, Jahre, Anzahl Spalten
+    /api/totals                               Zuzug, Wegzug und Saldo je Jahr
+    /api/saldo                                Saldo je Jahr
+    /api/countries                            Länder-Dimension: Spalte, Code, Anzeigename, Kontinent
+    /api/countries/<spalte oder code>         Zeitreihe eines Landes ('121_albanien' oder '121')
+    /api/top?year=2023&direction=Zuzug&n=10   Top-N eines Jahres (optional continent=)
+    /api/range?from=2019&to=2021&n=10         Summen, Jahresmittel und Top-N über einen Zeitraum
+    /api/insights                             automatisch berechnete Erkenntnisse (src/insights.py)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+import logging
+
+import numpy as np
+
+from src import DEFAULT_SOURCE
+from src.cache import LRUCache
+from src.cube import DIRECTIONS
+from src.rankings import warm_rankings
+from src.storage import load_cube
+from src.visualizer import DataVisualizer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8502
+
+# Quelldatei wird höchstens so oft auf Änderungen geprüft
+RELOAD_CHECK_S = 5.0
+
+# Fertige Antworten, Schlüssel: (Datensatz-Version, Pfad, sortierte Parameter)
+response_cache = LRUCache(maxsize=1024, name='api')
+
+
+class ApiError(Exception):
+    """Fehler mit HTTP-Status (400 bei ungültigen Parametern, 404 bei unbekannten Pfaden/Jahren)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _clean(value):
+    """JSON-taugliche Werte: NumPy-Typen auspacken, NaN als null"""
+    if isinstance(value, dict):
+        return {key: _clean(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class DataStore:
+    """
+    Hält den Visualizer der aktuellen Datensatz-Version
+
+    Die Quelldatei wird bei Anfragen höchstens alle RELOAD_CHECK_S Sekunden auf Änderungen
+    geprüft; beim Neuladen ändert sich der Fingerprint und damit jeder Cache-Schlüssel.
+    """
+
+    def __init__(self, source: Path):
+        self.source = Path(source)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self.visualizer: Optional[DataVisualizer] = None
+        self._load()
+
+    def _load(self):
+        mtime = os.stat(self.source).st_mtime_ns
+        visualizer = DataVisualizer.from_cube(load_cube(self.source))
+        # Gemeinsame Tabellen vorab, damit parallele Anfragen nur noch lesen
+        visualizer.totals_table()
+        visualizer.range_index()
+        warm_rankings(visualizer.cube, visualizer.top_n)
+        self.visualizer, self._mtime = visualizer, mtime
+        logger.info(f"Datensatz geladen: {self.source.name}, Version {visualizer.cube.fingerprint}")
+
+    def current(self) -> DataVisualizer:
+        now = time.monotonic()
+        if now - self._checked > RELOAD_CHECK_S:
+            with self._lock:
+                if now - self._checked > RELOAD_CHECK_S:
+                    self._checked = now
+                    try:
+                        if os.stat(self.source).st_mtime_ns != self._mtime:
+                            self._load()
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Neuladen fehlgeschlagen, behalte alte Version: {e}")
+        return self.visualizer
+
+
+def _int_param(params: Dict[str, str], name: str, default: Optional[int] = None) -> int:
+    if name not in params:
+        if default is None:
+            raise ApiError(400, f"Parameter '{name}' fehlt")
+        return default
+    try:
+        return int(params[name])
+    except ValueError:
+        raise ApiError(400, f"Parameter '{name}' muss eine ganze Zahl sein") from None
+
+
+def _records(table) -> list:
+    return table.to_dict(orient='records') if table is not None else []
+
+
+def version(visualizer: DataVisualizer, params: Dict[str, str]) -> dict:
+    cube = visualizer.cube
+    return {'version': cube.fingerprint, 'years': cube.years, 'columns': len(cube.countries)}
+
+
+def totals(visualizer: DataVisualizer, params: Dict[str, str]) -> list:
+    return _records(visualizer.totals_table())
+
+
+def saldo(visualizer: DataVisualizer, params: Dict[str, str]) -> list:
+    return _records(visualizer.totals_table()[['Jahr', 'Saldo']])
+
+
+def countries(visualizer: DataVisualizer, params: Dict[str, str]) -> list:
+    table = visualizer.cube.country_table
+    return [
+        {'id': column, 'code': int(code) if code >= 0 else None, 'name': name, 'continent': table.continent(pos)}
+        for pos, (column, code, name) in enumerate(zip(table.columns, table.codes, table.names))
+    ]
+
+
+def country_series(visualizer: DataVisualizer, params: Dict[str, str], column: str) -> dict:
+    cube = visualizer.cube
+    try:
+        pos = cube.country_table.id(column)
+    except KeyError:
+        raise ApiError(404, f"Unbekannte Spalte '{column}'") from None
+    zuzug, wegzug = cube.values[:, 0, pos], cube.values[:, 1, pos]
+    return {
+        'id': cube.countries[pos],
+        'name': cube.country_table.names[pos],
+        'Jahr': cube.years,
+        'Zuzug': zuzug.tolist(),
+        'Wegzug': wegzug.tolist(),
+        'Saldo': (zuzug - wegzug).tolist(),
+    }
+
+
+def top(visualizer: DataVisualizer, params: Dict[str, str]) -> dict:
+    year = _int_param(params, 'year')
+    direction = params.get('direction', 'Zuzug')
+    if direction not in DIRECTIONS:
+        raise ApiError(400, f"direction muss eine von {list(DIRECTIONS)} sein")
+    n = _int_param(params, 'n', visualizer.top_n)
+    continent = params.get('continent') or None
+    try:
+        table = visualizer.top_countries_table(year, direction, n, continent)
+    except ValueError as e:
+        raise ApiError(400, str(e)) from None
+    if table is None:
+        raise ApiError(404, f"Keine Daten für {year} {direction}")
+    return {'year': year, 'direction': direction,
+            'countries': [{'name': name, 'value': value} for name, value in table.itertuples(index=False)]}
+
+
+def year_range(visualizer: DataVisualizer, params: Dict[str, str]) -> dict:
+    years = visualizer.available_years()
+    if not years:
+        raise ApiError(404, "Keine Jahresdaten im Datensatz")
+    year_from = _int_param(params, 'from', years[0])
+    year_to = _int_param(params, 'to', years[-1])
+    if year_from > year_to:
+        raise ApiError(400, f"Ungültiger Zeitraum: {year_from} > {year_to}")
+    n = _int_param(params, 'n', visualizer.top_n)
+    result = {'from': year_from, 'to': year_to, **visualizer.range_summary(year_from, year_to)}
+    for direction in DIRECTIONS + ('Saldo',):
+        table = visualizer.top_countries_range_table(year_from, year_to, direction, n)
+        result[f'top_{direction.lower()}'] = [
+            {'name': name, 'value': value} for name, value in table.itertuples(index=False)
+        ]
+    return result
+
+
+def insights(visualizer: DataVisualizer, params: Dict[str, str]) -> list:
+    return visualizer.insights()
+
+
+ROUTES: Dict[str, Callable] = {
+    '/api/version': version,
+    '/api/totals': totals,
+    '/api/saldo': saldo,
+    '/api/countries': countries,
+    '/api/top': top,
+    '/api/range': year_range,
+    '/api/insights': insights,
+}
+
+
+def _route(path: str) -> Tuple[Callable, tuple]:
+    if path in ROUTES:
+        return ROUTES[path], ()
+    prefix = '/api/countries/'
+    if path.startswith(prefix) and len(path) > len(prefix):
+        return country_series, (path[len(prefix):],)
+    raise ApiError(404, f"Unbekannter Pfad '{path}'")
+
+
+def _error(e: ApiError) -> Tuple[int, Dict[str, str], bytes]:
+    return e.status, {'Content-Type': 'application/json'}, \
+        json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8')
+
+
+def respond(store: DataStore, target: str, if_none_match: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Beantwortet eine Anfrage (ohne HTTP-Schicht, auch für Tests und den Lasttest nutzbar)
+
+    Das ETag hängt nur von Datensatz-Version, Pfad und Parametern ab; bedingte Anfragen
+    an bekannte Pfade werden daher ohne Berechnung mit 304 beantwortet.
+
+    Returns:
+        (Status, Header, Inhalt)
+    """
+    url = urlsplit(target)
+    params = dict(parse_qsl(url.query))
+    try:
+        handler, args = _route(url.path)
+    except ApiError as e:
+        return _error(e)
+    visualizer = store.current()
+    fingerprint = visualizer.cube.fingerprint
+    key = (fingerprint, url.path, tuple(sorted(params.items())))
+    etag = f'"{fingerprint}-{hashlib.sha1(repr(key[1:]).encode("utf-8")).hexdigest()[:12]}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return 304, headers, b''
+
+    body = response_cache.get(key)
+    if body is None:
+        try:
+            payload = handler(visualizer, params, *args)
+        except ApiError as e:
+            return _error(e)
+        body = json.dumps(_clean(payload), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        response_cache.put(key, body)
+    return 200, {**headers, 'Content-Type': 'application/json; charset=utf-8'}, body
+
+
+def make_handler(store: DataStore):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-Alive für wiederholte Anfragen
+        # Header und Inhalt werden getrennt geschrieben; ohne TCP_NODELAY warten sie auf das verzögerte ACK
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            try:
+                status, headers, body = respond(store, self.path, self.headers.get('If-None-Match'))
+            except Exception as e:
+                logger.exception(f"Fehler bei {self.path}")
+                status, headers, body = 500, {'Content-Type': 'application/json'}, \
+                    json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+def make_server(source: Path = DEFAULT_SOURCE, host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Erstellt den Server (ein Thread pro Verbindung); port=0 wählt einen freien Port"""
+    server = ThreadingHTTPServer((host, port), make_handler(DataStore(source)))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON-Schnittstelle über die Migrationsdaten")
+    parser.add_argument('--source', type=Path, default=DEFAULT_SOURCE, help="Pfad zur CSV-Datei")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(args.source, args.host, args.port)
+    print(f"JSON-API auf http://{args.host}:{server.server_port}/api/version")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
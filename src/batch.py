@@ -0,0 +1,281 @@
+"""
+Stapelverarbeitung aller Migrations-CSVs in data/raw/
+Jeder Datensatz wird in einem eigenen Prozess geparst, aggregiert und gerendert (Grafikseiten,
+Tabellen, Erkenntnisse) und nach output/<datensatz>/ geschrieben; Fehler bleiben auf ihren
+Datensatz beschränkt
+
+Aufruf:
+    python -m src.batch
+    python -m src.batch --raw-dir data/raw --output output --workers 8
+    python -m src.batch --compare-serial      # zusätzlich seriell messen und Speedup ausgeben
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+from src.adapters import detect
+from src.cube import DIRECTIONS
+from src.export import write_table
+from src.static_site import PLOTLY_JS, render_year, write_index, write_overview
+from src.storage import PROCESSED_DIR, load_cube
+from src.visualizer import DataVisualizer
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+RAW_DIR = ROOT / 'data' / 'raw'
+OUTPUT_DIR = ROOT / 'output'
+REPORT_NAME = 'batch_report.json'
+
+# Seiten eines Datensatzes liegen in output/<datensatz>/, plotly.js einmal in output/
+SHARED_PLOTLY_JS = f"../{PLOTLY_JS}"
+
+# Ergebnis eines Datensatzes: Name, Status ('ok', 'failed', 'skipped'), Dauer, Dateien, Fehler
+Result = Dict[str, object]
+
+
+def check_source(path: Path) -> Optional[str]:
+    """
+    Prüft über Kopfzeile und erste Zeilen (src.adapters), ob eine CSV ein unterstütztes Layout hat
+
+    Returns:
+        None, wenn die Datei verarbeitet werden kann, sonst der Grund
+    """
+    try:
+        detect(path)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def discover(raw_dir: Path = RAW_DIR) -> Dict[Path, Optional[str]]:
+    """
+    Alle CSVs eines Verzeichnisses (sortiert) mit dem Ergebnis von check_source
+
+    Returns:
+        Pfad -> None (verarbeitbar) oder Grund, warum die Datei übersprungen wird
+    """
+    return {path: check_source(path) for path in sorted(Path(raw_dir).glob('*.csv'))}
+
+
+def _write_tables(visualizer: DataVisualizer, table_dir: Path) -> List[Path]:
+    """Schreibt die Tabellen hinter den Grafiken als CSV"""
+    table_dir.mkdir(parents=True, exist_ok=True)
+    tables = {
+        'totals': visualizer.totals_table(),
+        'top_dynamics': visualizer.top_dynamics_table(),
+        'continents': visualizer.continent_table(),
+        # Länder-Dimension (ID, Code, Spalte, Name, Kontinent) für Verknüpfungen mit anderen Datensätzen
+        'countries': visualizer.cube.country_table.to_frame(),
+    }
+    # Top-N aller vollständigen Jahre in Langform: Jahr, Richtung, Rang, Land, Wert
+    rows = []
+    for year in visualizer.index.complete_years():
+        for direction in DIRECTIONS:
+            table = visualizer.top_countries_table(year, direction)
+            rows.extend((year, direction, rank, land, value)
+                        for rank, (land, value) in enumerate(table.itertuples(index=False), start=1))
+    if rows:
+        tables['top_countries'] = pd.DataFrame(rows, columns=['Jahr', 'Richtung', 'Rang', 'Land', 'Wert'])
+
+    written = []
+    for name, table in tables.items():
+        if table is None:
+            continue
+        path = table_dir / f"{name}.csv"
+        with open(path, 'wb') as f:
+            write_table(table, 'csv', f)
+        written.append(path)
+    return written
+
+
+def render_dataset(source: Path, output_root: Path = OUTPUT_DIR, top_n: int = 10,
+                   processed_dir: Optional[Path] = PROCESSED_DIR) -> Result:
+    """
+    Verarbeitet einen Datensatz vollständig (läuft im Worker-Prozess)
+
+    Schreibt nach output_root/<datensatz>/: index.html, die Übersichtsgrafiken, eine Seite pro
+    Jahr, tables/*.csv und insights.json. Die Seiten verweisen auf output_root/plotly.min.js.
+
+    Args:
+        processed_dir: Cache der geparsten Daten, None parst die CSV immer neu
+    """
+    start = time.perf_counter()
+    source = Path(source)
+    cube = load_cube(source, processed_dir)
+    output_dir = output_root / source.stem
+    output_dir.mkdir(parents=True, exist_ok=True)
+    visualizer = DataVisualizer.from_cube(cube, top_n=top_n)
+    charts = write_overview(visualizer, output_dir, SHARED_PLOTLY_JS)
+    years = cube.index.complete_years()
+    for year in years:
+        render_year(year, output_dir, visualizer, SHARED_PLOTLY_JS)
+    write_index(output_dir, charts, years, title=source.stem, plotly_js=SHARED_PLOTLY_JS)
+
+    written = [output_dir / f"{name}.html" for name in charts] + \
+        [output_dir / f"jahr_{year}.html" for year in years] + [output_dir / 'index.html']
+    written += _write_tables(visualizer, output_dir / 'tables')
+    insights_path = output_dir / 'insights.json'
+    insights_path.write_text(json.dumps(visualizer.insights(), ensure_ascii=False, indent=2), encoding='utf-8')
+    written.append(insights_path)
+
+    return {
+        'dataset': source.stem,
+        'status': 'ok',
+        'seconds': round(time.perf_counter() - start, 3),
+        'years': len(cube.years),
+        'columns': len(cube.countries),
+        'files': len(written),
+    }
+
+
+def _safe_render(source: Path, output_root: Path, top_n: int, processed_dir: Optional[Path]) -> Result:
+    """render_dataset mit Fehlerbericht statt Ausnahme (Ausnahmen sind nicht immer picklebar)"""
+    start = time.perf_counter()
+    try:
+        return render_dataset(source, output_root, top_n, processed_dir)
+    except Exception as e:
+        return {
+            'dataset': Path(source).stem,
+            'status': 'failed',
+            'seconds': round(time.perf_counter() - start, 3),
+            'error': f"{type(e).__name__}: {e}",
+            'traceback': traceback.format_exc(),
+        }
+
+
+def _progress(done: int, total: int, result: Result):
+    if result['status'] == 'ok':
+        logger.info(f"[{done}/{total}] {result['dataset']}: {result['files']} Dateien ({result['seconds']:.1f} s)")
+    else:
+        logger.error(f"[{done}/{total}] {result['dataset']}: fehlgeschlagen - {result['error']}")
+
+
+def run_batch(sources: List[Path], output_root: Path = OUTPUT_DIR, workers: Optional[int] = None,
+              top_n: int = 10, processed_dir: Optional[Path] = PROCESSED_DIR) -> Dict[str, object]:
+    """
+    Verarbeitet alle Datensätze in einem Prozesspool
+
+    Auch mit einem Prozess rendert nicht der aufrufende Prozess selbst: so ist der serielle Lauf
+    mit dem parallelen vergleichbar (gleicher Start, keine geerbten Caches), und ein Fehler
+    (auch ein abgestürzter Worker) betrifft nur seinen Datensatz. Die Ergebnisse stehen in der
+    Reihenfolge von sources.
+
+    Args:
+        workers: Anzahl Prozesse (Standard: Anzahl CPU-Kerne, höchstens Anzahl Datensätze)
+
+    Returns:
+        Bericht mit Wall-Clock-Zeit, Summe der Einzelzeiten und Ergebnis je Datensatz
+    """
+    sources = [Path(source) for source in sources]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(sources) or 1))
+    output_root.mkdir(parents=True, exist_ok=True)
+    (output_root / PLOTLY_JS).write_text(get_plotlyjs(), encoding='utf-8')
+
+    start = time.perf_counter()
+    results: Dict[Path, Result] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_safe_render, source, output_root, top_n, processed_dir): source
+            for source in sources
+        }
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                results[source] = future.result()
+            except Exception as e:  # z.B. BrokenProcessPool nach einem abgestürzten Worker
+                results[source] = {'dataset': source.stem, 'status': 'failed', 'seconds': None,
+                                   'error': f"{type(e).__name__}: {e}"}
+            _progress(len(results), len(sources), results[source])
+    wall = time.perf_counter() - start
+
+    ordered = [results[source] for source in sources]
+    busy = sum(result['seconds'] or 0.0 for result in ordered)
+    return {
+        'workers': workers,
+        'wall_seconds': round(wall, 3),
+        # Summe der Einzelzeiten ≈ Dauer eines seriellen Laufs; busy / wall = Auslastung des Pools
+        'busy_seconds': round(busy, 3),
+        'ok': sum(result['status'] == 'ok' for result in ordered),
+        'failed': sum(result['status'] == 'failed' for result in ordered),
+        'datasets': ordered,
+    }
+
+
+def compare_serial(sources: List[Path], workers: Optional[int] = None, top_n: int = 10) -> Dict[str, object]:
+    """
+    Misst denselben Stapel mit einem Prozess und mit workers Prozessen (in temporäre Verzeichnisse)
+
+    Beide Läufe parsen die CSVs ohne den Cache in data/processed, damit keiner vom anderen profitiert.
+
+    Returns:
+        Wall-Clock-Zeiten beider Läufe und Speedup (seriell / parallel)
+    """
+    timings = {}
+    for label, count in (('serial', 1), ('parallel', workers)):
+        tmp = Path(tempfile.mkdtemp(prefix=f'batch_{label}_'))
+        try:
+            report = run_batch(sources, tmp, count, top_n, processed_dir=None)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        timings[label] = report['wall_seconds']
+        timings[f'{label}_workers'] = report['workers']
+    timings['speedup'] = round(timings['serial'] / timings['parallel'], 2) if timings['parallel'] else None
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alle Migrations-CSVs parallel verarbeiten und rendern")
+    parser.add_argument('--raw-dir', type=Path, default=RAW_DIR, help="Quellverzeichnis (Standard: data/raw)")
+    parser.add_argument('--output', type=Path, default=OUTPUT_DIR, help="Zielverzeichnis (Standard: output)")
+    parser.add_argument('--workers', type=int, default=None, help="Anzahl Prozesse (Standard: CPU-Kerne)")
+    parser.add_argument('--top-n', type=int, default=10, help="Anzahl Länder in Top-N-Grafiken und -Tabellen")
+    parser.add_argument('--compare-serial', action='store_true',
+                        help="zusätzlich seriell und parallel ohne Cache messen und den Speedup ausgeben")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    found = discover(args.raw_dir)
+    sources = [path for path, reason in found.items() if reason is None]
+    skipped = [{'dataset': path.stem, 'status': 'skipped', 'reason': reason}
+               for path, reason in found.items() if reason is not None]
+    for entry in skipped:
+        logger.info(f"Übersprungen: {entry['dataset']} ({entry['reason']})")
+
+    report = run_batch(sources, args.output, args.workers, args.top_n)
+    report.update({'created': datetime.now().isoformat(timespec='seconds'), 'skipped': skipped})
+    print(f"{report['ok']} von {len(sources)} Datensätzen verarbeitet, {report['failed']} fehlgeschlagen, "
+          f"{len(skipped)} übersprungen: {report['wall_seconds']:.1f} s mit {report['workers']} Prozessen "
+          f"(Summe der Einzelzeiten {report['busy_seconds']:.1f} s)")
+    for result in report['datasets']:
+        if result['status'] == 'failed':
+            print(f"  fehlgeschlagen: {result['dataset']}: {result['error']}")
+
+    if args.compare_serial and sources:
+        report['comparison'] = compare_serial(sources, args.workers, args.top_n)
+        comparison = report['comparison']
+        print(f"Seriell {comparison['serial']:.1f} s, parallel {comparison['parallel']:.1f} s "
+              f"({comparison['parallel_workers']} Prozesse): Speedup {comparison['speedup']}x")
+
+    path = args.output / REPORT_NAME
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"Bericht geschrieben: {path}")
+    if report['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Prozessweite Caches für alle Streamlit-Sessions, die API und den Export
+LRU-Verdrängung nach Anzahl und optional nach Speicherbudget, Treffer-/Fehlzähler,
+Berechnung bei gleichzeitigen Fehlschlägen nur einmal pro Schlüssel
+"""
+
+import os
+import sys
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, Hashable, List, Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Speicherbudget des Grafik-Caches in MB, überschreibbar per Umgebungsvariable
+CHART_CACHE_MB = int(os.environ.get('DATAEXPLORER_CACHE_MB', '256'))
+
+# Alle benannten Caches für cache_stats()
+_registry: Dict[str, 'LRUCache'] = {}
+
+# Datenfelder eines Plotly-Traces, die bei der Größenschätzung gezählt werden
+TRACE_ARRAYS = ('x', 'y', 'z', 'text', 'customdata', 'hovertext', 'labels', 'values')
+
+# Pauschale für Layout und Objektstruktur je Grafik bzw. je Trace (gemessen an to_plotly_json typischer Grafiken)
+FIGURE_BYTES = 8192
+TRACE_BYTES = 2048
+
+
+def sizeof(value, _seen: Optional[set] = None) -> int:
+    """
+    Geschätzter Speicherbedarf eines Cache-Eintrags in Bytes
+
+    NumPy-Arrays über nbytes, DataFrames über memory_usage(deep=True), Plotly-Grafiken über
+    die Datenfelder der Traces plus Pauschalen (ohne die teure JSON-Umwandlung); Container
+    und einfache Objekte rekursiv, gemeinsam genutzte Teile werden nur einmal gezählt.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, np.memmap):
+        return 0  # gemappte Segmente (src.shared) belegen keinen eigenen Speicher
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, 'memory_usage'):  # DataFrame, Series, Index
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if hasattr(value, 'to_plotly_json') and hasattr(value, 'data'):  # go.Figure
+        # Liste hält die Felder bis zum Ende am Leben (ihre ids stehen in _seen)
+        arrays = [getattr(trace, name, None) for trace in value.data for name in TRACE_ARRAYS]
+        return FIGURE_BYTES + TRACE_BYTES * len(value.data) + sum(
+            sizeof(array, _seen) for array in arrays if array is not None
+        )
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k, _seen) + sizeof(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(item, _seen) for item in value)
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sys.getsizeof(value) + sizeof(vars(value), _seen)
+    return sys.getsizeof(value)
+
+
+class _Pending:
+    """Laufende Berechnung eines Schlüssels in get_or_build: Sperre, Anzahl Aufrufer, Ergebnis"""
+
+    __slots__ = ('lock', 'waiters', 'value')
+
+    def __init__(self):
+        self.lock = Lock()
+        self.waiters = 0
+        self.value = None
+
+
+class LRUCache:
+    """
+    Begrenzter LRU-Cache, threadsicher für parallele Streamlit-Sessions
+
+    Args:
+        maxsize: maximale Anzahl Einträge
+        max_bytes: Speicherbudget; wenn gesetzt, wird die Größe jedes Eintrags beim Einfügen
+            geschätzt (sizeof) und bis unter das Budget verdrängt
+        name: Name für cache_stats()
+    """
+
+    def __init__(self, maxsize: int = 2048, max_bytes: Optional[int] = None, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.name = name
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+        self._data = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = Lock()
+        self._building: Dict[Hashable, _Pending] = {}
+        if name is not None:
+            _registry[name] = self
+
+    def get(self, key: Hashable) -> Optional[object]:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: object):
+        size = sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                self.rejected += 1
+                logger.info(f"Cache {self.name}: Eintrag mit {size} Bytes größer als das Budget, nicht gespeichert")
+                return
+            self.bytes += size - self._sizes.get(key, 0)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._data.move_to_end(key)
+            self._evict()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], object]) -> object:
+        """
+        Eintrag holen oder berechnen; gleichzeitige Fehlschläge für denselben Schlüssel
+        (z.B. viele Sessions nach dem Start) berechnen ihn nur einmal, die anderen warten
+
+        Wartende erhalten den berechneten Wert auch dann, wenn er nicht in den Cache passt.
+        Die Sperre des Schlüssels bleibt bestehen, bis kein Aufrufer mehr wartet; schlägt
+        build fehl, berechnet der nächste Wartende neu.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            pending = self._building.get(key)
+            if pending is None:
+                pending = self._building[key] = _Pending()
+            pending.waiters += 1
+        try:
+            with pending.lock:
+                if pending.value is None:
+                    with self._lock:
+                        value = self._data.get(key)
+                    if value is None:
+                        value = build()
+                        self.put(key, value)
+                    pending.value = value
+                return pending.value
+        finally:
+            with self._lock:
+                pending.waiters -= 1
+                if not pending.waiters:
+                    del self._building[key]
+
+    def resize(self, maxsize: Optional[int] = None, max_bytes: Optional[int] = None):
+        """Ändert die Grenzen und verdrängt sofort bis darunter"""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while self._data and (len(self._data) > self.maxsize or
+                              (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            key, _ = self._data.popitem(last=False)
+            self.bytes -= self._sizes.pop(key, 0)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, object]:
+        """Einträge, belegte Bytes (nur mit Budget), Treffer, Fehlschläge und Verdrängungen"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cache': self.name,
+                'entries': len(self._data),
+                'maxsize': self.maxsize,
+                'bytes': self.bytes if self.max_bytes is not None else None,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'rejected': self.rejected,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Prüft, ob ein Eintrag vorhanden ist (ohne Treffer-/Fehlzähler und LRU-Reihenfolge zu ändern)"""
+        with self._lock:
+            return key in self._data
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> List[Hashable]:
+        """Entfernt alle Einträge, deren Schlüssel predicate erfüllt, und liefert diese Schlüssel"""
+        with self._lock:
+            removed = [key for key in self._data if predicate(key)]
+            for key in removed:
+                del self._data[key]
+                self.bytes -= self._sizes.pop(key, 0)
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+
+def cache_stats() -> List[Dict[str, object]]:
+    """Statistik aller benannten Caches des Prozesses"""
+    return [cache.stats() for cache in _registry.values()]
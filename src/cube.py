@@ -0,0 +1,617 @@
+"""
+Parsing-Stufe für Migrationsdaten
+Überführt die breite CSV-Tabelle einmalig in einen dichten NumPy-Würfel (Jahr × Richtung × Land)
+"""
+
+import hashlib
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from src.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+KEY_COL = 'herkunftsgebiet_wegzugsgebiet'
+SOURCE_COL = 'quelle'
+CONTINENT_KEY = 'Kontinent'
+DIRECTIONS = ('Zuzug', 'Wegzug')
+
+# Bei Änderungen am Parsing erhöhen, invalidiert gespeicherte Caches in data/processed/
+PARSER_VERSION = 3
+
+# Markierungen für fehlende Werte in den Zahlenzellen
+MISSING_MARKERS = ('-', 'nan', '')
+
+# Werte der Kontinent-Zeile ohne echten Kontinent (z.B. bei Sammelspalten)
+NO_CONTINENT = ('', '.', 'nan')
+
+# Sammelspalten, die in Länder-Rankings nicht auftauchen sollen
+AGGREGATE_COLUMNS = ('sonstige_staaten', 'unbekannt_ohne_angaben')
+
+# Schlüssel wie "2023_ Zuzug" oder "2010_ Wegzug"
+KEY_PATTERN = r'^\s*(?P<year>\d{4})_\s*(?P<direction>Zuzug|Wegzug)\s*$'
+
+
+def coerce_numeric(block: pd.DataFrame, thousands: Optional[str] = None) -> np.ndarray:
+    """
+    Wandelt alle Zellen eines Blocks in einem vektorisierten Schritt in Zahlen um.
+    Tausendertrennzeichen werden entfernt, Dezimalkommas ersetzt, nicht interpretierbare
+    Werte ('-', 'nan', leer) werden NaN.
+
+    Bereits typisierte Blöcke (siehe src.schema) werden nur nach float64 umgewandelt, in
+    gemischten Blöcken nur die Textspalten als Text behandelt (12.5 ist dort kein Tausenderpunkt).
+
+    Returns:
+        2D float64-Array in der Form des Blocks
+    """
+    with span('numeric_coercion', cells=int(block.size)) as event:
+        typed = np.array([pd.api.types.is_numeric_dtype(dtype) for dtype in block.dtypes], dtype=bool)
+        if typed.all():
+            numbers = block.to_numpy(dtype=np.float64, na_value=np.nan)
+            event['missing'] = int(np.isnan(numbers).sum())
+            event['failed'] = 0
+            return numbers
+        numbers = np.empty(block.shape, dtype=np.float64)
+        numbers[:, typed] = block.iloc[:, typed].to_numpy(dtype=np.float64, na_value=np.nan)
+        text = block.iloc[:, ~typed]
+        flat = pd.Series(text.to_numpy(dtype=object).ravel(), dtype='string')
+        flat = flat.str.strip()
+        if thousands:
+            flat = flat.str.replace(thousands, '', regex=False)
+        flat = flat.str.replace(',', '.', regex=False)
+        parsed = pd.to_numeric(flat, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = (flat.isna() | flat.isin(MISSING_MARKERS)).to_numpy(dtype=bool, na_value=True)
+        numbers[:, ~typed] = parsed.reshape(text.shape)
+        event['missing'] = int(missing.sum()) + int(np.isnan(numbers[:, typed]).sum())
+        event['failed'] = int((np.isnan(parsed) & ~missing).sum())
+    return numbers
+
+
+class YearIndex:
+    """
+    Persistenter Index (Jahr, Richtung) -> Zeilenposition im Quell-DataFrame
+
+    Wird einmal beim Einlesen aufgebaut; alle Zeilenzugriffe laufen darüber statt
+    über Substring-Suchen in der Schlüsselspalte.
+    """
+
+    def __init__(self, positions: Dict[Tuple[int, str], int]):
+        self.positions = positions
+        self.years = sorted({year for year, _ in positions})
+
+    @classmethod
+    def from_keys(cls, keys: pd.Series, offset: int = 0, pattern: str = KEY_PATTERN,
+                  directions: Optional[Dict[str, str]] = None) -> 'YearIndex':
+        """
+        Baut den Index aus der Schlüsselspalte (ein Regex-Durchlauf)
+
+        Args:
+            keys: Schlüsselspalte
+            offset: Zeilenposition des ersten Schlüssels in der Quelldatei
+            pattern: Regex mit den Gruppen year und direction
+            directions: Richtungsbezeichnung der Datei -> Eintrag aus DIRECTIONS (z.B. 'Fortzüge' -> 'Wegzug')
+
+        Raises:
+            ValueError: wenn ein Schlüssel mehrfach vorkommt
+        """
+        parsed = keys.astype('string').str.extract(pattern)
+        rows = np.flatnonzero(parsed['year'].notna().to_numpy())
+        row_years = parsed['year'].iloc[rows].astype(int).tolist()
+        row_dirs = parsed['direction'].iloc[rows].tolist()
+        if directions:
+            row_dirs = [directions.get(direction, direction) for direction in row_dirs]
+
+        positions = {}
+        for row, year, direction in zip((rows + offset).tolist(), row_years, row_dirs):
+            if (year, direction) in positions:
+                raise ValueError(
+                    f"Schlüssel '{year}_ {direction}' kommt mehrfach vor "
+                    f"(Zeilen {positions[(year, direction)]} und {row})"
+                )
+            positions[(year, direction)] = row
+        return cls(positions)
+
+    def __contains__(self, key: Tuple[int, str]) -> bool:
+        return key in self.positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def row(self, year: int, direction: str) -> int:
+        """
+        Zeilenposition für Jahr und Richtung
+
+        Raises:
+            KeyError: wenn die Zeile im Datensatz fehlt
+        """
+        try:
+            return self.positions[(year, direction)]
+        except KeyError:
+            raise KeyError(f"Keine Zeile '{year}_ {direction}' im Datensatz") from None
+
+    def complete_years(self) -> List[int]:
+        """Jahre, für die sowohl Zuzug als auch Wegzug vorhanden sind"""
+        return [year for year in self.years if all((year, d) in self.positions for d in DIRECTIONS)]
+
+
+def display_name(column: str) -> str:
+    """Anzeigename einer Länderspalte ('144_nordmazedonien_seit_2019' -> 'Nordmazedonien Seit 2019')"""
+    parts = column.split('_', 1)
+    if len(parts) > 1 and parts[0].isdigit():
+        return parts[1].replace('_', ' ').title()
+    return column.replace('_', ' ').title()
+
+
+class CountryTable:
+    """
+    Länder-Dimension, einmal beim Laden aus den Spaltennamen und der Zeile 'Kontinent' aufgebaut
+
+    Die Länder-ID ist die Spaltenposition im Würfel; Aggregationen und Rankings arbeiten nur
+    mit IDs, Anzeigenamen werden erst beim Erstellen von Tabellen und Grafiken nachgeschlagen.
+
+    Attribute (je ID):
+        columns: Spaltenname der Quelldatei
+        codes: Gebietsschlüssel aus dem Präfix ('121_albanien' -> 121), -1 ohne Präfix
+        names: bereinigter Anzeigename
+        continent_ids: Position in continent_names, -1 ohne Kontinent
+        aggregate: Sammelspalte (nicht in Länder-Rankings)
+    """
+
+    COLUMNS = ['ID', 'Code', 'Spalte', 'Name', 'Kontinent']
+
+    def __init__(self, columns: List[str], continents: List[str]):
+        self.columns = list(columns)
+        self.names = [display_name(column) for column in self.columns]
+        self.codes = np.array([
+            int(prefix) if sep and prefix.isdigit() else -1
+            for prefix, sep, _ in (column.partition('_') for column in self.columns)
+        ], dtype=np.int64)
+        self.continent_names = list(dict.fromkeys(c for c in continents if c.strip() not in NO_CONTINENT))
+        lookup = {name: pos for pos, name in enumerate(self.continent_names)}
+        self.continent_ids = np.array([lookup.get(c, -1) for c in continents], dtype=np.int16)
+        self.aggregate = np.array([column in AGGREGATE_COLUMNS for column in self.columns], dtype=bool)
+        self._by_column = {column: pos for pos, column in enumerate(self.columns)}
+        self._by_code = {int(code): pos for pos, code in enumerate(self.codes) if code >= 0}
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def id(self, column: str) -> int:
+        """
+        Länder-ID zu einem Spaltennamen oder Gebietsschlüssel ('121_albanien' oder '121')
+
+        Raises:
+            KeyError: wenn die Spalte unbekannt ist
+        """
+        if column in self._by_column:
+            return self._by_column[column]
+        if column.isdigit() and int(column) in self._by_code:
+            return self._by_code[int(column)]
+        raise KeyError(f"Unbekannte Spalte '{column}'")
+
+    def continent(self, country: int) -> str:
+        code = self.continent_ids[country]
+        return self.continent_names[code] if code >= 0 else ''
+
+    def to_frame(self) -> pd.DataFrame:
+        """Dimensionstabelle: ID, Code (None ohne Präfix), Spalte, Name, Kontinent"""
+        return pd.DataFrame({
+            'ID': np.arange(len(self.columns)),
+            'Code': pd.array([int(code) if code >= 0 else None for code in self.codes], dtype='Int64'),
+            'Spalte': self.columns,
+            'Name': self.names,
+            'Kontinent': [self.continent(pos) for pos in range(len(self.columns))],
+        }, columns=self.COLUMNS)
+
+
+class MigrationCube:
+    """
+    Dichte Darstellung der Außenwanderung als Array values[jahr, richtung, land]
+
+    Fehlende Werte sind NaN. Kontinente (aus der Zeile 'Kontinent') und die Spalte
+    'quelle' werden als Metadaten neben dem Array gehalten, Codes, Anzeigenamen und
+    Kontinente je Land in der Länder-Dimension country_table.
+    """
+
+    def __init__(self, values: np.ndarray, years: List[int], countries: List[str],
+                 continents: List[str], sources: np.ndarray, index: Optional[YearIndex] = None):
+        self.values = values
+        self.years = years
+        self.countries = countries
+        self.continents = continents
+        self.sources = sources
+        self.index = index
+        self.country_table = CountryTable(countries, continents)
+        self._year_pos = {year: pos for pos, year in enumerate(years)}
+        self._fingerprint = None
+        self._year_fingerprints = {}
+        self._totals = None
+        self._column_sums = None
+        self._max_abs_saldo = None
+        self._country_mask = ~self.country_table.aggregate
+        self._continent_totals = None
+        # Datenqualitätsbericht des Einlesens (src.schema.QualityReport), falls vorhanden
+        self.quality = None
+        # Vorberechnete Präfixsummen (cumulative, cumulative_totals) aus einem geteilten Segment (src.shared)
+        self.prefix_sums = None
+        # Vorberechnete Erkenntnisse (src.insights.build_insights) aus einem geteilten Segment
+        self.insights = None
+        # Leerer CubeBuilder mit dem Layout des Einlesens; append_rows parst neue Zeilen damit
+        self.builder = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, builder: Optional['CubeBuilder'] = None) -> 'MigrationCube':
+        """
+        Erstellt den Würfel aus dem eingelesenen DataFrame
+
+        Args:
+            df: DataFrame im Format von 'Aussenwanderung_nach_Herkunfts_Ziel-Staat'
+            builder: für andere Layouts ein passend konfigurierter CubeBuilder (siehe src.adapters)
+        """
+        builder = builder or CubeBuilder()
+        builder.add_chunk(df)
+        return builder.build()
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash über alle Jahre, identifiziert die Datensatz-Version"""
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for year in self.years:
+                digest.update(self.year_fingerprint(year).encode('ascii'))
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def year_fingerprint(self, year: int) -> str:
+        """
+        Hash über die Werte eines Jahres und die Spalten
+
+        Caches für Einzeljahre (Rankings, Top-N-Grafiken) verwenden diesen Schlüssel und
+        bleiben so gültig, wenn andere Jahre hinzukommen.
+        """
+        fingerprint = self._year_fingerprints.get(year)
+        if fingerprint is None:
+            digest = hashlib.sha1()
+            digest.update(repr((year, self.countries)).encode('utf-8'))
+            digest.update(np.ascontiguousarray(self.values[self._year_pos[year]]).tobytes())
+            fingerprint = digest.hexdigest()[:16]
+            self._year_fingerprints[year] = fingerprint
+        return fingerprint
+
+    def year_position(self, year: int) -> Optional[int]:
+        """Position eines Jahres im Würfel oder None"""
+        return self._year_pos.get(year)
+
+    def lookup(self, year: int, direction: str) -> np.ndarray:
+        """
+        Werte aller Spalten für Jahr und Richtung (über den Index)
+
+        Raises:
+            KeyError: wenn die Zeile im Datensatz fehlt
+        """
+        if self.index is not None:
+            self.index.row(year, direction)
+        pos = self.year_position(year)
+        if pos is None:
+            raise KeyError(f"Keine Zeile '{year}_ {direction}' im Datensatz")
+        return self.values[pos, DIRECTIONS.index(direction)]
+
+    def direction(self, direction: str) -> np.ndarray:
+        """Matrix (Jahr, Land) für 'Zuzug' oder 'Wegzug' als View auf values (fehlende Werte NaN). Nicht verändern."""
+        return self.values[:, DIRECTIONS.index(direction), :]
+
+    def column_sums(self, direction: str) -> np.ndarray:
+        """Summe je Land über alle Jahre für eine Richtung, fehlende Werte zählen als 0 (ohne Kopie von values). Nicht verändern."""
+        if self._column_sums is None:
+            self._column_sums = np.stack([
+                np.sum(block, axis=0, where=~np.isnan(block)) for block in map(self.direction, DIRECTIONS)
+            ])
+        return self._column_sums[DIRECTIONS.index(direction)]
+
+    def totals(self) -> np.ndarray:
+        """Summen über alle Spalten je Jahr und Richtung, Form (Jahr, Richtung). Nicht verändern."""
+        if self._totals is None:
+            with span('totals', cells=int(self.values.size)):
+                self._totals = np.nansum(self.values, axis=2)
+        return self._totals
+
+    def saldo(self, years=None, countries=None) -> np.ndarray:
+        """
+        Migrationssaldo (Zuzug - Wegzug) je Jahr und Land, fehlende Werte als 0
+
+        Berechnet nur das Ergebnis-Array; fehlende Werte werden nur in den betroffenen Zellen
+        ersetzt statt über Kopien ganzer Richtungen.
+
+        Args:
+            years: nur diese Jahrespositionen (Index, Liste oder Slice), Standard: alle
+            countries: nur diese Spalten, Standard: alle
+        """
+        block = self.values if years is None else self.values[years]
+        if countries is not None:
+            block = block[..., countries]
+        zuzug, wegzug = block[..., 0, :], block[..., 1, :]
+        saldo = zuzug - wegzug
+        missing = np.isnan(saldo)
+        if missing.any():
+            saldo[missing] = np.nan_to_num(zuzug[missing]) - np.nan_to_num(wegzug[missing])
+        return saldo
+
+    def continent_names(self) -> List[str]:
+        """Kontinente in der Reihenfolge ihres ersten Auftretens in der Zeile 'Kontinent'"""
+        return self.country_table.continent_names
+
+    def continent_codes(self) -> np.ndarray:
+        """Kontinent-Nummer je Spalte (Position in continent_names), -1 ohne Kontinent. Nicht verändern."""
+        return self.country_table.continent_ids
+
+    def _group_by_continent(self, values: np.ndarray) -> np.ndarray:
+        """Summiert die letzte Achse (Spalten) je Kontinent über eine Indikatormatrix"""
+        codes = self.continent_codes()
+        membership = (codes[:, None] == np.arange(len(self.continent_names()))[None, :]).astype(values.dtype)
+        return np.nan_to_num(values) @ membership
+
+    def continent_totals(self) -> np.ndarray:
+        """Summen je Jahr, Richtung und Kontinent, Form (Jahr, Richtung, Kontinent). Nicht verändern."""
+        if self._continent_totals is None:
+            with span('continent_totals', cells=int(self.values.size)):
+                self._continent_totals = self._group_by_continent(self.values)
+        return self._continent_totals
+
+    def continent_saldo(self) -> np.ndarray:
+        """Migrationssaldo je Jahr und Kontinent"""
+        totals = self.continent_totals()
+        return totals[:, 0, :] - totals[:, 1, :]
+
+    def max_abs_saldo(self) -> np.ndarray:
+        """Größter Betrag des Migrationssaldos je Land über alle Jahre. Nicht verändern."""
+        if self._max_abs_saldo is None:
+            saldo = self.saldo()
+            self._max_abs_saldo = np.abs(saldo, out=saldo).max(axis=0, initial=0.0)
+        return self._max_abs_saldo
+
+    def aggregates(self) -> Dict[str, np.ndarray]:
+        """
+        Kleine abgeleitete Arrays (Summen, Kontinentsummen, max |Saldo|, Jahres-Fingerprints)
+
+        Werden mit einem geteilten Segment gespeichert (src.shared), damit Worker sie nicht
+        mit vollen Zwischenkopien von values selbst berechnen müssen.
+        """
+        return {
+            'totals': self.totals(),
+            'continent_totals': self.continent_totals(),
+            'max_abs_saldo': self.max_abs_saldo(),
+            'fingerprints': np.asarray([self.year_fingerprint(year) for year in self.years], dtype=str),
+        }
+
+    def restore_aggregates(self, arrays):
+        """
+        Übernimmt mit aggregates() gespeicherte oder beim Einlesen laufend berechnete Arrays
+        (src.streaming), ohne values zu lesen; fehlende Schlüssel werden bei Bedarf berechnet
+        """
+        if 'totals' in arrays:
+            self._totals = np.asarray(arrays['totals'])
+        if 'column_sums' in arrays:
+            self._column_sums = np.asarray(arrays['column_sums'])
+        if 'continent_totals' in arrays:
+            self._continent_totals = np.asarray(arrays['continent_totals'])
+        if 'max_abs_saldo' in arrays:
+            self._max_abs_saldo = np.asarray(arrays['max_abs_saldo'])
+        if 'fingerprints' in arrays:
+            self._year_fingerprints = dict(zip(self.years, arrays['fingerprints'].tolist()))
+
+    def country_mask(self) -> np.ndarray:
+        """Bool-Maske der echten Länder (ohne Sammelspalten). Nicht verändern."""
+        return self._country_mask
+
+    def append_rows(self, df: pd.DataFrame, replace: bool = False) -> List[int]:
+        """
+        Fügt neue Zeilen '<Jahr>_ Zuzug' / '<Jahr>_ Wegzug' hinzu, ohne den Bestand neu zu parsen
+
+        Summen, das laufende Maximum des |Saldo| und die Fingerprints werden nur für die
+        betroffenen Jahre aktualisiert; Caches anderer Jahre bleiben gültig.
+
+        Args:
+            df: Zeilen mit Schlüsselspalte und (einem Teil der) Länderspalten
+            replace: vorhandene Jahre überschreiben statt einen Fehler auszulösen
+
+        Returns:
+            Sortierte Liste der betroffenen Jahre
+
+        Raises:
+            ValueError: bei unbekannten Spalten oder bereits vorhandenen Zeilen (ohne replace)
+        """
+        new = MigrationCube.from_dataframe(df, self.builder.clone() if self.builder is not None else None)
+        self.prefix_sums = None
+        self.insights = None
+        col_pos = {col: pos for pos, col in enumerate(self.countries)}
+        unknown = [col for col in new.countries if col not in col_pos]
+        if unknown:
+            raise ValueError(f"Unbekannte Spalten: {unknown}")
+
+        existing = [key for key in new.index.positions if key in self.index]
+        if existing and not replace:
+            raise ValueError(f"Zeilen bereits vorhanden: {[f'{y}_ {d}' for y, d in existing]}")
+
+        added_years = [year for year in new.years if year not in self._year_pos]
+        if added_years:
+            self._insert_years(added_years)
+
+        columns = np.array([col_pos[col] for col in new.countries], dtype=int)
+        next_row = max(self.index.positions.values(), default=-1) + 1
+        for (year, direction), _ in sorted(new.index.positions.items(), key=lambda item: item[1]):
+            pos, d = self._year_pos[year], DIRECTIONS.index(direction)
+            values = np.full(len(self.countries), np.nan)
+            values[columns] = new.values[new.year_position(year), d]
+            self.values[pos, d] = values
+            self.sources[pos, d] = new.sources[new.year_position(year), d]
+            # Neue Schlüssel erhalten fortlaufende Zeilennummern nach dem Bestand (ersetzte behalten ihre)
+            if (year, direction) not in self.index:
+                self.index.positions[(year, direction)] = next_row
+                next_row += 1
+        self.index.years = sorted({year for year, _ in self.index.positions})
+
+        affected = sorted(new.years)
+        positions = [self._year_pos[year] for year in affected]
+        if self._totals is not None:
+            self._totals[positions] = np.nansum(self.values[positions], axis=2)
+        if self._continent_totals is not None:
+            self._continent_totals[positions] = self._group_by_continent(self.values[positions])
+        if self._max_abs_saldo is not None:
+            if existing:
+                # Werte wurden ersetzt, das Maximum kann auch sinken
+                self._max_abs_saldo = None
+            else:
+                new_saldo = self.saldo(positions)
+                self._max_abs_saldo = np.maximum(self._max_abs_saldo, np.abs(new_saldo).max(axis=0))
+        self._column_sums = None
+        for year in affected:
+            self._year_fingerprints.pop(year, None)
+        self._fingerprint = None
+
+        logger.info(f"Jahre ergänzt/aktualisiert: {affected}")
+        return affected
+
+    def _insert_years(self, added_years: List[int]):
+        """Erweitert die Jahresachse um neue (leere) Jahre"""
+        years = sorted(set(self.years) | set(added_years))
+        old_pos = np.searchsorted(years, self.years)
+
+        values = np.full((len(years),) + self.values.shape[1:], np.nan)
+        values[old_pos] = self.values
+        sources = np.full((len(years), len(DIRECTIONS)), None, dtype=object)
+        sources[old_pos] = self.sources
+        if self._totals is not None:
+            totals = np.zeros((len(years), len(DIRECTIONS)))
+            totals[old_pos] = self._totals
+            self._totals = totals
+        if self._continent_totals is not None:
+            continent_totals = np.zeros((len(years),) + self._continent_totals.shape[1:])
+            continent_totals[old_pos] = self._continent_totals
+            self._continent_totals = continent_totals
+
+        self.values, self.sources, self.years = values, sources, years
+        self._year_pos = {year: pos for pos, year in enumerate(years)}
+
+
+
+class CubeBuilder:
+    """
+    Baut den Migrationswürfel aus einem oder mehreren Blöcken (Chunks) der CSV auf
+
+    Pro Block werden Schlüssel per Regex geparst und alle Zahlen vektorisiert umgewandelt;
+    gehalten werden nur die geparsten Zeilen, nicht der Rohtext.
+
+    Args:
+        key: Schlüsselspalte mit den Zeilen '<Jahr>_ <Richtung>'
+        source: Quellspalte (optional in der Datei)
+        key_pattern: Regex der Schlüssel mit den Gruppen year und direction
+        metadata_key: Schlüssel der Metadatenzeile mit den Kontinenten
+        directions: Richtungsbezeichnungen der Datei -> Eintrag aus DIRECTIONS
+        thousands: Tausendertrennzeichen in Textzellen, None = keines
+    """
+
+    def __init__(self, key: str = KEY_COL, source: str = SOURCE_COL, key_pattern: str = KEY_PATTERN,
+                 metadata_key: str = CONTINENT_KEY, directions: Optional[Dict[str, str]] = None,
+                 thousands: Optional[str] = None):
+        self.key = key
+        self.source = source
+        self.key_pattern = key_pattern
+        self.metadata_key = metadata_key
+        self.directions = directions
+        self.thousands = thousands
+        self.countries = None
+        self.continents = None
+        self._has_source = False
+        self._positions = {}
+        self._rows = {}
+        self._sources = {}
+        self._offset = 0
+
+    def clone(self) -> 'CubeBuilder':
+        """Neuer leerer Builder mit demselben Layout"""
+        return CubeBuilder(self.key, self.source, self.key_pattern, self.metadata_key, self.directions, self.thousands)
+
+    def is_data_key(self, key: str) -> bool:
+        """Ob ein einzelner Schlüssel eine Datenzeile '<Jahr>_ <Richtung>' bezeichnet"""
+        return re.match(self.key_pattern, key.strip()) is not None
+
+    def classify_rows(self, keys: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ordnet die Zeilen eines Blocks über die Schlüsselspalte zu
+
+        Returns:
+            (Bool-Maske der Datenzeilen '<Jahr>_ <Richtung>', Bool-Maske der Metadatenzeilen)
+        """
+        keys = keys.astype('string').str.strip()
+        is_data = keys.str.match(self.key_pattern).fillna(False).to_numpy(dtype=bool)
+        is_metadata = keys.str.contains(self.metadata_key, regex=False).fillna(False).to_numpy(dtype=bool)
+        return is_data, is_metadata & ~is_data
+
+    def add_chunk(self, chunk: pd.DataFrame):
+        """
+        Verarbeitet einen Block von Zeilen
+
+        Raises:
+            ValueError: bei fehlender Schlüsselspalte oder doppelten Schlüsseln
+        """
+        if self.key not in chunk.columns:
+            raise ValueError(f"Spalte '{self.key}' fehlt - keine Migrationsdaten")
+        if self.countries is None:
+            self.countries = [col for col in chunk.columns if col not in (self.key, self.source)]
+            self._has_source = self.source in chunk.columns
+
+        keys = chunk[self.key].astype('string').str.strip()
+
+        # Kontinent-Metadaten
+        if self.continents is None:
+            continent_rows = np.flatnonzero(keys.str.contains(self.metadata_key, regex=False).fillna(False))
+            if len(continent_rows):
+                self.continents = [str(v) for v in chunk.iloc[continent_rows[0]][self.countries]]
+
+        with span('key_parsing', rows=len(chunk)) as event:
+            index = YearIndex.from_keys(keys, self._offset, self.key_pattern, self.directions)
+            event['keys'] = len(index)
+        for key, row in index.positions.items():
+            if key in self._positions:
+                raise ValueError(
+                    f"Schlüssel '{key[0]}_ {key[1]}' kommt mehrfach vor "
+                    f"(Zeilen {self._positions[key]} und {row})"
+                )
+
+        if len(index):
+            local_rows = np.array(list(index.positions.values()), dtype=int) - self._offset
+            block = coerce_numeric(chunk.iloc[local_rows][self.countries], self.thousands)
+            sources = chunk[self.source].iloc[local_rows].tolist() if self._has_source else [None] * len(local_rows)
+            for key, source in zip(index.positions, sources):
+                self._sources[key] = None if pd.isna(source) else source
+            self._store(list(index.positions), block)
+            self._positions.update(index.positions)
+
+        self._offset += len(chunk)
+
+    def _store(self, keys: List[Tuple[int, str]], block: np.ndarray):
+        """Übernimmt die Zahlen der Datenzeilen eines Blocks (eine Zeile von block je Schlüssel)"""
+        for key, values in zip(keys, block):
+            self._rows[key] = values
+
+    def build(self) -> MigrationCube:
+        """Setzt die gesammelten Zeilen zum Würfel zusammen"""
+        countries = self.countries or []
+        index = YearIndex(dict(self._positions))
+        years = index.years
+
+        values = np.full((len(years), len(DIRECTIONS), len(countries)), np.nan)
+        sources = np.full((len(years), len(DIRECTIONS)), None, dtype=object)
+        year_pos = {year: pos for pos, year in enumerate(years)}
+        for (year, direction), row in self._rows.items():
+            values[year_pos[year], DIRECTIONS.index(direction)] = row
+            sources[year_pos[year], DIRECTIONS.index(direction)] = self._sources[(year, direction)]
+
+        continents = self.continents if self.continents is not None else [''] * len(countries)
+        logger.info(f"Migrationswürfel erstellt: {len(years)} Jahre, {len(countries)} Spalten")
+        cube = MigrationCube(values, years, countries, continents, sources, index)
+        cube.builder = self.clone()
+        return cube
@@ -0,0 +1,90 @@
+"""
+Export der berechneten Tabellen als CSV, Parquet oder Excel
+Die Dateien werden erst bei Bedarf erzeugt und pro Datensatz-Version gecacht
+"""
+
+import importlib.util
+import io
+import pandas as pd
+from typing import BinaryIO, Hashable, List, Optional
+import logging
+
+from src.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Format -> (MIME-Typ, Dateiendung, benötigtes Paket oder None)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv', None),
+    'parquet': ('application/vnd.apache.parquet', 'parquet', 'pyarrow'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', 'openpyxl'),
+}
+
+CSV_CHUNK_ROWS = 10000
+
+# Erzeugte Dateien, Schlüssel: (Fingerprint, Tabellenname, ..., Format)
+export_cache = LRUCache(maxsize=64, name='exports')
+
+
+def available_formats() -> List[str]:
+    """Formate, deren optionale Abhängigkeiten installiert sind"""
+    return [
+        fmt for fmt, (_, _, package) in EXPORT_FORMATS.items()
+        if package is None or importlib.util.find_spec(package) is not None
+    ]
+
+
+def write_csv(df: pd.DataFrame, stream: BinaryIO, chunk_rows: int = CSV_CHUNK_ROWS):
+    """Schreibt die Tabelle blockweise als CSV (Semikolon, UTF-8 mit BOM für Excel)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for start in range(0, max(len(df), 1), chunk_rows):
+        df.iloc[start:start + chunk_rows].to_csv(text, sep=';', index=False, header=(start == 0))
+    text.flush()
+    text.detach()
+
+
+def write_table(df: pd.DataFrame, fmt: str, stream: BinaryIO):
+    """Schreibt die Tabelle im gewünschten Format in einen Binärstrom"""
+    if fmt == 'csv':
+        write_csv(df, stream)
+    elif fmt == 'parquet':
+        df.to_parquet(stream, index=False)
+    elif fmt == 'xlsx':
+        df.to_excel(stream, index=False)
+    else:
+        raise ValueError(f"Unbekanntes Exportformat '{fmt}', verfügbar: {list(EXPORT_FORMATS)}")
+
+
+def export_bytes(df: pd.DataFrame, fmt: str, cache_key: Optional[Hashable] = None) -> bytes:
+    """
+    Erzeugt den Dateiinhalt einer Tabelle
+
+    Args:
+        df: Tabelle
+        fmt: 'csv', 'parquet' oder 'xlsx'
+        cache_key: wenn gesetzt (z.B. Fingerprint + Tabellenname), wird das Ergebnis gecacht
+
+    Returns:
+        Dateiinhalt als Bytes
+    """
+    if cache_key is not None:
+        cached = export_cache.get((cache_key, fmt))
+        if cached is not None:
+            return cached
+
+    buffer = io.BytesIO()
+    write_table(df, fmt, buffer)
+    data = buffer.getvalue()
+
+    if cache_key is not None:
+        export_cache.put((cache_key, fmt), data)
+    return data
+
+
+def file_name(name: str, fmt: str) -> str:
+    """Dateiname mit passender Endung"""
+    return f"{name}.{EXPORT_FORMATS[fmt][1]}"
+
+
+def mime_type(fmt: str) -> str:
+    return EXPORT_FORMATS[fmt][0]
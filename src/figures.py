@@ -0,0 +1,100 @@
+"""
+Gemeinsame Darstellung der Plotly-Grafiken
+Schlankes registriertes Template, WebGL-Traces ab einer Punktzahl, Rundung auf Anzeigegenauigkeit
+und Größe der serialisierten Grafik (JSON, das an den Browser geht)
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from typing import Dict, Sequence, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE = 'konstanz'
+
+# Ab dieser Punktzahl pro Trace wird Scattergl (WebGL) statt SVG verwendet
+WEBGL_THRESHOLD = 1000
+
+# Nachkommastellen der übertragenen Werte
+DISPLAY_DECIMALS = 1
+
+# Legende oben links innerhalb der Zeichenfläche
+LEGEND_TOP_LEFT = dict(yanchor="top", y=0.99, xanchor="left", x=0.01)
+
+
+def _build_template() -> go.layout.Template:
+    """
+    Template mit den von uns genutzten Teilen von 'plotly_white'
+
+    'plotly_white' enthält Vorgaben für alle Trace-Typen (3D, Karten, Farbskalen) und wird
+    in jede Grafik eingebettet; hier bleiben nur Achsen, Farben und die gemeinsamen
+    Vorgaben für Berechnungshinweise (Annotationen unter der Grafik) und Ränder.
+    """
+    base = pio.templates['plotly_white'].layout
+    axis = {key: base.xaxis[key] for key in ('gridcolor', 'linecolor', 'zerolinecolor', 'zerolinewidth', 'automargin')}
+    layout = dict(
+        font=dict(color=base.font.color),
+        paper_bgcolor=base.paper_bgcolor,
+        plot_bgcolor=base.plot_bgcolor,
+        colorway=base.colorway,
+        hoverlabel=dict(align='left'),
+        title=dict(x=0.05),
+        xaxis=dict(axis, ticks='', title_standoff=15),
+        yaxis=dict(axis, ticks=''),
+        margin=dict(b=100),
+        annotationdefaults=dict(
+            xref="paper", yref="paper",
+            x=0.5, y=-0.18,  # unter der x-Achsenbeschriftung
+            xanchor="center", yanchor="top",
+            showarrow=False,
+            font=dict(size=9, color="gray")
+        ),
+    )
+    data = dict(bar=[go.Bar(marker_line=dict(color='white', width=0.5))])
+    return go.layout.Template(layout=layout, data=data)
+
+
+pio.templates[TEMPLATE] = _build_template()
+
+
+def note(text: str, **kwargs) -> dict:
+    """Berechnungshinweis unter der Grafik (Position und Schrift aus dem Template)"""
+    return dict(text=text, **kwargs)
+
+
+def display_values(values: Sequence[float], decimals: int = DISPLAY_DECIMALS) -> Union[np.ndarray, list]:
+    """
+    Rundet Werte auf Anzeigegenauigkeit
+
+    Ganzzahlige Reihen werden als kompaktes Integer-Array übergeben (Plotly überträgt sie
+    binär), alle anderen als gerundete Liste.
+    """
+    rounded = np.round(np.asarray(values, dtype=np.float64), decimals)
+    if len(rounded) and np.isfinite(rounded).all() and (rounded == np.round(rounded)).all():
+        for dtype in (np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if rounded.min() >= info.min and rounded.max() <= info.max:
+                return rounded.astype(dtype)
+    return [None if np.isnan(v) else float(v) for v in rounded]
+
+
+def scatter(x: Sequence, y: Sequence, threshold: int = WEBGL_THRESHOLD, **kwargs) -> go.Scatter:
+    """Linien-Trace, ab threshold Punkten als WebGL (Scattergl)"""
+    trace = go.Scattergl if len(y) > threshold else go.Scatter
+    return trace(x=display_values(x) if _is_numeric(x) else x, y=display_values(y), **kwargs)
+
+
+def _is_numeric(values: Sequence) -> bool:
+    return np.issubdtype(np.asarray(values).dtype, np.number)
+
+
+def payload_bytes(fig: go.Figure) -> int:
+    """Größe der serialisierten Grafik in Bytes (wie sie an den Browser geschickt wird)"""
+    return len(pio.to_json(fig, validate=False).encode('utf-8'))
+
+
+def payload_report(figures: Dict[str, go.Figure]) -> Dict[str, int]:
+    """Payload-Größe je Grafik, fehlende Grafiken werden übersprungen"""
+    return {name: payload_bytes(fig) for name, fig in figures.items() if fig is not None}
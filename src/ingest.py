@@ -0,0 +1,351 @@
+"""
+Abgleich der Rohdaten mit dem CKAN-Portal von Open Data Konstanz
+Lädt die Ressourcen der gewünschten Datensätze parallel über eine gemeinsame Verbindung,
+mit bedingten Anfragen (ETag/Last-Modified) und einem Manifest in data/raw/
+
+Aufruf:
+    python -m src.ingest --dataset aussenwanderung-nach-herkunfts-und-zielgebiet
+    python -m src.ingest --all --concurrency 16
+    python -m src.ingest --base-url http://127.0.0.1:8000 --all     # lokaler Ersatz-Server
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+CKAN_URL = 'https://offenedaten-konstanz.de'
+RAW_DIR = Path(__file__).resolve().parent.parent / 'data' / 'raw'
+MANIFEST_NAME = 'manifest.json'
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_FORMATS = ('CSV',)
+TIMEOUT_S = 60
+CHUNK_BYTES = 1 << 16
+
+# (Status, Antwort-Header, Pfad der temporären Datei mit dem Inhalt oder None)
+Response = Tuple[int, Dict[str, str], Optional[Path]]
+
+
+class Manifest:
+    """
+    Stand der heruntergeladenen Ressourcen, Schlüssel: Ressourcen-URL
+
+    Einträge: Datensatz, Dateiname, ETag, Last-Modified, SHA-256 und Zeitpunkt des letzten Abrufs
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, str]] = {}
+        if path.exists():
+            try:
+                self.entries = json.loads(path.read_text(encoding='utf-8'))
+            except ValueError as e:
+                logger.warning(f"Manifest {path.name} unlesbar, starte neu: {e}")
+
+    def get(self, url: str) -> Dict[str, str]:
+        return self.entries.get(url, {})
+
+    def file_name(self, url: str, dataset: str) -> str:
+        """Dateiname für eine Ressource; bei Namensgleichheit mit dem Datensatz als Präfix"""
+        if url in self.entries:
+            return self.entries[url]['file']
+        name = re.sub(r'[^\w.\-]', '_', Path(urllib.parse.urlparse(url).path).name) or 'resource'
+        taken = {entry['file'] for entry in self.entries.values()}
+        return name if name not in taken else f"{dataset}__{name}"
+
+    def update(self, url: str, **entry: str):
+        self.entries[url] = {**self.get(url), **entry}
+
+    def save(self):
+        """Schreibt das Manifest atomar"""
+        _atomic_write(self.path, json.dumps(self.entries, indent=2, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+
+
+def _atomic_write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name, suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+class _AiohttpClient:
+    """HTTP über einen aiohttp-Verbindungspool (eine Session für alle Anfragen)"""
+
+    def __init__(self, concurrency: int):
+        import aiohttp
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=TIMEOUT_S),
+        )
+
+    async def get_json(self, url: str) -> dict:
+        async with self._session.get(url) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def fetch(self, url: str, headers: Dict[str, str], tmp_dir: Path) -> Response:
+        async with self._session.get(url, headers=headers) as response:
+            if response.status == 304:
+                return 304, dict(response.headers), None
+            response.raise_for_status()
+            fd, tmp_name = tempfile.mkstemp(suffix='.download', dir=tmp_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    async for block in response.content.iter_chunked(CHUNK_BYTES):
+                        f.write(block)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+            return response.status, dict(response.headers), Path(tmp_name)
+
+    async def close(self):
+        await self._session.close()
+
+
+class _UrllibClient:
+    """Ersatz ohne aiohttp: urllib in Threads (gleiche Parallelität, aber ohne Verbindungspool)"""
+
+    async def get_json(self, url: str) -> dict:
+        def read():
+            with urllib.request.urlopen(url, timeout=TIMEOUT_S) as response:
+                return json.loads(response.read().decode('utf-8'))
+        return await asyncio.to_thread(read)
+
+    async def fetch(self, url: str, headers: Dict[str, str], tmp_dir: Path) -> Response:
+        def read():
+            request = urllib.request.Request(url, headers=headers)
+            try:
+                response = urllib.request.urlopen(request, timeout=TIMEOUT_S)
+            except urllib.error.HTTPError as e:
+                if e.code == 304:
+                    return 304, dict(e.headers), None
+                raise
+            with response:
+                fd, tmp_name = tempfile.mkstemp(suffix='.download', dir=tmp_dir)
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        for block in iter(lambda: response.read(CHUNK_BYTES), b''):
+                            f.write(block)
+                except BaseException:
+                    os.unlink(tmp_name)
+                    raise
+                return response.status, dict(response.headers), Path(tmp_name)
+        return await asyncio.to_thread(read)
+
+    async def close(self):
+        pass
+
+
+def _client(concurrency: int):
+    """aiohttp, falls installiert (erst hier importiert), sonst urllib"""
+    if importlib.util.find_spec('aiohttp') is not None:
+        return _AiohttpClient(concurrency)
+    logger.warning("aiohttp nicht installiert, verwende urllib ohne Verbindungspool")
+    return _UrllibClient()
+
+
+def _action_url(base_url: str, action: str, **params: str) -> str:
+    query = f"?{urllib.parse.urlencode(params)}" if params else ''
+    return f"{base_url.rstrip('/')}/api/3/action/{action}{query}"
+
+
+async def list_datasets(client, base_url: str = CKAN_URL) -> List[str]:
+    """Namen aller Datensätze des Portals (CKAN package_list)"""
+    payload = await client.get_json(_action_url(base_url, 'package_list'))
+    return payload['result']
+
+
+async def dataset_resources(client, name: str, base_url: str = CKAN_URL,
+                            formats: Tuple[str, ...] = DEFAULT_FORMATS) -> List[dict]:
+    """Ressourcen eines Datensatzes in den gewünschten Formaten (CKAN package_show)"""
+    payload = await client.get_json(_action_url(base_url, 'package_show', id=name))
+    wanted = {fmt.upper() for fmt in formats}
+    return [
+        {**resource, 'dataset': name} for resource in payload['result'].get('resources', [])
+        if resource.get('url') and (not wanted or (resource.get('format') or '').upper() in wanted)
+    ]
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def download(client, resource: dict, manifest: Manifest, raw_dir: Path) -> Optional[Path]:
+    """
+    Lädt eine Ressource bedingt herunter
+
+    Returns:
+        Pfad der Datei, wenn sie neu ist oder sich geändert hat, sonst None
+    """
+    url = resource['url']
+    entry = manifest.get(url)
+    target = raw_dir / manifest.file_name(url, resource['dataset'])
+
+    headers = {}
+    if target.exists():
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    status, response_headers, tmp_path = await client.fetch(url, headers, raw_dir)
+    # Header-Namen sind nicht case-sensitiv (aiohttp liefert z.B. 'Etag' statt 'ETag')
+    response_headers = {name.lower(): value for name, value in response_headers.items()}
+    fetched = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    if status == 304:
+        manifest.update(url, fetched=fetched)
+        logger.info(f"Unverändert (304): {target.name}")
+        return None
+
+    try:
+        sha256 = _sha256(tmp_path)
+        changed = sha256 != entry.get('sha256') or not target.exists()
+        if changed:
+            os.replace(tmp_path, target)
+    finally:
+        # Nach os.replace existiert die temporäre Datei nicht mehr; sonst (unverändert oder Fehler) entfernen
+        if tmp_path.exists():
+            tmp_path.unlink()
+    manifest.update(
+        url,
+        dataset=resource['dataset'],
+        file=target.name,
+        etag=response_headers.get('etag', ''),
+        last_modified=response_headers.get('last-modified', ''),
+        sha256=sha256,
+        fetched=fetched,
+    )
+    logger.info(f"{'Aktualisiert' if changed else 'Inhalt unverändert'}: {target.name}")
+    return target if changed else None
+
+
+async def sync(datasets: Optional[List[str]] = None, base_url: str = CKAN_URL, raw_dir: Path = RAW_DIR,
+               concurrency: int = DEFAULT_CONCURRENCY,
+               formats: Tuple[str, ...] = DEFAULT_FORMATS) -> List[Path]:
+    """
+    Gleicht data/raw mit dem Portal ab
+
+    Args:
+        datasets: Namen der Datensätze, None = alle Datensätze des Portals
+        base_url: Basis-URL des CKAN-Portals (z.B. ein lokaler Ersatz-Server für Tests)
+        concurrency: maximale Anzahl gleichzeitiger Anfragen
+
+    Returns:
+        Pfade der neuen oder geänderten Dateien
+    """
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(raw_dir / MANIFEST_NAME)
+    client = _client(concurrency)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def limited(coro):
+        async with limit:
+            return await coro
+
+    try:
+        if datasets is None:
+            datasets = await list_datasets(client, base_url)
+        resource_lists = await asyncio.gather(
+            *(limited(dataset_resources(client, name, base_url, formats)) for name in datasets)
+        )
+        resources = [resource for resources in resource_lists for resource in resources]
+        # Dateinamen vorab vergeben, damit parallele Downloads nicht kollidieren
+        for resource in resources:
+            manifest.update(resource['url'], dataset=resource['dataset'],
+                            file=manifest.file_name(resource['url'], resource['dataset']))
+        results = await asyncio.gather(
+            *(limited(download(client, resource, manifest, raw_dir)) for resource in resources),
+            return_exceptions=True
+        )
+    finally:
+        await client.close()
+        manifest.save()
+
+    changed = []
+    for resource, result in zip(resources, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Download fehlgeschlagen: {resource['url']}: {result}")
+        elif result is not None:
+            changed.append(result)
+    logger.info(f"Abgleich: {len(resources)} Ressourcen, {len(changed)} geändert")
+    return changed
+
+
+def rebuild(paths: List[Path]) -> List[Path]:
+    """
+    Aktualisiert Cache und geteiltes Segment in data/processed für geänderte Migrations-CSVs
+    (laufende Server wechseln über den Zeiger auf die neue Version, siehe src/shared.py)
+
+    Dateien ohne unterstütztes Layout werden anhand der ersten Zeilen übersprungen (src.adapters),
+    ohne sie ganz zu lesen; Schreibfehler betreffen nur ihren Datensatz.
+
+    Returns:
+        Pfade der neu geparsten Dateien
+    """
+    from src.adapters import detect
+    from src.shared import publish
+
+    rebuilt = []
+    for path in paths:
+        if path.suffix.lower() != '.csv':
+            continue
+        try:
+            detect(path)
+            publish(path)
+            rebuilt.append(path)
+        except ValueError as e:
+            logger.info(f"Kein Migrationsdatensatz, übersprungen: {path.name} ({e})")
+        except OSError as e:
+            # z.B. data/processed nicht beschreibbar: nur dieser Datensatz fehlt, der Rest wird aufgebaut
+            logger.error(f"Neuaufbau fehlgeschlagen: {path.name}: {e}")
+    return rebuilt
+
+
+def refresh(datasets: Optional[List[str]] = None, base_url: str = CKAN_URL, raw_dir: Path = RAW_DIR,
+            concurrency: int = DEFAULT_CONCURRENCY) -> List[Path]:
+    """Abgleich und Neuaufbau nur der geänderten Dateien (synchroner Einstieg)"""
+    changed = asyncio.run(sync(datasets, base_url, raw_dir, concurrency))
+    return rebuild(changed) if changed else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rohdaten mit dem CKAN-Portal abgleichen")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--dataset', action='append', help="Name eines Datensatzes (mehrfach möglich)")
+    group.add_argument('--all', action='store_true', help="alle Datensätze des Portals")
+    parser.add_argument('--base-url', default=CKAN_URL, help=f"CKAN-Portal (Standard: {CKAN_URL})")
+    parser.add_argument('--raw-dir', type=Path, default=RAW_DIR, help="Zielverzeichnis (Standard: data/raw)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    rebuilt = refresh(None if args.all else args.dataset, args.base_url, args.raw_dir, args.concurrency)
+    print(f"Neu aufgebaut: {[path.name for path in rebuilt] or 'nichts'}")
+
+
+if __name__ == '__main__':
+    main()
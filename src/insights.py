@@ -0,0 +1,221 @@
+"""
+Automatisch berechnete Erkenntnisse aus den Migrationsdaten
+Z-Scores, Sprünge zum Vorjahr, gleitende Trends und größte Saldo-Effekte in einem vektorisierten
+Durchlauf über alle Länder × Jahre (keine Schleife pro Land)
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from src.cube import MigrationCube
+from src.instrumentation import span
+from src.rankings import top_k
+
+logger = logging.getLogger(__name__)
+
+# Reihen je Land: Zuzug, Wegzug und Saldo (Zuzug - Wegzug)
+SERIES = ('Zuzug', 'Wegzug', 'Saldo')
+
+# Ab diesem Betrag des Z-Scores gilt ein Jahr als auffällig
+Z_THRESHOLD = 2.5
+
+# Mindestabweichung in Personen, damit kleine Reihen (0, 0, 3, 0, ...) nicht dominieren
+MIN_EFFECT = 100
+
+# Jahre im Fenster der gleitenden Trends
+TREND_WINDOW = 5
+
+# Einträge je Kategorie
+DEFAULT_PER_CATEGORY = 3
+
+# Erkenntnis: Kategorie, Text und die zugrunde liegenden Werte (Land, Jahr, Wert)
+Insight = Dict[str, object]
+
+
+def rolling_slope(values: np.ndarray, window: int, axis: int = 0) -> np.ndarray:
+    """
+    Steigung der Regressionsgeraden über gleitende Fenster entlang einer Achse (pro Jahr)
+
+    Die Fenster sind Sichten auf das Array (sliding_window_view); die Steigung ist ein
+    Skalarprodukt mit den zentrierten Zeitpunkten, für alle Reihen gleichzeitig.
+
+    Returns:
+        Array, in dem die Achse die Länge n - window + 1 hat (Fenster endet beim jeweils letzten Jahr)
+    """
+    t = np.arange(window) - (window - 1) / 2
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=axis)
+    return windows @ (t / (t @ t))
+
+
+class SeriesAnalysis:
+    """
+    Kennzahlen aller Reihen über die Jahre, in einem Durchlauf berechnet
+
+    Alle Arrays haben die Form (Reihe, Jahr, Spalte) mit Reihe in SERIES und allen Spalten des
+    Würfels; fehlende Werte zählen als 0. Sammelspalten sind nur in mask ausgeschlossen
+    (ein Auswahl-Index über die letzte Achse würde das ganze Array kopieren).
+    """
+
+    def __init__(self, cube: MigrationCube, window: int = TREND_WINDOW):
+        self.years = list(cube.years)
+        self.mask = cube.country_mask()
+        self.window = window
+        n = len(self.years)
+        with span('series_analysis', cells=int(cube.values.size // 2 * len(SERIES))):
+            block = np.nan_to_num(cube.values)
+            self.values = np.empty((len(SERIES),) + block.shape[::2])
+            self.values[0], self.values[1] = block[:, 0], block[:, 1]
+            np.subtract(self.values[0], self.values[1], out=self.values[2])
+
+            total = self.values.sum(axis=1, keepdims=True)
+            self.std = self.values.std(axis=1, keepdims=True)
+            # Mittel der übrigen Jahre als "Normalwert" eines Jahres
+            self.mean_others = (total - self.values) / max(n - 1, 1)
+            self.deviation = self.values - self.mean_others
+            self.jumps = np.diff(self.values, axis=1)
+            self.trend = rolling_slope(self.values, window, axis=1) if n >= window else None
+
+    def zscore_exceeds(self, series: slice, threshold: float) -> np.ndarray:
+        """
+        |Z-Score| >= threshold, ohne den Z-Score für alle Zellen zu berechnen
+
+        Die Abweichung vom Mittel der übrigen Jahre ist n/(n-1) mal die Abweichung vom
+        Gesamtmittel, der Vergleich geht daher direkt über deviation und std.
+        """
+        n = len(self.years)
+        std = self.std[series]
+        return (np.abs(self.deviation[series]) * (n - 1) / n >= threshold * std) & (std > 0)
+
+    def zscore(self, series: int, year: int, column: int) -> float:
+        n = len(self.years)
+        std = self.std[series, 0, column]
+        return float(self.deviation[series, year, column] * (n - 1) / n / std) if std > 0 else 0.0
+
+
+def _top_cells(score: np.ndarray, k: int) -> List[Tuple[int, ...]]:
+    """Indizes (je Achse) der k größten positiven Werte eines Arrays, absteigend"""
+    flat = score.ravel()
+    candidates = np.flatnonzero(flat > 0)
+    order = candidates[top_k(flat[candidates], k)]
+    return [tuple(int(i) for i in np.unravel_index(pos, score.shape)) for pos in order]
+
+
+def _number(value: float, signed: bool = False, decimals: int = 0) -> str:
+    """Zahl im deutschen Format (1.478 bzw. +1.253; Dezimalkomma)"""
+    text = f"{value:{'+' if signed else ''},.{decimals}f}"
+    return text.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def _insight(kind: str, category: str, text: str, country: Optional[str] = None,
+             year: Optional[int] = None, value: Optional[float] = None) -> Insight:
+    return {'Art': kind, 'Kategorie': category, 'Text': text, 'Land': country, 'Jahr': year,
+            'Wert': None if value is None else float(value)}
+
+
+def build_insights(cube: MigrationCube, names: Sequence[str],
+                   per_category: int = DEFAULT_PER_CATEGORY) -> List[Insight]:
+    """
+    Erkenntnisse in Anzeigereihenfolge
+
+    Args:
+        names: Anzeigenamen je Spalte des Würfels
+        per_category: höchstens so viele Einträge je Kategorie
+
+    Returns:
+        Liste von Dicts mit Art ('saldo_effect', 'anomaly', 'jump', 'trend', 'top', 'overall'),
+        Kategorie (Überschrift), Text (Markdown), Land, Jahr, Wert
+    """
+    years = list(cube.years)
+    if len(years) < 2:
+        return []
+    analysis = SeriesAnalysis(cube)
+    name = list(names)
+    # Sammelspalten erhalten in allen Auswahlen den Wert 0
+    mask = analysis.mask
+    zuzug, wegzug, saldo = range(len(SERIES))
+    insights: List[Insight] = []
+    seen = set()
+
+    with span('build_insights', countries=int(mask.sum()), years=len(years)):
+        # Größte Einzeljahreseffekte: Abweichung des Saldos vom Mittel der übrigen Jahre
+        category = "Größte Einzeljahreseffekte (Saldo)"
+        effect = np.abs(analysis.deviation[saldo])
+        for y, c in _top_cells(np.where((effect >= MIN_EFFECT) & mask, effect, 0.0), per_category):
+            seen.add((c, y))
+            value = analysis.values[saldo, y, c]
+            insights.append(_insight('saldo_effect', category, (
+                f"**{name[c]} {years[y]}:** Saldo {_number(value, True)} "
+                f"({_number(analysis.values[zuzug, y, c])} Zuzug − {_number(analysis.values[wegzug, y, c])} Wegzug), "
+                f"in den übrigen Jahren Ø {_number(analysis.mean_others[saldo, y, c], True)}"
+            ), name[c], years[y], value))
+
+        # Auffällige Jahre: |Z-Score| über der Schwelle, sortiert nach der Abweichung in Personen
+        category = f"Auffällige Jahre (|z| ≥ {_number(Z_THRESHOLD, decimals=1)})"
+        flows = slice(zuzug, wegzug + 1)
+        deviation = np.abs(analysis.deviation[flows])
+        outlier = analysis.zscore_exceeds(flows, Z_THRESHOLD) & (deviation >= MIN_EFFECT) & mask
+        candidates = [(s, y, c) for s, y, c in _top_cells(np.where(outlier, deviation, 0.0), per_category + len(seen))
+                      if (c, y) not in seen]
+        for s, y, c in candidates[:per_category]:
+            value = analysis.values[s, y, c]
+            insights.append(_insight('anomaly', category, (
+                f"**{name[c]} {years[y]}:** {_number(value)} {('Zuzüge', 'Wegzüge')[s]}, "
+                f"z = {_number(analysis.zscore(s, y, c), decimals=1)} "
+                f"(übrige Jahre Ø {_number(analysis.mean_others[s, y, c])})"
+            ), name[c], years[y], value))
+
+        # Größte Sprünge zum Vorjahr bei Zuzug und Wegzug
+        category = "Größte Sprünge zum Vorjahr"
+        jumps = analysis.jumps[flows]
+        for s, y, c in _top_cells(np.abs(jumps) * mask, per_category):
+            before, after = analysis.values[s, y, c], analysis.values[s, y + 1, c]
+            insights.append(_insight('jump', category, (
+                f"**{name[c]}:** {SERIES[s]} {years[y]} → {years[y + 1]} von {_number(before)} auf "
+                f"{_number(after)} ({_number(jumps[s, y, c], True)})"
+            ), name[c], years[y + 1], jumps[s, y, c]))
+
+        # Trends im letzten Fenster: stärkster Anstieg und stärkster Rückgang des Saldos
+        if analysis.trend is not None:
+            window = f"{years[-analysis.window]}-{years[-1]}"
+            category = f"Trends {window} (Saldo, Steigung pro Jahr)"
+            slope = np.where(mask, analysis.trend[saldo, -1], np.nan)
+            # Ohne Steigung in einem Land (nur Sammelspalten oder Lücken im Fenster) entfallen die Länder-Trends
+            if not np.isnan(slope).all():
+                for c, label in ((int(np.nanargmax(slope)), "stärkster Anstieg"),
+                                 (int(np.nanargmin(slope)), "stärkster Rückgang")):
+                    insights.append(_insight('trend', category, (
+                        f"**{name[c]}:** {_number(slope[c], True, 1)} pro Jahr ({label})"
+                    ), name[c], years[-1], slope[c]))
+            totals_slope = rolling_slope(cube.totals(), analysis.window)[-1]
+            insights.append(_insight('trend', category, (
+                f"**Gesamt:** Zuzug {_number(totals_slope[0], True, 1)}, "
+                f"Wegzug {_number(totals_slope[1], True, 1)} pro Jahr"
+            ), None, years[-1], totals_slope[0] - totals_slope[1]))
+
+        # Wichtigste Herkunfts- und Zielgebiete im letzten Jahr, mit Vorjahr
+        category = f"Wichtigste Herkunfts- und Zielgebiete {years[-1]}"
+        for s, label in ((zuzug, "Meiste Zuzüge aus"), (wegzug, "Meiste Wegzüge nach")):
+            top = top_k(np.where(mask, analysis.values[s, -1], -np.inf), per_category)
+            ranked = ', '.join(
+                f"{name[c]} {_number(analysis.values[s, -1, c])} ({years[-2]}: {_number(analysis.values[s, -2, c])})"
+                for c in top
+            )
+            insights.append(_insight('top', category, f"**{label}:** {ranked}",
+                                     name[top[0]], years[-1], analysis.values[s, -1, top[0]]))
+
+        # Gesamtentwicklung über alle Spalten
+        category = "Gesamtentwicklung"
+        totals = cube.totals()
+        low, high = int(np.argmin(totals[:, 0])), int(np.argmax(totals[:, 0]))
+        insights.append(_insight('overall', category, (
+            f"Zuzüge insgesamt zwischen {_number(totals[low, 0])} ({years[low]}) und "
+            f"{_number(totals[high, 0])} ({years[high]}) pro Jahr"
+        ), None, years[high], totals[high, 0]))
+        positive = int((totals[:, 0] - totals[:, 1] > 0).sum())
+        insights.append(_insight('overall', category, (
+            f"Saldo in {positive} von {len(years)} Jahren positiv"
+        ), None, None, positive))
+
+    logger.info(f"{len(insights)} Erkenntnisse aus {int(mask.sum())} Ländern × {len(years)} Jahren")
+    return insights
@@ -0,0 +1,85 @@
+"""
+Laufzeitmessung der einzelnen Verarbeitungsstufen
+Spans mit Dauer und Zählern, verteilt an austauschbare Hooks (Callback) und als JSON-Logzeilen
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, object]
+
+_hooks: List[Callable[[Event], None]] = []
+_local = threading.local()
+
+
+def add_hook(hook: Callable[[Event], None]):
+    """Registriert einen Callback, der jedes abgeschlossene Span-Ereignis erhält"""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[Event], None]):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def log_json(event: Event):
+    """Standard-Hook: schreibt jedes Ereignis als JSON-Zeile (Level DEBUG)"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps(event, ensure_ascii=False, default=str))
+
+
+add_hook(log_json)
+
+
+def _emit(event: Event):
+    for hook in list(_hooks):
+        try:
+            hook(event)
+        except Exception as e:
+            logger.warning(f"Instrumentierungs-Hook fehlgeschlagen: {e}")
+    for collector in getattr(_local, 'collectors', ()):
+        collector.append(event)
+
+
+@contextmanager
+def span(name: str, **counts) -> Iterator[Event]:
+    """
+    Misst die Dauer eines Blocks
+
+    Zähler können beim Aufruf übergeben oder im Block gesetzt werden:
+
+        with span('numeric_coercion', cells=n) as s:
+            ...
+            s['failed'] = failed
+
+    Args:
+        name: Name der Stufe, z.B. 'csv_read' oder 'top_n_ranking'
+    """
+    event: Event = {'span': name, **counts}
+    start = time.perf_counter()
+    try:
+        yield event
+    finally:
+        event['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        _emit(event)
+
+
+@contextmanager
+def collect() -> Iterator[List[Event]]:
+    """Sammelt alle Ereignisse des aktuellen Threads (z.B. eines Streamlit-Reruns) in einer Liste"""
+    events: List[Event] = []
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    _local.collectors.append(events)
+    try:
+        yield events
+    finally:
+        # nach Identität entfernen: verschachtelte Sammler können gleiche Inhalte haben
+        _local.collectors = [collector for collector in _local.collectors if collector is not events]
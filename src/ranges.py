@@ -0,0 +1,75 @@
+"""
+Präfixsummen-Index für Jahresbereiche
+Beantwortet Summe, Mittelwert und Saldo über beliebige Zeiträume [von, bis] in konstanter Zeit
+"""
+
+import numpy as np
+from typing import Tuple
+import logging
+
+from src.cube import MigrationCube
+from src.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+
+class RangeIndex:
+    """
+    Kumulierte Summen je (Richtung, Land) über die Jahresachse
+
+    cumulative[k] enthält die Summe der ersten k Jahre, die Summe über die Jahre
+    i..j-1 ist damit cumulative[j] - cumulative[i]. Fehlende Werte zählen als 0.
+    """
+
+    def __init__(self, cube: MigrationCube):
+        self.years = np.asarray(cube.years, dtype=int)
+        if cube.prefix_sums is not None:
+            # Aus dem geteilten Segment (memory-mapped), keine eigene Kopie pro Prozess
+            self.cumulative, self.cumulative_totals = cube.prefix_sums
+            return
+        with span('range_index', cells=int(cube.values.size)):
+            filled = np.nan_to_num(cube.values)
+            self.cumulative = np.zeros((len(self.years) + 1,) + filled.shape[1:])
+            np.cumsum(filled, axis=0, out=self.cumulative[1:])
+            # Zusätzlich über alle Spalten summiert, für Gesamtsummen in O(1)
+            self.cumulative_totals = self.cumulative.sum(axis=2)
+
+    def bounds(self, year_from: int, year_to: int) -> Tuple[int, int]:
+        """
+        Positionen [start, stop) der Jahre im Bereich (Lücken in der Jahresreihe sind erlaubt)
+
+        Raises:
+            ValueError: wenn year_from > year_to
+        """
+        if year_from > year_to:
+            raise ValueError(f"Ungültiger Zeitraum: {year_from} > {year_to}")
+        start = int(np.searchsorted(self.years, year_from, side='left'))
+        stop = int(np.searchsorted(self.years, year_to, side='right'))
+        return start, stop
+
+    def n_years(self, year_from: int, year_to: int) -> int:
+        """Anzahl vorhandener Jahre im Bereich"""
+        start, stop = self.bounds(year_from, year_to)
+        return stop - start
+
+    def sum(self, year_from: int, year_to: int) -> np.ndarray:
+        """Summen je Richtung und Land über den Bereich, Form (Richtung, Land)"""
+        start, stop = self.bounds(year_from, year_to)
+        return self.cumulative[stop] - self.cumulative[start]
+
+    def totals(self, year_from: int, year_to: int) -> np.ndarray:
+        """Summen über alle Spalten je Richtung im Bereich, Form (Richtung,)"""
+        start, stop = self.bounds(year_from, year_to)
+        return self.cumulative_totals[stop] - self.cumulative_totals[start]
+
+    def mean(self, year_from: int, year_to: int) -> np.ndarray:
+        """Mittelwert pro Jahr je Richtung und Land, Form (Richtung, Land); NaN bei leerem Bereich"""
+        n = self.n_years(year_from, year_to)
+        if n == 0:
+            return np.full(self.cumulative.shape[1:], np.nan)
+        return self.sum(year_from, year_to) / n
+
+    def saldo(self, year_from: int, year_to: int) -> np.ndarray:
+        """Migrationssaldo (Zuzug - Wegzug) je Land über den Bereich"""
+        total = self.sum(year_from, year_to)
+        return total[0] - total[1]
@@ -0,0 +1,249 @@
+"""
+Vorberechnete Top-N-Rankings pro Jahr und Länder-Rankings über den ganzen Zeitraum
+Auswahl per Teilsortierung (np.partition), Ergebnisse in einem begrenzten Cache
+"""
+
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from src.cache import CHART_CACHE_MB, LRUCache
+from src.cube import DIRECTIONS, MigrationCube
+from src.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+RANKING_DIRECTIONS = ('Zuzug', 'Wegzug', 'Saldo')
+DEFAULT_TOP_N = 10
+
+# Jahre pro Block bei der Berechnung der Top-N-Rankings
+RANKING_BLOCK_YEARS = 16
+
+# Kriterien für Länder-Rankings über alle Jahre: Name -> Beschriftung
+RANKING_CRITERIA = {
+    'max_abs_saldo': 'maximaler |Saldo| eines Jahres',
+    'cumulative_saldo': 'kumulierter Saldo (nach Betrag)',
+    'total_volume': 'Gesamtvolumen (Zuzug + Wegzug)',
+}
+DEFAULT_CRITERION = 'max_abs_saldo'
+
+# Ranking: Liste von (Spaltenposition im Würfel, Wert), absteigend sortiert
+Ranking = List[Tuple[int, float]]
+
+
+# Prozessweiter Cache, Schlüssel: (Jahres-Fingerprint, Jahr, Richtung, N, Kontinent)
+ranking_cache = LRUCache(name='rankings')
+
+# Fertige Grafiken und Tabellen, Schlüssel beginnen mit dem Fingerprint; begrenzt durch das Speicherbudget
+chart_cache = LRUCache(maxsize=1024, max_bytes=CHART_CACHE_MB * 2**20, name='charts')
+
+
+def top_k(score: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indizes der k größten Werte entlang der letzten Achse, absteigend sortiert
+
+    Statt alle Spalten zu sortieren wird per np.partition der k-größte Wert als Schwelle
+    bestimmt (O(n)), sortiert werden danach nur die k ausgewählten Einträge.
+    Gleichstand wird deterministisch aufgelöst: die kleinere Spaltenposition gewinnt,
+    auch an der Schwelle. Werte dürfen kein NaN enthalten.
+
+    Args:
+        score: Sortierwerte, Form (n,) oder (zeilen, n)
+        k: Anzahl (wird auf n begrenzt)
+
+    Returns:
+        Indizes, Form (k,) bzw. (zeilen, k)
+    """
+    rows = np.atleast_2d(score)
+    k = min(k, rows.shape[1])
+    if k <= 0:
+        return np.empty(score.shape[:-1] + (0,), dtype=np.intp)
+
+    threshold = -np.partition(-rows, k - 1, axis=1)[:, k - 1:k]
+    above = rows > threshold
+    at_threshold = rows == threshold
+    # An der Schwelle nur so viele Einträge (von links) nehmen, wie noch Plätze frei sind
+    free = k - above.sum(axis=1, keepdims=True)
+    chosen = above | (at_threshold & (np.cumsum(at_threshold, axis=1) <= free))
+
+    # np.nonzero liefert zeilenweise aufsteigende Spaltenpositionen, genau k pro Zeile
+    candidates = np.nonzero(chosen)[1].reshape(len(rows), k)
+    order = np.argsort(-np.take_along_axis(rows, candidates, axis=1), axis=1, kind='stable')
+    result = np.take_along_axis(candidates, order, axis=1)
+    return result if score.ndim > 1 else result[0]
+
+
+def _criterion_scores(cube: MigrationCube, criterion: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Sortierwert und angezeigter Wert je Land für ein Ranking-Kriterium über alle Jahre"""
+    if criterion == 'max_abs_saldo':
+        score = cube.max_abs_saldo()
+        return score, score
+    if criterion == 'cumulative_saldo':
+        shown = cube.column_sums('Zuzug') - cube.column_sums('Wegzug')
+        return np.abs(shown), shown
+    if criterion == 'total_volume':
+        shown = cube.column_sums('Zuzug') + cube.column_sums('Wegzug')
+        return shown, shown
+    raise ValueError(f"Unbekanntes Ranking-Kriterium '{criterion}', erwartet: {list(RANKING_CRITERIA)}")
+
+
+def rank_countries(cube: MigrationCube, k: int, criterion: str = DEFAULT_CRITERION,
+                   continent: Optional[str] = None) -> Ranking:
+    """
+    Top-k Länder über den ganzen Zeitraum nach einem Kriterium aus RANKING_CRITERIA
+
+    Sammelspalten werden ausgeschlossen, bei Gleichstand entscheidet die Spaltenreihenfolge.
+
+    Returns:
+        [(spaltenposition, wert), ...], absteigend nach Sortierwert
+    """
+    score, shown = _criterion_scores(cube, criterion)
+    columns = _ranking_columns(cube, continent)
+    with span('top_k_selection', criterion=criterion, k=k, columns=len(columns)):
+        positions = columns[top_k(score[columns], k)]
+    return [(int(pos), float(shown[pos])) for pos in positions]
+
+
+def _ranking_matrix(block: np.ndarray, direction: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sortierwert und angezeigter Wert je (Jahr, Land) für eine Ranking-Richtung.
+    block: Ausschnitt von values (Jahr, Richtung, Land), fehlende Werte als 0.
+    Saldo wird nach Betrag sortiert, angezeigt wird der vorzeichenbehaftete Wert.
+    """
+    if direction == 'Saldo':
+        shown = block[:, 0] - block[:, 1]
+        return np.abs(shown), shown
+    shown = block[:, DIRECTIONS.index(direction)]
+    return shown, shown
+
+
+def _ranking_columns(cube: MigrationCube, continent: Optional[str]) -> np.ndarray:
+    """Spaltenpositionen der zu rankenden Länder, optional auf einen Kontinent beschränkt"""
+    mask = cube.country_mask()
+    if continent is not None:
+        if continent not in cube.continent_names():
+            raise ValueError(f"Unbekannter Kontinent '{continent}', verfügbar: {cube.continent_names()}")
+        mask = mask & (cube.continent_codes() == cube.continent_names().index(continent))
+    return np.flatnonzero(mask)
+
+
+def compute_rankings(cube: MigrationCube, top_n: int = DEFAULT_TOP_N,
+                     years: Optional[List[int]] = None,
+                     continent: Optional[str] = None) -> Dict[Tuple[int, str], Ranking]:
+    """
+    Berechnet die Top-N-Rankings für alle (oder die angegebenen) Jahre und Richtungen in einem Durchlauf
+
+    Sammelspalten werden ausgeschlossen, nur Werte mit Sortierwert > 0 werden gerankt.
+    Bei Gleichstand entscheidet die Spaltenreihenfolge. Mit continent werden nur Länder
+    dieses Kontinents gerankt.
+
+    Returns:
+        Dict {(jahr, richtung): [(spaltenposition, wert), ...]}
+    """
+    years = list(cube.years) if years is None else years
+    columns = _ranking_columns(cube, continent)
+    rankings = {}
+    # Jahre in Blöcken: Zwischenarrays bleiben unabhängig von der Zahl der Jahre klein
+    # (wichtig für gemappte Segmente, siehe src/shared.py)
+    for start in range(0, len(years), RANKING_BLOCK_YEARS):
+        block_years = years[start:start + RANKING_BLOCK_YEARS]
+        block = np.nan_to_num(cube.values[[cube.year_position(year) for year in block_years]])
+        for (i, direction), ranking in rank_block(block, columns, top_n).items():
+            rankings[(block_years[i], direction)] = ranking
+    return rankings
+
+
+def rank_block(block: np.ndarray, columns: np.ndarray, top_n: int) -> Dict[Tuple[int, str], Ranking]:
+    """
+    Top-N-Rankings aller Jahre eines Ausschnitts von values, eine Teilsortierung je Richtung
+
+    Args:
+        block: Ausschnitt (Jahr, Richtung, Land), fehlende Werte als 0
+        columns: zu rankende Spaltenpositionen
+
+    Returns:
+        Dict {(zeile im Block, richtung): [(spaltenposition, wert), ...]}
+    """
+    rankings = {}
+    for direction in RANKING_DIRECTIONS:
+        score, shown = _ranking_matrix(block, direction)
+        score = score[:, columns]
+        order = top_k(score, top_n)
+        top_scores = np.take_along_axis(score, order, axis=1)
+        for i in range(len(block)):
+            positions = columns[order[i][top_scores[i] > 0]]
+            rankings[(i, direction)] = [(int(pos), float(shown[i, pos])) for pos in positions]
+    return rankings
+
+
+def get_top_n(cube: MigrationCube, year: int, direction: str,
+              top_n: int = DEFAULT_TOP_N, cache: LRUCache = ranking_cache,
+              continent: Optional[str] = None) -> Ranking:
+    """
+    Top-N-Ranking für Jahr und Richtung aus dem Cache.
+    Bei einem Fehlschlag werden alle Jahre für dieses N in einem Durchlauf nachberechnet.
+    """
+    if direction not in RANKING_DIRECTIONS:
+        raise ValueError(f"Unbekannte Richtung '{direction}', erwartet: {RANKING_DIRECTIONS}")
+
+    if cube.year_position(year) is None:
+        return []
+    key = (cube.year_fingerprint(year), year, direction, top_n, continent)
+    ranking = cache.get(key)
+    if ranking is None:
+        warm_rankings(cube, top_n, cache, continent=continent)
+        ranking = cache.get(key)
+    if ranking is None:
+        # Cache kleiner als alle Jahre: der Eintrag wurde beim Vorberechnen schon wieder verdrängt
+        ranking = compute_rankings(cube, top_n, [year], continent)[(year, direction)]
+        cache.put(key, ranking)
+    return ranking
+
+
+def refresh_rankings(cube: MigrationCube, years: List[int], stale: Iterable[str], top_n: int = DEFAULT_TOP_N,
+                     cache: LRUCache = ranking_cache) -> int:
+    """
+    Ersetzt nach einer Änderung (append_rows) die Rankings der betroffenen Jahre
+
+    Entfernt die Einträge mit den alten Jahres-Fingerprints und berechnet für jedes N und
+    jeden Kontinent, die darunter vorkamen (mindestens top_n ohne Kontinent), die Jahre neu.
+
+    Args:
+        years: betroffene Jahre
+        stale: Fingerprints dieser Jahre vor der Änderung
+
+    Returns:
+        Anzahl entfernter Einträge
+    """
+    stale = set(stale)
+    removed = cache.invalidate(lambda key: key[0] in stale)
+    variants = {(top_n, None)} | {(key[3], key[4]) for key in removed}
+    for n, continent in sorted(variants, key=lambda variant: (variant[0], variant[1] or '')):
+        warm_rankings(cube, n, cache, years=years, continent=continent)
+    return len(removed)
+
+
+def warm_rankings(cube: MigrationCube, top_n: int = DEFAULT_TOP_N, cache: LRUCache = ranking_cache,
+                  years: Optional[List[int]] = None, continent: Optional[str] = None):
+    """
+    Füllt den Cache mit den Rankings für ein N
+
+    Args:
+        years: nur diese Jahre berechnen (z.B. nach append_rows); Standard: alle Jahre,
+            deren Rankings nicht (mehr) vollständig im Cache liegen
+        continent: nur Länder dieses Kontinents ranken
+    """
+    if years is None:
+        # Jeder Schlüssel einzeln: einzelne Jahre können aus dem LRU-Cache verdrängt worden sein
+        years = [
+            year for year in cube.years
+            if any((cube.year_fingerprint(year), year, direction, top_n, continent) not in cache
+                   for direction in RANKING_DIRECTIONS)
+        ]
+        if not years:
+            return
+    with span('top_n_ranking', top_n=top_n, years=len(years), continent=continent):
+        rankings = compute_rankings(cube, top_n, years, continent)
+    for (year, direction), ranking in rankings.items():
+        cache.put((cube.year_fingerprint(year), year, direction, top_n, continent), ranking)
+    logger.info(f"Top-{top_n}-Rankings vorberechnet: {len(rankings)} Einträge")
@@ -0,0 +1,286 @@
+"""
+Schema-basiertes Einlesen der Migrations-CSV
+Schlüssel-, Zahlen- und Quellspalte sind deklariert; Zahlen werden beim Lesen typisiert
+(Dezimalkomma, Fehlwert-Markierungen) und je Spalte in einem Datenqualitätsbericht gezählt
+"""
+
+import csv
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+import logging
+
+from src.cube import CubeBuilder, MigrationCube, CONTINENT_KEY, KEY_COL, KEY_PATTERN, MISSING_MARKERS, SOURCE_COL
+from src.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationSchema:
+    """
+    Deklaration der Spalten einer Migrations-CSV
+
+    Args:
+        key: Schlüsselspalte ('2023_ Zuzug', 'Kontinent', ...)
+        source: Quellspalte (Text, optional in der Datei)
+        numeric: Zahlenspalten; None = alle übrigen Spalten der Kopfzeile
+        missing_markers: Zellinhalte, die als fehlender Wert gelten
+        decimal: Dezimaltrennzeichen
+        thousands: Tausendertrennzeichen (z.B. '.' in '1.234,5'), None = keines
+        key_pattern: Regex der Datenzeilen in der Schlüsselspalte (Gruppen year und direction)
+        metadata_key: Schlüssel der Metadatenzeile mit den Kontinenten
+        directions: Richtungsbezeichnungen der Datei -> Eintrag aus DIRECTIONS, None = wie in DIRECTIONS
+        delimiter: Spaltentrennzeichen
+        encoding: Zeichenkodierung der Datei
+
+    Abweichende Layouts anderer Tabellen erkennt src.adapters und liefert das passende Schema.
+    """
+
+    def __init__(self, key: str = KEY_COL, source: str = SOURCE_COL, numeric: Optional[List[str]] = None,
+                 missing_markers: Tuple[str, ...] = MISSING_MARKERS, decimal: str = ',', thousands: Optional[str] = None,
+                 key_pattern: str = KEY_PATTERN, metadata_key: str = CONTINENT_KEY,
+                 directions: Optional[Dict[str, str]] = None, delimiter: str = ';', encoding: str = 'utf-8'):
+        self.key = key
+        self.source = source
+        self.numeric = numeric
+        self.missing_markers = missing_markers
+        self.decimal = decimal
+        self.thousands = thousands
+        self.key_pattern = key_pattern
+        self.metadata_key = metadata_key
+        self.directions = directions
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+    def resolve(self, header: List[str]) -> Tuple[List[str], bool]:
+        """
+        Zahlenspalten in Dateireihenfolge und ob die Quellspalte vorhanden ist
+
+        Raises:
+            ValueError: wenn die Schlüsselspalte oder deklarierte Zahlenspalten fehlen
+        """
+        if self.key not in header:
+            raise ValueError(f"Spalte '{self.key}' fehlt - keine Migrationsdaten")
+        if self.numeric is None:
+            numeric = [col for col in header if col not in (self.key, self.source)]
+        else:
+            missing = [col for col in self.numeric if col not in header]
+            if missing:
+                raise ValueError(f"Deklarierte Zahlenspalten fehlen in der Datei: {missing}")
+            numeric = [col for col in header if col in self.numeric]
+        return numeric, self.source in header
+
+    def builder(self) -> CubeBuilder:
+        """CubeBuilder für dieses Layout"""
+        return CubeBuilder(self.key, self.source, self.key_pattern, self.metadata_key, self.directions, self.thousands)
+
+    def read_options(self, numeric: List[str], has_source: bool) -> Dict[str, object]:
+        """Optionen für pd.read_csv: Typen, Fehlwerte und Dezimalzeichen je Spalte"""
+        text_columns = [self.key] + ([self.source] if has_source else [])
+        return {
+            'sep': self.delimiter,
+            'encoding': self.encoding,
+            'usecols': text_columns + numeric,
+            'dtype': {col: str for col in text_columns},
+            # Für alle Spalten gleich (eine Liste ist beim Lesen breiter Dateien deutlich schneller
+            # als ein Dict pro Spalte); leere Quellen werden dadurch ebenfalls NaN
+            'na_values': list(self.missing_markers),
+            'keep_default_na': False,
+            'decimal': self.decimal,
+            'thousands': self.thousands,
+        }
+
+
+class QualityReport:
+    """
+    Datenqualitätsbericht des Einlesens
+
+    Je Zahlenspalte: gelesene Werte, als fehlend umgewandelte Markierungen ('-', 'nan', leer)
+    und abgelehnte Zellen (kein Zahlenwert, werden NaN).
+    """
+
+    COLUMNS = ['Spalte', 'Werte', 'Fehlend', 'Abgelehnt']
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.values = np.zeros(len(columns), dtype=np.int64)
+        self.missing = np.zeros(len(columns), dtype=np.int64)
+        self.rejected = np.zeros(len(columns), dtype=np.int64)
+        self.data_rows = 0
+        self.metadata_rows = 0
+        self.ignored_rows = 0
+
+    def add_block(self, missing: np.ndarray, rejected: np.ndarray, rows: int):
+        """Zählt einen typisierten Block (Arrays in Spaltenreihenfolge)"""
+        self.missing += missing
+        self.rejected += rejected
+        self.values += rows - missing - rejected
+        self.data_rows += rows
+
+    @property
+    def coerced(self) -> int:
+        return int(self.missing.sum())
+
+    @property
+    def rejected_total(self) -> int:
+        return int(self.rejected.sum())
+
+    def to_frame(self) -> pd.DataFrame:
+        """Bericht je Spalte als Tabelle, Spalten mit abgelehnten Zellen zuerst"""
+        frame = pd.DataFrame({
+            'Spalte': self.columns,
+            'Werte': self.values,
+            'Fehlend': self.missing,
+            'Abgelehnt': self.rejected,
+        }, columns=self.COLUMNS)
+        return frame.sort_values('Abgelehnt', ascending=False, kind='stable').reset_index(drop=True)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            'data_rows': self.data_rows,
+            'metadata_rows': self.metadata_rows,
+            'ignored_rows': self.ignored_rows,
+            'coerced': self.coerced,
+            'rejected': self.rejected_total,
+        }
+
+
+def _type_block(chunk: pd.DataFrame, numeric: List[str], schema: MigrationSchema,
+                report: QualityReport) -> pd.DataFrame:
+    """
+    Bringt die Zahlenspalten eines gelesenen Blocks in einem Schritt nach float64 und zählt Fehlwerte
+
+    Der CSV-Parser hat Dezimalkommas und Markierungen bereits umgewandelt; nur Spalten mit
+    nicht interpretierbaren Zellen kommen als Text an und werden hier einzeln nachbehandelt.
+    Die Zahlenspalten liegen danach als ein float64-Block vor, den der CubeBuilder ohne
+    weitere Umwandlung übernimmt.
+    """
+    rejected = np.zeros(len(numeric), dtype=np.int64)
+    dtypes = chunk.dtypes
+    for pos, col in enumerate(numeric):
+        if pd.api.types.is_numeric_dtype(dtypes[col]):
+            continue
+        text = chunk[col].astype('string').str.strip()
+        digits = text.str.replace(schema.thousands, '', regex=False) if schema.thousands else text
+        numbers = pd.to_numeric(digits.str.replace(schema.decimal, '.', regex=False), errors='coerce')
+        bad = numbers.isna() & text.notna() & ~text.isin(schema.missing_markers)
+        rejected[pos] = int(bad.sum())
+        if rejected[pos]:
+            logger.warning(f"Spalte '{col}': {rejected[pos]} Zellen ohne Zahlenwert, z.B. {text[bad].iloc[0]!r}")
+        chunk[col] = numbers.astype('float64')
+
+    block = chunk[numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+    report.add_block(np.isnan(block).sum(axis=0) - rejected, rejected, len(chunk))
+    typed = pd.DataFrame(block, columns=numeric, index=chunk.index)
+    for col in chunk.columns.difference(numeric, sort=False):
+        typed.insert(0 if col == schema.key else len(typed.columns), col, chunk[col])
+    return typed
+
+
+def _read_row(f: BinaryIO, schema: MigrationSchema) -> Optional[List[str]]:
+    """Nächste Dateizeile als Zellen (leere Liste für Leerzeilen), None am Dateiende"""
+    line = f.readline()
+    if not line:
+        return None
+    return next(csv.reader([line.decode(schema.encoding)], delimiter=schema.delimiter), [])
+
+
+def _split_block(chunk: pd.DataFrame, numeric: List[str], schema: MigrationSchema, builder: CubeBuilder,
+                 report: QualityReport) -> Iterator[Tuple[pd.DataFrame, QualityReport]]:
+    """
+    Trennt einen gelesenen Block über die Schlüssel-Regex des CubeBuilder in Metadaten- und Datenzeilen
+
+    Metadatenzeilen ('Kontinent') werden als Text geliefert, Datenzeilen typisiert; alle
+    übrigen Zeilen werden nur im Bericht gezählt.
+    """
+    is_data, is_metadata = builder.classify_rows(chunk[schema.key])
+    report.metadata_rows += int(is_metadata.sum())
+    report.ignored_rows += int((~is_data & ~is_metadata).sum())
+    if is_metadata.any():
+        yield chunk[is_metadata], report
+    if is_data.any():
+        data = chunk if is_data.all() else chunk[is_data].copy()
+        yield _type_block(data, numeric, schema, report), report
+
+
+def iter_typed_chunks(source: Path, schema: Optional[MigrationSchema] = None,
+                      chunksize: Optional[int] = None) -> Iterator[Tuple[pd.DataFrame, QualityReport]]:
+    """
+    Liest die Zeilen einer Migrations-CSV in einem Durchlauf typisiert, ganz oder in Blöcken
+
+    Die Zeilen vor der ersten Datenzeile (Metadatenzeile 'Kontinent') werden als Text gelesen
+    und als erster Block geliefert (ohne Typisierung); ab der ersten Datenzeile liest pandas
+    aus derselben Datei weiter. Jeder Block wird über die Schlüssel-Regex des CubeBuilder in
+    Metadaten- und Datenzeilen aufgeteilt, weitere Blöcke enthalten nur Datenzeilen.
+
+    Yields:
+        (Block, laufender Qualitätsbericht)
+    """
+    schema = schema or MigrationSchema()
+    builder = schema.builder()
+    with open(source, 'rb') as f:
+        header = _read_row(f, schema) or []
+        numeric, has_source = schema.resolve(header)
+        report = QualityReport(numeric)
+        options = schema.read_options(numeric, has_source)
+        key_pos = header.index(schema.key)
+
+        # Zeilen vor der ersten Datenzeile zeilenweise, danach liest pandas ab dieser Position
+        prefix = []
+        while True:
+            start = f.tell()
+            row = _read_row(f, schema)
+            if row is None:
+                break
+            if key_pos < len(row) and builder.is_data_key(row[key_pos]):
+                f.seek(start)
+                break
+            if row:
+                prefix.append((row + [''] * len(header))[:len(header)])
+        if prefix:
+            used = set(options['usecols'])
+            columns = [pos for pos, col in enumerate(header) if col in used]
+            frame = pd.DataFrame(np.array(prefix, dtype=object)[:, columns], columns=[header[pos] for pos in columns])
+            yield from _split_block(frame, numeric, schema, builder, report)
+        if row is None:
+            yield _type_block(pd.DataFrame(columns=options['usecols']).astype(options['dtype']),
+                              numeric, schema, report), report
+            return
+
+        reader = pd.read_csv(f, header=None, names=header, chunksize=chunksize, **options)
+        if chunksize is None:
+            yield from _split_block(reader, numeric, schema, builder, report)
+            return
+        with reader:
+            for chunk in reader:
+                yield from _split_block(chunk, numeric, schema, builder, report)
+
+
+def read_typed(source: Path, schema: Optional[MigrationSchema] = None,
+               chunksize: Optional[int] = None, builder: Optional[CubeBuilder] = None) -> MigrationCube:
+    """
+    Liest eine Migrations-CSV über das Schema und baut den Würfel
+
+    Der Qualitätsbericht hängt als cube.quality am Ergebnis.
+
+    Args:
+        source: Pfad zur CSV-Datei (Semikolon-getrennt)
+        schema: Spaltendeklaration, Standard: MigrationSchema()
+        chunksize: wenn gesetzt, Zeilen pro Block (für große Dateien)
+        builder: Builder mit dem Layout des Schemas (z.B. src.streaming.StreamingBuilder), Standard: schema.builder()
+    """
+    schema = schema or MigrationSchema()
+    builder = builder or schema.builder()
+    report = None
+    with span('csv_read', path=Path(source).name, chunksize=chunksize) as event:
+        for chunk, report in iter_typed_chunks(source, schema, chunksize):
+            builder.add_chunk(chunk)
+        event['rows'] = report.data_rows
+        event['columns'] = len(report.columns)
+        event.update(coerced=report.coerced, rejected=report.rejected_total)
+    cube = builder.build()
+    cube.quality = report
+    if report.rejected_total:
+        logger.warning(f"{report.rejected_total} Zellen ohne Zahlenwert in {Path(source).name}")
+    return cube
@@ -0,0 +1,215 @@
+"""
+Geteilter Datensatz für mehrere Server-Prozesse
+Der geparste Würfel wird einmal als versioniertes Segment in data/processed/ veröffentlicht;
+Worker binden die Zahlen per Memory-Mapping ein (read-only, ohne Kopie) und wechseln auf ein
+neues Segment, sobald der Zeiger <quelle>.current umgesetzt wurde
+
+Aufbau eines Segments (Verzeichnis <quelle>.<hash>.v<parser>.s<format>.segment/):
+    values.npy       values[jahr, richtung, land] (float64)
+    cumulative.npy   Präfixsummen für src.ranges.RangeIndex
+    meta.npz         Jahre, Spalten, Index, Datenqualität, Summen und Fingerprints (MigrationCube.aggregates),
+                     Erkenntnisse (src.insights, als JSON)
+
+Aufruf:
+    python -m src.shared data/raw/<datei>.csv      # veröffentlichen (auch nach einer Aktualisierung)
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+import logging
+
+import numpy as np
+
+from src.cube import MigrationCube, PARSER_VERSION
+from src.insights import build_insights
+from src.instrumentation import span
+from src.ranges import RangeIndex
+from src.rankings import DEFAULT_TOP_N
+from src.storage import PROCESSED_DIR, cube_arrays, cube_from_arrays, load_cube, make_readable, source_hash
+from src.visualizer import DataVisualizer
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.segment'
+
+# Bei Änderungen am Aufbau des Segments erhöhen (steht im Namen, alte Segmente werden nicht eingebunden)
+SEGMENT_FORMAT = 2
+
+# Zeiger wird höchstens so oft auf ein neues Segment geprüft
+RELOAD_CHECK_S = 5.0
+
+
+def pointer_path(source: Path, processed_dir: Path = PROCESSED_DIR) -> Path:
+    """Zeigerdatei mit dem Namen des aktuellen Segments einer Quelle"""
+    return processed_dir / f"{Path(source).stem}.current"
+
+
+def segment_name(source: Path) -> str:
+    """Segmentname der aktuellen Version einer Quelldatei (Inhalts-Hash, Parser- und Segmentformat)"""
+    source = Path(source)
+    return f"{source.stem}.{source_hash(source)[:16]}.v{PARSER_VERSION}.s{SEGMENT_FORMAT}{SEGMENT_SUFFIX}"
+
+
+def _write_segment(cube: MigrationCube, target: Path):
+    """Schreibt das Segment in ein temporäres Verzeichnis und benennt es atomar um"""
+    tmp = Path(tempfile.mkdtemp(prefix=target.name, suffix='.tmp', dir=target.parent))
+    try:
+        ranges = RangeIndex(cube)
+        np.save(tmp / 'values.npy', np.ascontiguousarray(cube.values, dtype=np.float64))
+        np.save(tmp / 'cumulative.npy', ranges.cumulative)
+        # Erkenntnisse brauchen Zwischenarrays in der Größe von values: einmal hier statt in jedem Worker
+        insights = build_insights(cube, cube.country_table.names) if len(cube.years) >= 2 else []
+        np.savez(
+            tmp / 'meta.npz',
+            cumulative_totals=ranges.cumulative_totals,
+            insights=np.asarray(json.dumps(insights, ensure_ascii=False)),
+            **cube.aggregates(),
+            **cube_arrays(cube)
+        )
+        # mkdtemp legt das Verzeichnis mit 0700 an; Worker anderer Benutzer müssen es lesen können
+        make_readable(tmp, 0o755)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Ein anderer Prozess hat dieselbe Version gleichzeitig veröffentlicht
+            if not target.exists():
+                raise
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _write_pointer(pointer: Path, segment: str):
+    fd, tmp_name = tempfile.mkstemp(prefix=pointer.name, suffix='.tmp', dir=pointer.parent)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(segment)
+    make_readable(tmp_name)
+    os.replace(tmp_name, pointer)
+
+
+def _read_pointer(pointer: Path) -> Optional[str]:
+    try:
+        return pointer.read_text(encoding='utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(source: Path, processed_dir: Path = PROCESSED_DIR) -> Path:
+    """
+    Veröffentlicht die aktuelle Version einer Quelldatei als Segment und setzt den Zeiger um
+
+    Das bisherige Segment bleibt als Vorgänger liegen (Worker wechseln erst bei der nächsten
+    Prüfung), ältere werden entfernt. Bereits eingebundene Segmente bleiben auch nach dem
+    Löschen lesbar, solange ein Prozess sie gemappt hat.
+
+    Returns:
+        Pfad des Segments
+    """
+    source = Path(source)
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    name = segment_name(source)
+    segment = processed_dir / name
+    pointer = pointer_path(source, processed_dir)
+    previous = _read_pointer(pointer)
+
+    if not segment.exists():
+        with span('publish_segment', path=name):
+            _write_segment(load_cube(source, processed_dir), segment)
+        logger.info(f"Segment veröffentlicht: {name}")
+    if previous != name:
+        _write_pointer(pointer, name)
+
+    # Nur Segmente dieser Quelle ('<stem>.<16 hex>.v<N>.s<M>.segment'), nicht von Quellen mit Präfix '<stem>.'
+    pattern = re.compile(rf"{re.escape(source.stem)}\.[0-9a-f]{{16}}\.v\d+\.s\d+{re.escape(SEGMENT_SUFFIX)}")
+    for old in processed_dir.glob(f"*{SEGMENT_SUFFIX}"):
+        if old.name not in (name, previous) and pattern.fullmatch(old.name):
+            shutil.rmtree(old, ignore_errors=True)
+    return segment
+
+
+def attach(segment: Path) -> MigrationCube:
+    """
+    Bindet ein Segment ein: values und Präfixsummen als read-only Memory-Map, keine Kopie
+
+    Der Würfel ist nur lesbar (append_rows schlägt fehl); Aktualisierungen laufen über publish.
+    """
+    with span('attach_segment', path=segment.name):
+        values = np.load(segment / 'values.npy', mmap_mode='r')
+        cumulative = np.load(segment / 'cumulative.npy', mmap_mode='r')
+        with np.load(segment / 'meta.npz', allow_pickle=False) as meta:
+            cube = cube_from_arrays(values, meta)
+            cube.prefix_sums = (cumulative, meta['cumulative_totals'])
+            # Summen, Fingerprints und Erkenntnisse mitgeliefert: der Start liest values nicht und kopiert nichts
+            cube.restore_aggregates(meta)
+            cube.insights = json.loads(str(meta['insights']))
+    return cube
+
+
+class SharedDataset:
+    """
+    Hält den Visualizer des aktuell veröffentlichten Segments einer Quelle (einer pro Prozess)
+
+    Fehlt das Segment der aktuellen Quelldatei (z.B. nach einer Änderung der CSV ohne publish),
+    wird es beim Start veröffentlicht. Der Zeiger wird bei Anfragen höchstens alle
+    RELOAD_CHECK_S Sekunden geprüft; nach einem Wechsel liefert current() den Visualizer
+    des neuen Segments, laufende Anfragen behalten den alten.
+    """
+
+    def __init__(self, source: Path, processed_dir: Path = PROCESSED_DIR, top_n: int = DEFAULT_TOP_N):
+        self.source = Path(source)
+        self.processed_dir = Path(processed_dir)
+        self.top_n = top_n
+        self.segment: Optional[str] = None
+        self.visualizer: Optional[DataVisualizer] = None
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        # Zeiger fehlt oder zeigt auf eine andere Version als die Quelldatei (Inhalt, Parser, Format)
+        name = _read_pointer(pointer_path(self.source, self.processed_dir))
+        if name != segment_name(self.source) or not (self.processed_dir / name).exists():
+            publish(self.source, self.processed_dir)
+        self._swap()
+
+    def _swap(self) -> bool:
+        name = _read_pointer(pointer_path(self.source, self.processed_dir))
+        if name is None or name == self.segment:
+            return False
+        cube = attach(self.processed_dir / name)
+        self.visualizer, self.segment = DataVisualizer.from_cube(cube, self.top_n), name
+        logger.info(f"Segment eingebunden: {name}, Version {cube.fingerprint}")
+        return True
+
+    def current(self) -> DataVisualizer:
+        now = time.monotonic()
+        if now - self._checked > RELOAD_CHECK_S:
+            with self._lock:
+                if now - self._checked > RELOAD_CHECK_S:
+                    self._checked = now
+                    try:
+                        self._swap()
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.warning(f"Segmentwechsel fehlgeschlagen, behalte {self.segment}: {e}")
+        return self.visualizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Datensatz als geteiltes Segment veröffentlichen")
+    parser.add_argument('source', type=Path, help="Pfad zur CSV-Datei")
+    parser.add_argument('--processed-dir', type=Path, default=PROCESSED_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    segment = publish(args.source, args.processed_dir)
+    print(f"Aktuelles Segment: {segment}")
+
+
+if __name__ == '__main__':
+    main()
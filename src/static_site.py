@@ -0,0 +1,188 @@
+"""
+Statischer Export der Standardansichten als HTML
+Rendert Zeitreihe, Saldo, Dynamik der Top-Länder und die Top-N-Grafiken aller Jahre nach output/site/,
+die Jahresseiten parallel auf mehreren Prozessen
+
+Aufruf:
+    python -m src.static_site data/raw/Aussenwanderung_nach_Herkunfts_Ziel-Staat_2010-2023_0_0.csv
+    python -m src.static_site <csv> --output output/site --workers 4 --top-n 10
+"""
+
+import argparse
+import html
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional, Tuple
+import logging
+
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+
+from src.cube import MigrationCube
+from src.storage import load_cube
+from src.visualizer import DataVisualizer, MIGRATION_CHARTS
+
+logger = logging.getLogger(__name__)
+
+SITE_DIR = Path(__file__).resolve().parent.parent / 'output' / 'site'
+
+# plotly.js wird einmal neben die Seiten gelegt und von allen referenziert (cachebar, CDN-freundlich)
+PLOTLY_JS = 'plotly.min.js'
+
+PAGE = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 0 auto; max-width: 1200px; padding: 1rem; color: #2a3f5f; }}
+.row {{ display: flex; flex-wrap: wrap; gap: 1rem; }}
+.row > div {{ flex: 1 1 480px; }}
+nav a {{ margin-right: 0.5rem; }}
+</style>
+</head>
+<body>
+<nav><a href="index.html">Übersicht</a></nav>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+CHART_TITLES = {
+    'totals': 'Gesamtmigration nach Jahren',
+    'saldo': 'Migrationssaldo',
+    'top_dynamics': 'Dynamik der Top 5 Länder',
+}
+
+# Visualizer eines Worker-Prozesses, einmal pro Prozess aufgebaut
+_worker_visualizer: Optional[DataVisualizer] = None
+
+
+def _figure_div(fig: go.Figure) -> str:
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def _write_page(path: Path, title: str, body: str, plotly_js: str = PLOTLY_JS):
+    path.write_text(PAGE.format(title=html.escape(title), plotly_js=plotly_js, body=body), encoding='utf-8')
+
+
+def year_page(year: int) -> str:
+    return f"jahr_{year}.html"
+
+
+def _init_worker(cube: MigrationCube, top_n: int):
+    global _worker_visualizer
+    _worker_visualizer = DataVisualizer.from_cube(cube, top_n=top_n)
+
+
+def render_year(year: int, output_dir: Path, visualizer: Optional[DataVisualizer] = None,
+                plotly_js: str = PLOTLY_JS) -> Tuple[int, float]:
+    """
+    Schreibt die Jahresseite mit den Top-N-Grafiken für Zuzug und Wegzug
+    (ohne visualizer im Worker-Prozess mit dessen Visualizer)
+
+    Returns:
+        (Jahr, Dauer in Sekunden)
+    """
+    start = time.perf_counter()
+    visualizer = visualizer or _worker_visualizer
+    fig_zuzug, fig_wegzug = visualizer.plot_top_countries_by_year(year)
+    divs = [_figure_div(fig) for fig in (fig_zuzug, fig_wegzug) if fig is not None]
+    body = f'<div class="row">{"".join(f"<div>{div}</div>" for div in divs)}</div>' if divs \
+        else '<p>Keine Daten für dieses Jahr.</p>'
+    _write_page(output_dir / year_page(year), f"Top {visualizer.top_n} Länder {year}", body, plotly_js)
+    return year, time.perf_counter() - start
+
+
+def write_overview(visualizer: DataVisualizer, output_dir: Path, plotly_js: str = PLOTLY_JS) -> List[str]:
+    """
+    Schreibt die Übersichtsgrafiken aus MIGRATION_CHARTS als eigene Seiten
+
+    Returns:
+        Namen der geschriebenen Grafiken (ohne Daten entfallen sie)
+    """
+    charts = []
+    for name in MIGRATION_CHARTS:
+        fig = visualizer.chart(name)
+        if fig is None:
+            continue
+        _write_page(output_dir / f"{name}.html", CHART_TITLES[name], _figure_div(fig), plotly_js)
+        charts.append(name)
+    return charts
+
+
+def write_index(output_dir: Path, charts: List[str], years: List[int],
+                title: str = "Außenwanderung Konstanz", plotly_js: str = PLOTLY_JS):
+    chart_links = ''.join(f'<li><a href="{name}.html">{CHART_TITLES[name]}</a></li>' for name in charts)
+    year_links = ' '.join(f'<a href="{year_page(year)}">{year}</a>' for year in years)
+    body = (
+        f"<h2>Grafiken</h2><ul>{chart_links}</ul>"
+        f"<h2>Top-Länder nach Jahr</h2><p>{year_links}</p>"
+        f"<p><small>Datenquelle: <a href=\"https://offenedaten-konstanz.de/\">Open Data Konstanz</a></small></p>"
+    )
+    _write_page(output_dir / 'index.html', title, body, plotly_js)
+
+
+def build_site(source: Path, output_dir: Path = SITE_DIR, workers: Optional[int] = None,
+               top_n: int = 10) -> List[Path]:
+    """
+    Rendert alle Seiten des statischen Exports
+
+    Die Übersichtsgrafiken entstehen im Hauptprozess, während die Jahresseiten parallel
+    in einem Prozesspool gerendert werden (jeder Worker erhält den Würfel einmal beim Start).
+
+    Args:
+        source: Pfad zur CSV-Datei
+        output_dir: Zielverzeichnis
+        workers: Anzahl Prozesse (Standard: Anzahl CPU-Kerne)
+        top_n: Anzahl Länder auf den Jahresseiten
+
+    Returns:
+        Liste der geschriebenen Dateien
+    """
+    start = time.perf_counter()
+    cube = load_cube(source)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / PLOTLY_JS).write_text(get_plotlyjs(), encoding='utf-8')
+    years = cube.index.complete_years()
+    workers = workers or os.cpu_count() or 1
+
+    written = [output_dir / PLOTLY_JS]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cube, top_n)) as pool:
+        futures = [pool.submit(render_year, year, output_dir) for year in years]
+
+        visualizer = DataVisualizer.from_cube(cube, top_n=top_n)
+        charts = write_overview(visualizer, output_dir)
+        written.extend(output_dir / f"{name}.html" for name in charts)
+
+        for future in as_completed(futures):
+            year, seconds = future.result()
+            written.append(output_dir / year_page(year))
+            logger.info(f"Jahresseite {year} gerendert ({seconds * 1000:.0f} ms)")
+
+    write_index(output_dir, charts, years)
+    written.append(output_dir / 'index.html')
+    logger.info(f"Statischer Export: {len(written)} Dateien in {output_dir} ({time.perf_counter() - start:.1f} s)")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Standardansichten als statische HTML-Seiten exportieren")
+    parser.add_argument('source', type=Path, help="Pfad zur CSV-Datei")
+    parser.add_argument('--output', type=Path, default=SITE_DIR, help="Zielverzeichnis (Standard: output/site)")
+    parser.add_argument('--workers', type=int, default=None, help="Anzahl Prozesse (Standard: CPU-Kerne)")
+    parser.add_argument('--top-n', type=int, default=10, help="Anzahl Länder auf den Jahresseiten")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    written = build_site(args.source, args.output, args.workers, args.top_n)
+    print(f"{len(written)} Dateien geschrieben: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Persistenter Cache für geparste Migrationsdaten
+Speichert den Migrationswürfel als .npz in data/processed/, invalidiert über Datei-Hash und Parser-Version
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+from src.adapters import detect_schema
+from src.cube import MigrationCube, YearIndex, DIRECTIONS, PARSER_VERSION
+from src.instrumentation import span
+from src.schema import QualityReport, read_typed
+from src.streaming import DEFAULT_CHUNKSIZE, read_cube_chunked
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_DIR = Path(__file__).resolve().parent.parent / 'data' / 'processed'
+
+# Dateien ab dieser Größe (MB) werden chunkweise gelesen (src.streaming), überschreibbar per Umgebungsvariable
+STREAMING_MIN_MB = int(os.environ.get('DATAEXPLORER_STREAMING_MB', '64'))
+
+
+def _current_umask() -> int:
+    # os.umask lässt sich nur setzen; einmal beim Import kurz setzen und zurücksetzen
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+UMASK = _current_umask()
+
+
+def make_readable(path: Path, mode: int = 0o644):
+    """
+    Setzt die Rechte einer mit tempfile angelegten Datei (0600, Verzeichnisse 0700) auf mode,
+    eingeschränkt durch die umask, damit Prozesse anderer Benutzer den Cache lesen können
+    """
+    os.chmod(path, mode & ~UMASK)
+
+
+def source_hash(path: Path) -> str:
+    """SHA-256 des Dateiinhalts (blockweise gelesen)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(source: Path, processed_dir: Path = PROCESSED_DIR) -> Path:
+    """Pfad der Cache-Datei für eine Quelldatei (Hash und Parser-Version im Namen)"""
+    return processed_dir / f"{source.stem}.{source_hash(source)[:16]}.v{PARSER_VERSION}.npz"
+
+
+def cube_arrays(cube: MigrationCube) -> Dict[str, np.ndarray]:
+    """Metadaten des Würfels als Arrays (alles außer values): Jahre, Spalten, Index, Datenqualität"""
+    keys = sorted(cube.index.positions.items()) if cube.index is not None else []
+    arrays = {
+        'years': np.asarray(cube.years, dtype=np.int64),
+        'countries': np.asarray(cube.countries, dtype=str),
+        'continents': np.asarray(cube.continents, dtype=str),
+        'sources': np.asarray([['' if s is None else str(s) for s in row] for row in cube.sources], dtype=str),
+        'index_years': np.asarray([year for (year, _), _ in keys], dtype=np.int64),
+        'index_directions': np.asarray([DIRECTIONS.index(d) for (_, d), _ in keys], dtype=np.int64),
+        'index_rows': np.asarray([row for _, row in keys], dtype=np.int64),
+    }
+    if cube.quality is not None:
+        report = cube.quality
+        arrays.update({
+            'quality_columns': np.asarray(report.columns, dtype=str),
+            'quality_counts': np.stack([report.values, report.missing, report.rejected]),
+            'quality_rows': np.asarray([report.data_rows, report.metadata_rows, report.ignored_rows], dtype=np.int64),
+        })
+    return arrays
+
+
+def cube_from_arrays(values: np.ndarray, data) -> MigrationCube:
+    """Setzt den Würfel aus values und den Metadaten von cube_arrays (dict oder geöffnete .npz) zusammen"""
+    positions = {
+        (int(year), DIRECTIONS[int(d)]): int(row)
+        for year, d, row in zip(data['index_years'], data['index_directions'], data['index_rows'])
+    }
+    sources = np.array([[s or None for s in row] for row in data['sources'].tolist()], dtype=object)
+    cube = MigrationCube(
+        values=values,
+        years=data['years'].tolist(),
+        countries=data['countries'].tolist(),
+        continents=data['continents'].tolist(),
+        sources=sources.reshape(len(data['years']), len(DIRECTIONS)),
+        index=YearIndex(positions),
+    )
+    if 'quality_columns' in data:
+        report = QualityReport(data['quality_columns'].tolist())
+        report.values, report.missing, report.rejected = data['quality_counts']
+        report.data_rows, report.metadata_rows, report.ignored_rows = data['quality_rows'].tolist()
+        cube.quality = report
+    return cube
+
+
+def save_cube(cube: MigrationCube, path: Path):
+    """Schreibt den Würfel atomar (temporäre Datei + os.replace)"""
+    arrays = {'values': cube.values, **cube_arrays(cube)}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name, suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        make_readable(tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def read_cube(path: Path) -> MigrationCube:
+    """Liest einen mit save_cube geschriebenen Würfel"""
+    with np.load(path, allow_pickle=False) as data:
+        return cube_from_arrays(data['values'], data)
+
+
+def _remove_stale(source: Path, current: Path, processed_dir: Path):
+    """
+    Entfernt veraltete Cache-Dateien derselben Quelle
+
+    Nur Namen exakt nach cache_path ('<stem>.<16 hex>.v<N>.npz'); ein Glob auf '<stem>.*'
+    träfe auch Quellen, deren Name mit '<stem>.' beginnt.
+    """
+    pattern = re.compile(rf"{re.escape(source.stem)}\.[0-9a-f]{{16}}\.v\d+\.npz")
+    for old in processed_dir.glob('*.npz'):
+        if old != current and pattern.fullmatch(old.name):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def _parse(source: Path, chunksize: Optional[int]) -> MigrationCube:
+    """
+    Parst die CSV mit dem Schema des erkannten Layouts (src.adapters)
+
+    Ohne chunksize werden Dateien ab STREAMING_MIN_MB chunkweise gelesen, kleinere vollständig;
+    chunksize=0 liest immer vollständig.
+    """
+    if chunksize is None and source.stat().st_size >= STREAMING_MIN_MB * 2**20:
+        chunksize = DEFAULT_CHUNKSIZE
+    if chunksize:
+        return read_cube_chunked(source, chunksize, detect_schema(source))
+    return read_typed(source, detect_schema(source))
+
+
+def load_cube(source: Path, processed_dir: Optional[Path] = PROCESSED_DIR,
+              chunksize: Optional[int] = None) -> MigrationCube:
+    """
+    Lädt den Migrationswürfel aus dem Cache oder parst die CSV und schreibt den Cache
+
+    Args:
+        source: Pfad zur CSV-Datei (Layout wird über src.adapters erkannt)
+        processed_dir: Cache-Verzeichnis, None deaktiviert den Cache
+        chunksize: Zeilen pro Block beim chunkweisen Lesen; None = ab STREAMING_MIN_MB automatisch, 0 = nie
+
+    Returns:
+        MigrationCube
+    """
+    source = Path(source)
+    if processed_dir is None:
+        return _parse(source, chunksize)
+
+    cached = cache_path(source, processed_dir)
+    if cached.exists():
+        try:
+            with span('cache_read', path=cached.name):
+                cube = read_cube(cached)
+                cube.builder = detect_schema(source).builder()
+            logger.info(f"Migrationsdaten aus Cache geladen: {cached.name}")
+            return cube
+        except Exception as e:
+            logger.warning(f"Cache-Datei {cached.name} unlesbar, parse neu: {e}")
+
+    cube = _parse(source, chunksize)
+    try:
+        save_cube(cube, cached)
+        _remove_stale(source, cached, processed_dir)
+        logger.info(f"Cache geschrieben: {cached.name}")
+    except OSError as e:
+        logger.warning(f"Cache konnte nicht geschrieben werden: {e}")
+    return cube
@@ -0,0 +1,218 @@
+"""
+Chunkweises Einlesen großer Migrations-CSVs
+Jeder Block wird sofort in die Jahres-Arrays und laufende Aggregate (Summen je Jahr und Land,
+max |Saldo|, Top-N-Kandidaten je Jahr) eingerechnet und danach verworfen; der Speicherbedarf
+wächst mit der Blockgröße und dem Würfel, nicht mit der Datei
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from src.adapters import detect_schema
+from src.cache import LRUCache
+from src.cube import AGGREGATE_COLUMNS, CubeBuilder, DIRECTIONS, MigrationCube, YearIndex
+from src.instrumentation import span
+from src.rankings import DEFAULT_TOP_N, Ranking, rank_block, ranking_cache
+from src.schema import MigrationSchema, read_typed
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 5000
+
+# Jahres-Arrays wachsen um so viele Jahre auf einmal
+YEAR_BLOCK = 16
+
+
+class StreamingBuilder(CubeBuilder):
+    """
+    CubeBuilder, der jeden Block sofort einrechnet, statt die geparsten Zeilen bis build() zu halten
+
+    Gehalten werden nur values[jahr, richtung, land] (wächst um YEAR_BLOCK Jahre), die Summen
+    je Jahr und Richtung, die Summen je Land und Richtung, das laufende max |Saldo| je Land und
+    die Top-N-Rankings der Jahre, deren Zuzug und Wegzug vollständig gelesen sind.
+
+    Args:
+        layout: Builder mit dem Layout der Datei (z.B. MigrationSchema.builder()), Standard: CubeBuilder()
+        top_n: N der mitberechneten Rankings je Jahr und Richtung (ohne Kontinent)
+    """
+
+    def __init__(self, layout: Optional[CubeBuilder] = None, top_n: int = DEFAULT_TOP_N):
+        layout = layout or CubeBuilder()
+        super().__init__(layout.key, layout.source, layout.key_pattern, layout.metadata_key,
+                         layout.directions, layout.thousands)
+        self.top_n = top_n
+        self.rankings: Dict[Tuple[int, str], Ranking] = {}
+        self._slots: Dict[int, int] = {}
+        self._values = None
+        self._filled = None
+        self._totals = None
+        self._column_sums = None
+        self._max_abs_saldo = None
+        self._ranked = set()
+
+    def _slot(self, year: int) -> int:
+        """Position eines Jahres in den Jahres-Arrays (Reihenfolge des ersten Auftretens)"""
+        slot = self._slots.get(year)
+        if slot is None:
+            slot = self._slots[year] = len(self._slots)
+            if slot == len(self._values):
+                grow = YEAR_BLOCK
+                self._values = np.concatenate([self._values, np.full((grow,) + self._values.shape[1:], np.nan)])
+                self._filled = np.concatenate([self._filled, np.zeros((grow, len(DIRECTIONS)), dtype=bool)])
+                self._totals = np.concatenate([self._totals, np.zeros((grow, len(DIRECTIONS)))])
+        return slot
+
+    def _store(self, keys: List[Tuple[int, str]], block: np.ndarray):
+        if self._values is None:
+            self._values = np.full((0, len(DIRECTIONS), len(self.countries)), np.nan)
+            self._filled = np.zeros((0, len(DIRECTIONS)), dtype=bool)
+            self._totals = np.zeros((0, len(DIRECTIONS)))
+            self._column_sums = np.zeros((len(DIRECTIONS), len(self.countries)))
+            self._max_abs_saldo = np.zeros(len(self.countries))
+        slots = np.array([self._slot(year) for year, _ in keys], dtype=int)
+        dirs = np.array([DIRECTIONS.index(direction) for _, direction in keys], dtype=int)
+        with span('streaming_fold', rows=len(keys)):
+            self._values[slots, dirs] = block
+            self._filled[slots, dirs] = True
+            self._totals[slots, dirs] = np.nansum(block, axis=1)
+            for d in range(len(DIRECTIONS)):
+                self._column_sums[d] += np.nansum(block[dirs == d], axis=0)
+            complete = sorted({int(slot) for slot in slots if self._filled[slot].all()})
+            self._rank(complete)
+
+    def _rank(self, slots: List[int]):
+        """Rankings und max |Saldo| für Jahre, deren Werte feststehen"""
+        slots = [slot for slot in slots if slot not in self._ranked]
+        if not slots:
+            return
+        years = {slot: year for year, slot in self._slots.items()}
+        columns = np.flatnonzero([column not in AGGREGATE_COLUMNS for column in self.countries])
+        block = np.nan_to_num(self._values[slots])
+        for (i, direction), ranking in rank_block(block, columns, self.top_n).items():
+            self.rankings[(years[slots[i]], direction)] = ranking
+        np.maximum(self._max_abs_saldo, np.abs(block[:, 0] - block[:, 1]).max(axis=0), out=self._max_abs_saldo)
+        self._ranked.update(slots)
+
+    def build(self) -> MigrationCube:
+        """Würfel aus den Jahres-Arrays, die laufenden Aggregate werden übernommen"""
+        if self._values is None:
+            return super().build()
+        # Jahre mit nur einer Richtung stehen erst am Dateiende fest
+        self._rank(sorted(self._slots.values()))
+        years = sorted(self._slots)
+        order = [self._slots[year] for year in years]
+        n = len(years)
+        # In Dateien mit aufsteigenden Jahren ist values ein View, sonst eine umsortierte Kopie
+        if order == list(range(n)):
+            values, totals = self._values[:n], self._totals[:n]
+        else:
+            values, totals = self._values[order], self._totals[order]
+        year_pos = {year: pos for pos, year in enumerate(years)}
+        sources = np.full((n, len(DIRECTIONS)), None, dtype=object)
+        for (year, direction), source in self._sources.items():
+            sources[year_pos[year], DIRECTIONS.index(direction)] = source
+
+        continents = self.continents if self.continents is not None else [''] * len(self.countries)
+        cube = MigrationCube(values, years, self.countries, continents, sources, YearIndex(dict(self._positions)))
+        cube.restore_aggregates({
+            'totals': totals,
+            'column_sums': self._column_sums,
+            'max_abs_saldo': self._max_abs_saldo,
+        })
+        cube.builder = self.clone()
+        logger.info(f"Migrationswürfel chunkweise erstellt: {n} Jahre, {len(self.countries)} Spalten")
+        return cube
+
+
+def read_cube_chunked(source: Path, chunksize: int = DEFAULT_CHUNKSIZE, schema: Optional[MigrationSchema] = None,
+                      top_n: int = DEFAULT_TOP_N, cache: Optional[LRUCache] = ranking_cache) -> MigrationCube:
+    """
+    Liest eine CSV im Format 'herkunftsgebiet_wegzugsgebiet' in Blöcken von chunksize Zeilen
+
+    Die Zahlenspalten werden über das Schema (src.schema) beim Lesen typisiert; kein Block
+    bleibt nach dem Einrechnen im Speicher. Die mitberechneten Top-N-Rankings werden in den
+    Ranking-Cache übernommen (wie warm_rankings).
+
+    Args:
+        source: Pfad zur CSV-Datei (Layout wird über src.adapters erkannt)
+        chunksize: Anzahl Zeilen pro Block
+        schema: Spaltendeklaration, Standard: erkanntes Layout der Datei
+        top_n: N der Rankings je Jahr und Richtung
+        cache: Ziel der Rankings, None = nicht übernehmen
+
+    Returns:
+        MigrationCube (identisch zu read_typed auf der ganzen Datei)
+    """
+    schema = schema or detect_schema(source)
+    builder = StreamingBuilder(schema.builder(), top_n)
+    cube = read_typed(source, schema, chunksize=chunksize, builder=builder)
+    if cache is not None:
+        for (year, direction), ranking in builder.rankings.items():
+            cache.put((cube.year_fingerprint(year), year, direction, top_n, None), ranking)
+    return cube
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Bisher maximaler Resident Set Size des Prozesses in MB (None ohne das Modul resource, z.B. Windows)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(source: Path, chunksize: int = DEFAULT_CHUNKSIZE) -> Dict[str, float]:
+    """
+    Liest die Datei chunkweise und meldet Laufzeit und Speicherbedarf des Einlesens
+
+    peak_traced_mb ist der Höchststand der während des Einlesens belegten Python- und
+    NumPy-Speicherblöcke (tracemalloc, Importe und vorher belegter Speicher zählen nicht mit);
+    rss_growth_mb ist der Anstieg des Prozess-Höchststands (RSS) während des Einlesens.
+    Die Laufzeit enthält den Mehraufwand von tracemalloc.
+    """
+    rss_before = _peak_rss_mb()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        cube = read_cube_chunked(source, chunksize, cache=None)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss_after = _peak_rss_mb()
+    return {
+        'chunksize': chunksize,
+        'years': len(cube.years),
+        'columns': len(cube.countries),
+        'seconds': round(seconds, 4),
+        'cube_mb': round(cube.values.nbytes / 2**20, 1),
+        'peak_traced_mb': round(peak / 2**20, 1),
+        'rss_growth_mb': round(rss_after - rss_before, 1) if rss_before is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrations-CSV chunkweise einlesen und Speicherbedarf melden")
+    parser.add_argument('source', type=Path, help="Pfad zur CSV-Datei")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Zeilen pro Block")
+    args = parser.parse_args()
+
+    result = measure(args.source, args.chunksize)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
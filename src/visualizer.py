@@ -1,227 +1,334 @@
 """
 Modul zur Visualisierung von Migrationsdaten
 Spezialisiert auf Außenwanderung nach Herkunfts- und Zielgebiet
+
+Plotly (src.figures) wird erst beim Erstellen der ersten Grafik importiert: API-Abfragen,
+das Veröffentlichen von Segmenten und Tabellen-Exporte laden es nicht. pandas kommt über das
+Einlesen (src.cube) und wird hier nur in den Tabellen-Methoden gebraucht.
 """
 
-import pandas as pd
-import plotly.graph_objects as go
-from typing import Optional, List, Tuple
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Optional, List, Tuple
 import logging
 
-logging.basicConfig(level=logging.INFO)
+from src.adapters import Sample, detect_sample
+from src.cube import MigrationCube, DIRECTIONS
+from src.insights import build_insights
+from src.instrumentation import span
+from src.ranges import RangeIndex
+from src.rankings import (
+    DEFAULT_CRITERION, DEFAULT_TOP_N, RANKING_CRITERIA, chart_cache, get_top_n, rank_countries, refresh_rankings, top_k
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import plotly.graph_objects as go
+
 logger = logging.getLogger(__name__)
 
+# Einzeln abrufbare Grafiken (Name -> Methode), in Anzeigereihenfolge
+CHARTS = {
+    'totals': 'plot_totals',
+    'saldo': 'plot_saldo',
+    'top_dynamics': 'plot_top_dynamics',
+    'continent_totals': 'plot_continent_totals',
+    'continent_saldo': 'plot_continent_saldo',
+}
+
+# Grafiken, die plot_migration_data() zurückgibt
+MIGRATION_CHARTS = ('totals', 'saldo', 'top_dynamics')
+
+CONTINENT_COLORS = ['#3498db', '#e67e22', '#2ecc71', '#9b59b6', '#1abc9c']
+
 
 class DataVisualizer:
     """Klasse zur Visualisierung von Migrationsdaten"""
     
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def __init__(self, df: Optional['pd.DataFrame'] = None, top_n: int = DEFAULT_TOP_N,
+                 cube: Optional[MigrationCube] = None):
+        # Nur lesend verwendet, daher keine Kopie
+        self.df = df
+        self.top_n = top_n
+        if cube is None and self.df is not None:
+            # Layout aus Kopfzeile und ersten Zeilen (src.adapters); unbekannte Tabellen bleiben ohne Würfel
+            try:
+                _, schema = detect_sample(Sample.from_frame(self.df))
+            except ValueError as e:
+                schema = None
+                logger.info(f"Keine Migrationsdaten: {e}")
+            if schema is not None:
+                cube = MigrationCube.from_dataframe(self.df, schema.builder())
+        self.cube = cube
+        # Index (Jahr, Richtung) -> Zeile, einmal aufgebaut
+        # Rankings werden erst beim ersten Zugriff berechnet (get_top_n), nicht vor der ersten Grafik
+        self.index = self.cube.index if self.cube is not None else None
+    
+    @classmethod
+    def from_cube(cls, cube: MigrationCube, top_n: int = DEFAULT_TOP_N) -> 'DataVisualizer':
+        """Erstellt den Visualizer direkt aus einem (z.B. aus dem Cache geladenen) Würfel"""
+        return cls(top_n=top_n, cube=cube)
     
-    def _clean_country_name(self, name: str) -> str:
-        """Bereinigt Ländernamen (entfernt Präfixe wie '121_')"""
-        parts = name.split('_', 1)
-        if len(parts) > 1 and parts[0].isdigit():
-            return parts[1].replace('_', ' ').title()
-        return name.replace('_', ' ').title()
-
-    def plot_migration_data(self) -> Tuple[List[go.Figure], List[int]]:
+    def append_years(self, df: 'pd.DataFrame', replace: bool = False) -> List[int]:
         """
-        Spezielle Visualisierung für Migrationsdaten (Aussenwanderung)
-        Erstellt mehrere Grafiken: Zeitreihe, Migrationssaldo, Dynamik Top-Länder
-        
+        Ergänzt neue Jahreszeilen ohne Neuberechnung des Bestands (siehe MigrationCube.append_rows)
+        Rankings werden nur für die betroffenen Jahre neu berechnet, für alle N und Kontinente im Cache.
+
         Returns:
-            Tuple von (Liste von Figuren, Liste von verfügbaren Jahren)
+            Liste der betroffenen Jahre
         """
-        figures = []
-        
-        # Check if this is migration data
-        if 'herkunftsgebiet_wegzugsgebiet' not in self.df.columns:
-            logger.warning("Keine Migrationsdaten erkannt")
-            return figures, []
-        
-        # Extrahiere Daten
-        key_col = 'herkunftsgebiet_wegzugsgebiet'
-        
-        # Finde Zeile mit Kontinenten (für Filterung)
-        continent_row = None
-        for idx, val in enumerate(self.df[key_col]):
-            if 'Kontinent' in str(val):
-                continent_row = idx
-                break
-        
-        # Extrahiere Jahre und Typen (Zuzug/Wegzug)
-        years = []
-        zuzug_data = {}
-        wegzug_data = {}
-        
-        for idx, row_key in enumerate(self.df[key_col]):
-            if pd.isna(row_key):
-                continue
-            
-            row_key_str = str(row_key).strip()
-            
-            # Parse Jahr und Typ
-            if '_ Zuzug' in row_key_str:
-                year = int(row_key_str.split('_')[0])
-                years.append(year)
-                
-                # Extrahiere Daten nach Ländern (überspringe Kontinente)
-                row_data = self.df.iloc[idx]
-                for col in self.df.columns:
-                    if col == key_col or col == 'quelle':
-                        continue
-                    
-                    # Überspringe wenn Kontinent
-                    if continent_row is not None:
-                        continent_val = str(self.df.iloc[continent_row][col])
-                        if continent_val in ['Europa', 'Afrika', 'Amerika', 'Asien', 'Australien Ozeanien', '.']:
-                            continue
-                    
-                    country = col
-                    value = row_data[col]
-                    
-                    # Versuche in Zahl zu konvertieren
-                    try:
-                        if pd.notna(value) and str(value).strip() != '':
-                            val = float(str(value).replace(',', '.'))
-                            if country not in zuzug_data:
-                                zuzug_data[country] = {}
-                            zuzug_data[country][year] = val
-                    except:
-                        pass
-            
-            elif '_ Wegzug' in row_key_str:
-                year = int(row_key_str.split('_')[0])
-                
-                row_data = self.df.iloc[idx]
-                for col in self.df.columns:
-                    if col == key_col or col == 'quelle':
-                        continue
-                    
-                    if continent_row is not None:
-                        continent_val = str(self.df.iloc[continent_row][col])
-                        if continent_val in ['Europa', 'Afrika', 'Amerika', 'Asien', 'Australien Ozeanien', '.']:
-                            continue
-                    
-                    country = col
-                    value = row_data[col]
-                    
-                    try:
-                        if pd.notna(value) and str(value).strip() != '':
-                            val = float(str(value).replace(',', '.'))
-                            if country not in wegzug_data:
-                                wegzug_data[country] = {}
-                            wegzug_data[country][year] = val
-                    except:
-                        pass
-        
-        years = sorted(set(years))
-        
-        if not years:
-            logger.warning("Keine Jahresdaten gefunden")
-            return figures, []
-        
-        # Chart 1: Time series of total migration
-        # Sum directly from rows
-        total_zuzug = []
-        total_wegzug = []
-        
-        for year in years:
-            z_sum = 0
-            w_sum = 0
-            
-            # Finde Zeile für Zuzug
-            for idx, row_key in enumerate(self.df[key_col]):
-                row_key_str = str(row_key).strip()
-                if f'{year}_ Zuzug' in row_key_str:
-                    row_data = self.df.iloc[idx]
-                    # Summiere alle numerischen Werte in der Zeile (außer erste Spalte)
-                    for col in self.df.columns:
-                        if col == key_col or col == 'quelle':
-                            continue
-                        try:
-                            val = row_data[col]
-                            if pd.notna(val) and str(val).strip() != '':
-                                num_val = float(str(val).replace(',', '.'))
-                                z_sum += num_val
-                        except:
-                            pass
-                    break
-            
-            # Finde Zeile für Wegzug
-            for idx, row_key in enumerate(self.df[key_col]):
-                row_key_str = str(row_key).strip()
-                if f'{year}_ Wegzug' in row_key_str:
-                    row_data = self.df.iloc[idx]
-                    for col in self.df.columns:
-                        if col == key_col or col == 'quelle':
-                            continue
-                        try:
-                            val = row_data[col]
-                            if pd.notna(val) and str(val).strip() != '':
-                                num_val = float(str(val).replace(',', '.'))
-                                w_sum += num_val
-                        except:
-                            pass
-                    break
-            
-            total_zuzug.append(z_sum)
-            total_wegzug.append(w_sum)
+        if self.cube is None:
+            raise ValueError("Keine Migrationsdaten geladen")
+        before = {year: self.cube.year_fingerprint(year) for year in self.cube.years}
+        affected = self.cube.append_rows(df, replace=replace)
+        refresh_rankings(self.cube, affected, [before[year] for year in affected if year in before], self.top_n)
+        return affected
+    
+    def _names(self, countries) -> List[str]:
+        """Anzeigenamen zu Länder-IDs (aus der beim Laden aufgebauten Länder-Dimension)"""
+        names = self.cube.country_table.names
+        return [names[country] for country in countries]
+
+    def _cached(self, key: tuple, build, fingerprint: Optional[str] = None):
+        """
+        Holt eine Grafik oder Tabelle aus dem Cache und berechnet sie nur bei Bedarf
+        Standardmäßig gilt der Eintrag für den ganzen Datensatz, für Einzeljahre den Jahres-Fingerprint übergeben.
+        """
+        def build_with_span():
+            with span(f'build_{key[0]}', chart=key[1]):
+                return build()
+        return chart_cache.get_or_build((fingerprint or self.cube.fingerprint,) + key, build_with_span)
+
+    def available_years(self) -> List[int]:
+        """Verfügbare Jahre (leer, wenn keine Migrationsdaten)"""
+        return list(self.cube.years) if self.cube is not None else []
+
+    def chart(self, name: str) -> Optional['go.Figure']:
+        """Einzelne Grafik nach Name aus CHARTS (z.B. 'totals', 'saldo', 'continent_saldo')"""
+        if name not in CHARTS:
+            raise KeyError(f"Unbekannte Grafik '{name}', verfügbar: {list(CHARTS)}")
+        return getattr(self, CHARTS[name])()
+
+    def totals_table(self) -> Optional['pd.DataFrame']:
+        """
+        Summen je Jahr: Spalten Jahr, Zuzug, Wegzug, Saldo (Grundlage für Chart 1 und 2)
+        Die Tabelle wird gecacht und darf nicht verändert werden.
+        """
+        if not self.available_years():
+            return None
+        return self._cached(('table', 'totals'), self._build_totals_table)
+
+    def _build_totals_table(self) -> 'pd.DataFrame':
+        import pandas as pd
+        # Summen über alle Spalten der Zeilen 'Jahr_ Zuzug' / 'Jahr_ Wegzug'
+        totals = self.cube.totals()
+        return pd.DataFrame({
+            'Jahr': self.cube.years,
+            'Zuzug': totals[:, 0],
+            'Wegzug': totals[:, 1],
+            'Saldo': totals[:, 0] - totals[:, 1],
+        })
+
+    def top_dynamics_table(self, n: int = 5, criterion: str = DEFAULT_CRITERION) -> Optional['pd.DataFrame']:
+        """
+        Migrationssaldo der Top-n Länder je Jahr, Auswahl nach einem Kriterium aus RANKING_CRITERIA
+        (Standard: maximaler |Saldo| über alle Jahre)
+        Spalten: Jahr und eine Spalte pro Land (bereinigter Name). Gecacht, nicht verändern.
+        """
+        if len(self.available_years()) < 2:
+            return None
+        return self._cached(('table', 'top_dynamics', n, criterion),
+                            lambda: self._build_top_dynamics_table(n, criterion))
+
+    def _build_top_dynamics_table(self, n: int, criterion: str) -> 'pd.DataFrame':
+        import pandas as pd
+        cube = self.cube
+        # Max |Saldo| als Standard: so sind Länder mit einzelnen Spitzen (z.B. Ukraine 2022) enthalten
+        top_positions = [pos for pos, _ in rank_countries(cube, n, criterion)]
+        saldo_matrix = cube.saldo(countries=top_positions)
+
+        table = pd.DataFrame({'Jahr': cube.years})
+        for i, name in enumerate(self._names(top_positions)):
+            table[name] = saldo_matrix[:, i]
+        return table
+
+    def top_countries_table(self, year: int, direction: str, top_n: Optional[int] = None,
+                            continent: Optional[str] = None) -> Optional['pd.DataFrame']:
+        """
+        Top-N Länder eines Jahres für 'Zuzug' oder 'Wegzug': Spalten Land, '<Richtung> <Jahr>'
+        Mit continent nur Länder dieses Kontinents. None, wenn das Jahr fehlt. Gecacht, nicht verändern.
+        """
+        if self.cube is None or (year, direction) not in self.index:
+            return None
+        top_n = top_n or self.top_n
+        return self._cached(
+            ('table', 'top_by_year', year, direction, top_n, continent),
+            lambda: self._ranking_table(get_top_n(self.cube, year, direction, top_n, continent=continent),
+                                        f'{direction} {year}'),
+            fingerprint=self.cube.year_fingerprint(year)
+        )
+
+    def top_countries_range_table(self, year_from: int, year_to: int, direction: str,
+                                  top_n: Optional[int] = None) -> Optional['pd.DataFrame']:
+        """
+        Top-N Länder nach Summe über einen Zeitraum für 'Zuzug', 'Wegzug' oder 'Saldo' (nach Betrag)
+        Spalten: Land, '<Richtung> <von>-<bis>'. Gecacht, nicht verändern.
+        """
+        if not self.available_years():
+            return None
+        top_n = top_n or self.top_n
+        return self._cached(
+            ('table', 'top_by_range', year_from, year_to, direction, top_n),
+            lambda: self._build_top_range_table(year_from, year_to, direction, top_n)
+        )
+
+    def _build_top_range_table(self, year_from: int, year_to: int, direction: str, top_n: int) -> 'pd.DataFrame':
+        index = self.range_index()
+        if direction == 'Saldo':
+            shown = index.saldo(year_from, year_to)
+            score = np.abs(shown)
+        else:
+            shown = score = index.sum(year_from, year_to)[DIRECTIONS.index(direction)]
+        columns = np.flatnonzero(self.cube.country_mask() & (score > 0))
+        positions = columns[top_k(score[columns], top_n)]
+        return self._ranking_table([(int(pos), float(shown[pos])) for pos in positions],
+                                   f'{direction} {year_from}-{year_to}')
+
+    def _ranking_table(self, ranking: List[Tuple[int, float]], value_column: str) -> 'pd.DataFrame':
+        """Tabelle Land, Wert aus (Länder-ID, Wert); Namen werden erst hier nachgeschlagen"""
+        import pandas as pd
+        return pd.DataFrame({
+            'Land': self._names([country for country, _ in ranking]),
+            value_column: [value for _, value in ranking],
+        }, columns=['Land', value_column])
+
+    def continent_table(self) -> Optional['pd.DataFrame']:
+        """
+        Summen je Jahr und Kontinent: Spalten Jahr, Kontinent, Zuzug, Wegzug, Saldo
+        Gecacht, nicht verändern.
+        """
+        if not self.available_years() or not self.cube.continent_names():
+            return None
+        return self._cached(('table', 'continents'), self._build_continent_table)
+
+    def _build_continent_table(self) -> 'pd.DataFrame':
+        import pandas as pd
+        cube = self.cube
+        totals = cube.continent_totals()
+        names = cube.continent_names()
+        return pd.DataFrame({
+            'Jahr': np.repeat(cube.years, len(names)),
+            'Kontinent': np.tile(names, len(cube.years)),
+            'Zuzug': totals[:, 0, :].ravel(),
+            'Wegzug': totals[:, 1, :].ravel(),
+            'Saldo': cube.continent_saldo().ravel(),
+        })
+
+    def insights(self) -> List[Dict[str, object]]:
+        """
+        Automatisch berechnete Erkenntnisse (Z-Scores, Sprünge, Trends, Saldo-Effekte, siehe src/insights.py)
+        Liste von Dicts mit Art, Kategorie, Text, Land, Jahr, Wert. Gecacht pro Datensatz-Version, nicht verändern.
+        Für geteilte Segmente beim Veröffentlichen berechnet (src.shared), Worker kopieren values dafür nicht.
+        """
+        if len(self.available_years()) < 2:
+            return []
+        if self.cube.insights is not None:
+            return self.cube.insights
+        return self._cached(('table', 'insights'), lambda: build_insights(
+            self.cube, self.cube.country_table.names
+        ))
+
+    def range_index(self) -> RangeIndex:
+        """Präfixsummen-Index über die Jahre (einmal pro Datensatz-Version aufgebaut)"""
+        return self._cached(('index', 'ranges'), lambda: RangeIndex(self.cube))
+
+    def range_summary(self, year_from: int, year_to: int) -> Dict[str, float]:
+        """
+        Summen und Jahresmittel von Zuzug, Wegzug und Saldo über einen Zeitraum (O(1) über den Präfixsummen-Index)
+
+        Returns:
+            Dict mit Jahre, Zuzug, Wegzug, Saldo, Zuzug/Jahr, Wegzug/Jahr, Saldo/Jahr
+        """
+        index = self.range_index()
+        n_years = index.n_years(year_from, year_to)
+        zuzug, wegzug = index.totals(year_from, year_to)
+        summary = {'Jahre': n_years, 'Zuzug': float(zuzug), 'Wegzug': float(wegzug), 'Saldo': float(zuzug - wegzug)}
+        for key in ('Zuzug', 'Wegzug', 'Saldo'):
+            summary[f'{key}/Jahr'] = summary[key] / n_years if n_years else float('nan')
+        return summary
+
+    def _filter_years(self, table: 'pd.DataFrame', year_range: Optional[Tuple[int, int]]) -> 'pd.DataFrame':
+        if year_range is None:
+            return table
+        return table[(table['Jahr'] >= year_range[0]) & (table['Jahr'] <= year_range[1])]
+
+    def plot_totals(self, year_range: Optional[Tuple[int, int]] = None) -> Optional['go.Figure']:
+        """Chart 1: Zeitreihe der Gesamtmigration (Zuzug und Wegzug), optional auf einen Zeitraum beschränkt"""
+        if not self.available_years():
+            return None
+        return self._cached(('figure', 'totals', year_range), lambda: self._build_totals_figure(year_range))
+
+    def _build_totals_figure(self, year_range: Optional[Tuple[int, int]]) -> 'go.Figure':
+        import plotly.graph_objects as go
+        from src.figures import LEGEND_TOP_LEFT, TEMPLATE, note, scatter
+        table = self._filter_years(self.totals_table(), year_range)
+        years = table['Jahr'].tolist()
         
         fig1 = go.Figure()
-        fig1.add_trace(go.Scatter(
-            x=years,
-            y=total_zuzug,
+        fig1.add_trace(scatter(
+            years,
+            table['Zuzug'],
             mode='lines+markers',
             name='Zuzug (Ankunft)',
             line=dict(color='#2ecc71', width=3),
             marker=dict(size=8)
         ))
-        fig1.add_trace(go.Scatter(
-            x=years,
-            y=total_wegzug,
+        fig1.add_trace(scatter(
+            years,
+            table['Wegzug'],
             mode='lines+markers',
             name='Wegzug (Abgang)',
             line=dict(color='#e74c3c', width=3),
             marker=dict(size=8)
         ))
         fig1.update_layout(
-            title='Außenwanderung Konstanz 2010-2023',
+            title=f'Außenwanderung Konstanz {years[0]}-{years[-1]}' if years else 'Außenwanderung Konstanz',
             xaxis_title='Jahr',
             yaxis_title='Anzahl Personen',
-            template='plotly_white',
+            template=TEMPLATE,
             hovermode='x unified',
-            legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
-            margin=dict(l=60, r=60, t=60, b=100),  # Increase bottom margin
-            xaxis=dict(
-                title_standoff=15  # X-axis title offset
-            ),
+            legend=LEGEND_TOP_LEFT,
+            margin=dict(l=60, r=60, t=60),
             annotations=[
-                dict(
-                    text="<b>Berechnung:</b> Summe aller Zu- und Fortzüge pro Jahr. Daten aus Zeilen 'Jahr_ Zuzug' und 'Jahr_ Wegzug'",
-                    xref="paper", yref="paper",
-                    x=0.5, y=-0.18,  # Increase bottom offset to avoid overlapping with axis label
-                    xanchor="center", yanchor="top",
-                    showarrow=False,
-                    font=dict(size=9, color="gray")
-                )
+                note("<b>Berechnung:</b> Summe aller Zu- und Fortzüge pro Jahr. Daten aus Zeilen 'Jahr_ Zuzug' und 'Jahr_ Wegzug'")
             ]
         )
-        figures.append(fig1)
-        
-        # Chart 2: Migration balance by year
-        saldo = [z - w for z, w in zip(total_zuzug, total_wegzug)]
-        
-        colors = ['#2ecc71' if s > 0 else '#e74c3c' for s in saldo]
+        return fig1
+
+    def plot_saldo(self, year_range: Optional[Tuple[int, int]] = None) -> Optional['go.Figure']:
+        """Chart 2: Migrationssaldo je Jahr, optional auf einen Zeitraum beschränkt"""
+        if not self.available_years():
+            return None
+        return self._cached(('figure', 'saldo', year_range), lambda: self._build_saldo_figure(year_range))
+
+    def _build_saldo_figure(self, year_range: Optional[Tuple[int, int]]) -> 'go.Figure':
+        import plotly.graph_objects as go
+        from src.figures import TEMPLATE, display_values, note
+        table = self._filter_years(self.totals_table(), year_range)
+        saldo = display_values(table['Saldo'])
+        rounded = np.round(np.asarray(saldo, dtype=float))
         
         fig2 = go.Figure()
         fig2.add_trace(go.Bar(
-            x=years,
+            x=display_values(table['Jahr']),
             y=saldo,
             name='Migrationssaldo',
-            marker_color=colors,
-            text=[f'+{s:.0f}' if s > 0 else f'{s:.0f}' for s in saldo],
+            # Farbe nach Vorzeichen über eine Zwei-Farben-Skala (0/1 statt einer Farbliste)
+            marker=dict(
+                color=(np.asarray(saldo, dtype=float) > 0).astype(np.int8),
+                colorscale=[[0, '#e74c3c'], [1, '#2ecc71']], cmin=0, cmax=1
+            ),
+            # Vorzeichen nur bei positiven Werten (ein Template '%{y:+.0f}' zeigt 0 als '+0')
+            text=['' if np.isnan(v) else f'+{v:.0f}' if v > 0 else f'{v + 0:.0f}' for v in rounded],
             textposition='outside'
         ))
         fig2.add_hline(y=0, line_dash="dash", line_color="gray")
@@ -229,289 +336,265 @@ class DataVisualizer:
             title='Migrationssaldo (Zuzug - Wegzug)',
             xaxis_title='Jahr',
             yaxis_title='Saldo',
-            template='plotly_white',
+            template=TEMPLATE,
             showlegend=False,
-            margin=dict(b=100),  # Increase bottom margin
-            xaxis=dict(title_standoff=15),  # X-axis title offset
             annotations=[
-                dict(
-                    text="<b>Berechnung:</b> Migrationssaldo = Zuzug - Wegzug. Positive Werte = mehr Zuzüge, negative = mehr Fortzüge",
-                    xref="paper", yref="paper",
-                    x=0.5, y=-0.18,  # Move annotation lower to avoid overlapping with axis label
-                    xanchor="center", yanchor="top",
-                    showarrow=False,
-                    font=dict(size=9, color="gray")  # Slightly smaller font
-                )
+                note("<b>Berechnung:</b> Migrationssaldo = Zuzug - Wegzug. Positive Werte = mehr Zuzüge, negative = mehr Fortzüge")
             ]
         )
-        figures.append(fig2)
+        return fig2
+
+    def plot_top_dynamics(self, n: int = 5, criterion: str = DEFAULT_CRITERION) -> Optional['go.Figure']:
+        """Chart 3: Migrationssaldo der Top-n Länder über die Jahre (nur bei mehr als einem Jahr)"""
+        if len(self.available_years()) < 2:
+            return None
+        return self._cached(('figure', 'top_dynamics', n, criterion),
+                            lambda: self._build_top_dynamics_figure(n, criterion))
+
+    def _build_top_dynamics_figure(self, n: int, criterion: str) -> 'go.Figure':
+        import plotly.graph_objects as go
+        from src.figures import LEGEND_TOP_LEFT, TEMPLATE, note, scatter
+        table = self.top_dynamics_table(n, criterion)
+        years = table['Jahr'].tolist()
         
-        # Chart 3: Top countries dynamics over years
-        if len(years) > 1:
-            # Determine top countries (based on max absolute saldo across all years)
-            # This ensures countries with significant migration peaks (like Ukraine 2022) are included
-            country_max_abs_saldo = {}
-            for year in years:
-                zuzug_row_idx = None
-                wegzug_row_idx = None
-                for idx, row_key in enumerate(self.df[key_col]):
-                    row_key_str = str(row_key).strip()
-                    if f'{year}_ Zuzug' in row_key_str:
-                        zuzug_row_idx = idx
-                    elif f'{year}_ Wegzug' in row_key_str:
-                        wegzug_row_idx = idx
-                
-                if zuzug_row_idx is not None and wegzug_row_idx is not None:
-                    zuzug_data_row = self.df.iloc[zuzug_row_idx]
-                    wegzug_data_row = self.df.iloc[wegzug_row_idx]
-                    
-                    for col in self.df.columns:
-                        if col == key_col or col == 'quelle' or col in ['sonstige_staaten', 'unbekannt_ohne_angaben']:
-                            continue
-                        try:
-                            z_val = zuzug_data_row[col]
-                            w_val = wegzug_data_row[col]
-                            z = float(str(z_val).replace(',', '.')) if pd.notna(z_val) and str(z_val).strip() != '' and str(z_val).strip() != 'nan' else 0
-                            w = float(str(w_val).replace(',', '.')) if pd.notna(w_val) and str(w_val).strip() != '' and str(w_val).strip() != 'nan' else 0
-                            abs_saldo = abs(z - w)
-                            # Keep maximum absolute saldo for each country
-                            if col not in country_max_abs_saldo or abs_saldo > country_max_abs_saldo[col]:
-                                country_max_abs_saldo[col] = abs_saldo
-                        except:
-                            pass
-
-            sorted_countries_by_saldo = sorted(country_max_abs_saldo.items(), key=lambda x: x[1], reverse=True)
-            top_countries = [c[0] for c in sorted_countries_by_saldo[:5]]  # Top-5 by max absolute saldo
-            
-            # Collect yearly data for these countries
-            country_yearly_data = {country: {'zuzug': [], 'wegzug': [], 'saldo': []} for country in top_countries}
-            
-            for year in years:
-                # Find rows for this year
-                zuzug_row_idx = None
-                wegzug_row_idx = None
-                
-                for idx, row_key in enumerate(self.df[key_col]):
-                    row_key_str = str(row_key).strip()
-                    if f'{year}_ Zuzug' in row_key_str:
-                        zuzug_row_idx = idx
-                    elif f'{year}_ Wegzug' in row_key_str:
-                        wegzug_row_idx = idx
-                
-                if zuzug_row_idx is not None and wegzug_row_idx is not None:
-                    zuzug_row = self.df.iloc[zuzug_row_idx]
-                    wegzug_row = self.df.iloc[wegzug_row_idx]
-                    
-                    for country_col in top_countries:
-                        try:
-                            z_val = zuzug_row[country_col]
-                            w_val = wegzug_row[country_col]
-                            
-                            z = 0
-                            w = 0
-                            
-                            if pd.notna(z_val) and str(z_val).strip() != '' and str(z_val).strip() != 'nan':
-                                z = float(str(z_val).replace(',', '.'))
-                            if pd.notna(w_val) and str(w_val).strip() != '' and str(w_val).strip() != 'nan':
-                                w = float(str(w_val).replace(',', '.'))
-                            
-                            country_yearly_data[country_col]['zuzug'].append(z)
-                            country_yearly_data[country_col]['wegzug'].append(w)
-                            country_yearly_data[country_col]['saldo'].append(z - w)
-                        except:
-                            country_yearly_data[country_col]['zuzug'].append(0)
-                            country_yearly_data[country_col]['wegzug'].append(0)
-                            country_yearly_data[country_col]['saldo'].append(0)
-            
-            # Create chart
-            fig3 = go.Figure()
-            
-            # Add lines for top-5 countries
-            colors = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6']
-            for idx, country_col in enumerate(top_countries):
-                country_name = self._clean_country_name(country_col)
-                saldo_data = country_yearly_data[country_col]['saldo']
-                
-                fig3.add_trace(go.Scatter(
-                    x=years,
-                    y=saldo_data,
-                    mode='lines+markers',
-                    name=country_name,
-                    line=dict(color=colors[idx % len(colors)], width=2),
-                    marker=dict(size=6)
-                ))
-            
-            fig3.update_layout(
-                title='Migrationssaldo der Top 5 Länder (2010-2023)',
-                xaxis_title='Jahr',
-                yaxis_title='Migrationssaldo (Zuzug - Wegzug)',
-                template='plotly_white',
-                hovermode='x unified',
-                legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
-                height=400,
-                margin=dict(b=100),
-                xaxis=dict(title_standoff=15),
-                annotations=[
-                    dict(
-                        text="<b>Berechnung:</b> Migrationssaldo = Zuzug - Wegzug (positive Werte = Netto-Zuzug, negative = Netto-Wegzug)<br><b>Datenquelle:</b> Zeilen 'Jahr_ Zuzug' und 'Jahr_ Wegzug' aus dem Datensatz",
-                        xref="paper", yref="paper",
-                        x=0.5, y=-0.18,
-                        xanchor="center", yanchor="top",
-                        showarrow=False,
-                        font=dict(size=9, color="gray")
-                    )
-                ]
-            )
-            fig3.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
-            figures.append(fig3)
+        fig3 = go.Figure()
+
+        # Add lines for top-n countries
+        colors = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6']
+        for idx, country_name in enumerate(table.columns[1:]):
+            fig3.add_trace(scatter(
+                years,
+                table[country_name],
+                mode='lines+markers',
+                name=country_name,
+                line=dict(color=colors[idx % len(colors)], width=2),
+                marker=dict(size=6)
+            ))
+
+        fig3.update_layout(
+            title=f'Migrationssaldo der Top {n} Länder ({years[0]}-{years[-1]})'
+                  f'<br><sup>Auswahl: {RANKING_CRITERIA[criterion]}</sup>',
+            xaxis_title='Jahr',
+            yaxis_title='Migrationssaldo (Zuzug - Wegzug)',
+            template=TEMPLATE,
+            hovermode='x unified',
+            legend=LEGEND_TOP_LEFT,
+            height=400,
+            annotations=[
+                note("<b>Berechnung:</b> Migrationssaldo = Zuzug - Wegzug (positive Werte = Netto-Zuzug, negative = Netto-Wegzug)<br><b>Datenquelle:</b> Zeilen 'Jahr_ Zuzug' und 'Jahr_ Wegzug' aus dem Datensatz")
+            ]
+        )
+        fig3.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
+        return fig3
+
+    def plot_continent_totals(self) -> Optional['go.Figure']:
+        """Zu- und Fortzüge je Kontinent über die Jahre"""
+        if self.continent_table() is None:
+            return None
+        return self._cached(('figure', 'continent_totals'), self._build_continent_totals_figure)
+
+    def _build_continent_totals_figure(self) -> 'go.Figure':
+        import plotly.graph_objects as go
+        from src.figures import TEMPLATE, note, scatter
+        table = self.continent_table()
+        
+        fig = go.Figure()
+        for idx, (continent, rows) in enumerate(table.groupby('Kontinent', sort=False)):
+            color = CONTINENT_COLORS[idx % len(CONTINENT_COLORS)]
+            fig.add_trace(scatter(
+                rows['Jahr'],
+                rows['Zuzug'],
+                mode='lines+markers',
+                name=f'{continent} Zuzug',
+                legendgroup=continent,
+                line=dict(color=color, width=2),
+                marker=dict(size=6)
+            ))
+            fig.add_trace(scatter(
+                rows['Jahr'],
+                rows['Wegzug'],
+                mode='lines',
+                name=f'{continent} Wegzug',
+                legendgroup=continent,
+                line=dict(color=color, width=2, dash='dash')
+            ))
         
-        return figures, years
+        fig.update_layout(
+            title='Zu- und Fortzüge nach Kontinenten',
+            xaxis_title='Jahr',
+            yaxis_title='Anzahl Personen (logarithmisch)',
+            yaxis_type='log',
+            template=TEMPLATE,
+            hovermode='x unified',
+            height=450,
+            annotations=[
+                note("<b>Berechnung:</b> Summe der Länderspalten je Kontinent laut Zeile 'Kontinent' (durchgezogen = Zuzug, gestrichelt = Wegzug)")
+            ]
+        )
+        return fig
+
+    def plot_continent_saldo(self) -> Optional['go.Figure']:
+        """Migrationssaldo je Kontinent und Jahr (gruppierte Balken)"""
+        if self.continent_table() is None:
+            return None
+        return self._cached(('figure', 'continent_saldo'), self._build_continent_saldo_figure)
+
+    def _build_continent_saldo_figure(self) -> 'go.Figure':
+        import plotly.graph_objects as go
+        from src.figures import TEMPLATE, display_values, note
+        table = self.continent_table()
+        
+        fig = go.Figure()
+        for idx, (continent, rows) in enumerate(table.groupby('Kontinent', sort=False)):
+            fig.add_trace(go.Bar(
+                x=display_values(rows['Jahr']),
+                y=display_values(rows['Saldo']),
+                name=continent,
+                marker_color=CONTINENT_COLORS[idx % len(CONTINENT_COLORS)]
+            ))
+        fig.add_hline(y=0, line_dash="dash", line_color="gray")
+        fig.update_layout(
+            title='Migrationssaldo nach Kontinenten',
+            xaxis_title='Jahr',
+            yaxis_title='Saldo',
+            template=TEMPLATE,
+            barmode='group',
+            height=450,
+            annotations=[
+                note("<b>Berechnung:</b> Migrationssaldo = Zuzug - Wegzug, summiert über alle Länder eines Kontinents")
+            ]
+        )
+        return fig
+
+    def plot_migration_data(self) -> Tuple[List['go.Figure'], List[int]]:
+        """
+        Spezielle Visualisierung für Migrationsdaten (Aussenwanderung)
+        Erstellt alle Grafiken auf einmal: Zeitreihe, Migrationssaldo, Dynamik Top-Länder.
+        Für einzelne Grafiken plot_totals(), plot_saldo() bzw. plot_top_dynamics() verwenden.
+        
+        Returns:
+            Tuple von (Liste von Figuren, Liste von verfügbaren Jahren)
+        """
+        # Check if this is migration data
+        if self.cube is None:
+            logger.warning("Keine Migrationsdaten erkannt")
+            return [], []
+        
+        years = self.available_years()
+        if not years:
+            logger.warning("Keine Jahresdaten gefunden")
+            return [], []
+        
+        figures = [self.chart(name) for name in MIGRATION_CHARTS]
+        return [fig for fig in figures if fig is not None], years
     
-    def plot_top_countries_by_year(self, selected_year: int):
+    def plot_top_countries_by_year(self, selected_year: int, top_n: Optional[int] = None,
+                                   continent: Optional[str] = None):
         """
-        Erstellt zwei Grafiken: Top 10 Länder nach Zuzug und Top 10 Länder nach Wegzug für ein bestimmtes Jahr
+        Erstellt zwei Grafiken: Top N Länder nach Zuzug und Top N Länder nach Wegzug für ein bestimmtes Jahr
         
         Args:
             selected_year: Das ausgewählte Jahr
+            top_n: Anzahl der Länder (Standard: top_n des Visualizers)
+            continent: nur Länder dieses Kontinents (Drill-down)
             
         Returns:
             Tuple von (fig_zuzug, fig_wegzug) oder (None, None) wenn keine Daten
         """
-        key_col = 'herkunftsgebiet_wegzugsgebiet'
-        
-        if key_col not in self.df.columns:
+        if self.cube is None:
             return None, None
         
-        # Finde Zeilen für das ausgewählte Jahr
-        zuzug_row = None
-        wegzug_row = None
-        
-        for idx, row_key in enumerate(self.df[key_col]):
-            row_key_str = str(row_key).strip()
-            if f'{selected_year}_ Zuzug' in row_key_str:
-                zuzug_row = idx
-            elif f'{selected_year}_ Wegzug' in row_key_str:
-                wegzug_row = idx
-        
-        if zuzug_row is None or wegzug_row is None:
+        if not all((selected_year, direction) in self.index for direction in DIRECTIONS):
             return None, None
         
-        zuzug_data_row = self.df.iloc[zuzug_row]
-        wegzug_data_row = self.df.iloc[wegzug_row]
+        top_n = top_n or self.top_n
+        cache_key = (self.cube.year_fingerprint(selected_year), 'figure', 'top_by_year', selected_year, top_n, continent)
         
-        # Sammle Daten für Zuzug
-        zuzug_totals = {}
-        for col in self.df.columns:
-            if col == key_col or col == 'quelle':
-                continue
-            if col in ['sonstige_staaten', 'unbekannt_ohne_angaben']:
-                continue
-            
-            try:
-                z_val = zuzug_data_row[col]
-                z = 0
-                if pd.notna(z_val) and str(z_val).strip() != '' and str(z_val).strip() != 'nan':
-                    z = float(str(z_val).replace(',', '.'))
-                if z > 0:
-                    zuzug_totals[col] = z
-            except:
-                pass
+        def build():
+            zuzug_table = self.top_countries_table(selected_year, 'Zuzug', top_n, continent)
+            wegzug_table = self.top_countries_table(selected_year, 'Wegzug', top_n, continent)
+            with span('build_figure', chart='top_by_year', year=selected_year):
+                return self._build_top_figures(
+                    str(selected_year), f'im Jahr {selected_year}', top_n, zuzug_table, wegzug_table, continent
+                )
         
-        # Sammle Daten für Wegzug
-        wegzug_totals = {}
-        for col in self.df.columns:
-            if col == key_col or col == 'quelle':
-                continue
-            if col in ['sonstige_staaten', 'unbekannt_ohne_angaben']:
-                continue
-            
-            try:
-                w_val = wegzug_data_row[col]
-                w = 0
-                if pd.notna(w_val) and str(w_val).strip() != '' and str(w_val).strip() != 'nan':
-                    w = float(str(w_val).replace(',', '.'))
-                if w > 0:
-                    wegzug_totals[col] = w
-            except:
-                pass
+        return chart_cache.get_or_build(cache_key, build)
+    
+    def plot_top_countries_by_range(self, year_from: int, year_to: int, top_n: Optional[int] = None):
+        """
+        Erstellt zwei Grafiken: Top N Länder nach Zuzug und nach Wegzug, summiert über einen Zeitraum
+        
+        Returns:
+            Tuple von (fig_zuzug, fig_wegzug), einzelne Einträge None wenn keine Daten
+        """
+        if not self.available_years():
+            return None, None
+        top_n = top_n or self.top_n
+        return self._cached(
+            ('figure', 'top_by_range', year_from, year_to, top_n),
+            lambda: self._build_top_figures(
+                f'{year_from}-{year_to}', f'im Zeitraum {year_from}-{year_to}', top_n,
+                self.top_countries_range_table(year_from, year_to, 'Zuzug', top_n),
+                self.top_countries_range_table(year_from, year_to, 'Wegzug', top_n)
+            )
+        )
+    
+    def _build_top_figures(self, period: str, period_text: str, top_n: int,
+                           zuzug_table: 'pd.DataFrame', wegzug_table: 'pd.DataFrame',
+                           continent: Optional[str] = None):
+        import plotly.graph_objects as go
+        from src.figures import TEMPLATE, display_values, note
+        scope = f' ({continent})' if continent else ''
         
         # Erstelle Grafik für Zuzug
         fig_zuzug = None
-        if zuzug_totals:
-            sorted_zuzug = sorted(zuzug_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-            countries_z = [self._clean_country_name(c[0]) for c in sorted_zuzug]
-            values_z = [float(c[1]) for c in sorted_zuzug]
-            
+        if len(zuzug_table):
             fig_zuzug = go.Figure()
             fig_zuzug.add_trace(go.Bar(
-                x=values_z,
-                y=countries_z,
+                x=display_values(zuzug_table.iloc[:, 1]),
+                y=zuzug_table['Land'].tolist(),
                 orientation='h',
                 marker_color='#2ecc71',
-                text=[f'{v:.0f}' for v in values_z],
+                texttemplate='%{x:.0f}',
                 textposition='outside',
                 textfont=dict(size=11)
             ))
             fig_zuzug.update_layout(
-                title=f'Top 10 Länder nach Zuzug {selected_year}',
+                title=f'Top {top_n} Länder{scope} nach Zuzug {period}',
                 xaxis_title='Anzahl Personen (Zuzug)',
                 yaxis_title='Land',
-                template='plotly_white',
+                template=TEMPLATE,
                 height=500,
                 yaxis=dict(autorange='reversed'),
                 margin=dict(l=120, r=100, t=60, b=120),  # Increase margins: right for numbers, bottom for annotations
-                xaxis=dict(
-                    title_standoff=15  # X-axis title offset
-                ),
                 annotations=[
-                    dict(
-                        text=f"<b>Berechnung:</b> Anzahl der Zuzüge (Ankünfte) aus jedem Land im Jahr {selected_year}",
-                        xref="paper", yref="paper",
-                        x=0.5, y=-0.20,  # Increase bottom offset to avoid overlapping with axis label
-                        xanchor="center", yanchor="top",
-                        showarrow=False,
-                        font=dict(size=9, color="gray")
-                    )
+                    note(f"<b>Berechnung:</b> Anzahl der Zuzüge (Ankünfte) aus jedem Land {period_text}", y=-0.20)
                 ]
             )
         
         # Erstelle Grafik für Wegzug
         fig_wegzug = None
-        if wegzug_totals:
-            sorted_wegzug = sorted(wegzug_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-            countries_w = [self._clean_country_name(c[0]) for c in sorted_wegzug]
-            values_w = [float(c[1]) for c in sorted_wegzug]
-            
+        if len(wegzug_table):
             fig_wegzug = go.Figure()
             fig_wegzug.add_trace(go.Bar(
-                x=values_w,
-                y=countries_w,
+                x=display_values(wegzug_table.iloc[:, 1]),
+                y=wegzug_table['Land'].tolist(),
                 orientation='h',
                 marker_color='#e74c3c',
-                text=[f'{v:.0f}' for v in values_w],
+                texttemplate='%{x:.0f}',
                 textposition='outside',
                 textfont=dict(size=11)
             ))
             fig_wegzug.update_layout(
-                title=f'Top 10 Länder nach Wegzug {selected_year}',
+                title=f'Top {top_n} Länder{scope} nach Wegzug {period}',
                 xaxis_title='Anzahl Personen (Wegzug)',
                 yaxis_title='Land',
-                template='plotly_white',
+                template=TEMPLATE,
                 height=500,
                 yaxis=dict(autorange='reversed'),
                 margin=dict(l=120, r=100, t=60, b=120),  # Increase margins: right for numbers, bottom for annotations
-                xaxis=dict(
-                    title_standoff=15  # X-axis title offset
-                ),
                 annotations=[
-                    dict(
-                        text=f"<b>Berechnung:</b> Anzahl der Fortzüge (Abgänge) in jedes Land im Jahr {selected_year}",
-                        xref="paper", yref="paper",
-                        x=0.5, y=-0.20,  # Increase bottom offset to avoid overlapping with axis label
-                        xanchor="center", yanchor="top",
-                        showarrow=False,
-                        font=dict(size=9, color="gray")
-                    )
+                    note(f"<b>Berechnung:</b> Anzahl der Fortzüge (Abgänge) in jedes Land {period_text}", y=-0.20)
                 ]
             )
         
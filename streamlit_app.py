@@ -3,15 +3,16 @@ Streamlit App für Konstanz Open Data Explorer
 Mini-Web-App zur Analyse und Visualisierung von Statistikdaten
 """
 
-import streamlit as st
-import pandas as pd
-from pathlib import Path
-import sys
+import time
+
+# Startzeit des Durchlaufs für die Messung bis zur ersten Grafik
+script_start = time.perf_counter()
 
-# Füge src zum Pfad hinzu
-sys.path.append(str(Path(__file__).parent))
+import streamlit as st
 
-from src.visualizer import DataVisualizer
+# Nur leichte Importe vor dem Seitengerüst; pandas, Plotly und die Datenmodule folgen nach Titel und Sidebar
+from src import DEFAULT_SOURCE
+from src.instrumentation import collect, span
 
 # Konfiguration
 st.set_page_config(
@@ -62,162 +63,317 @@ with st.sidebar:
     """)
 
 # Load migration data file
-@st.cache_data
-def load_data():
-    """Load migration data from CSV file"""
-    migration_file = Path("data/raw/Aussenwanderung_nach_Herkunfts_Ziel-Staat_2010-2023_0_0.csv")
-    try:
-        df = pd.read_csv(migration_file, sep=';', encoding='utf-8')
-        return df
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Daten: {e}")
-        return None
+@st.cache_resource(show_spinner=False)
+def load_dataset():
+    """
+    Load parsed migration data (shared segment in data/processed, see src/shared.py)
+    Ein Datensatz pro Prozess für alle Sessions; die Zahlen sind per Memory-Mapping zwischen
+    allen Server-Prozessen geteilt und werden nie kopiert. Nach einer Aktualisierung
+    (src.ingest oder python -m src.shared) wechselt current() auf das neue Segment.
+    Fehler werden nicht abgefangen: st.cache_resource speichert nur Erfolge, der nächste
+    Durchlauf versucht es erneut.
+    """
+    return SharedDataset(DEFAULT_SOURCE)
+
+def download_buttons(table: 'pd.DataFrame', name: str, version: str):
+    """Download-Buttons für eine Tabelle; die Datei wird erst beim Klick erzeugt und pro Datenversion gecacht"""
+    formats = available_formats()
+    for col, fmt in zip(st.columns(len(formats)), formats):
+        with col:
+            st.download_button(
+                f"{fmt.upper()} herunterladen",
+                data=lambda fmt=fmt: export_bytes(table, fmt, cache_key=(version, name)),
+                file_name=file_name(name, fmt),
+                mime=mime_type(fmt),
+                key=f"download_{name}_{fmt}",
+                on_click='ignore'
+            )
+
+def show_chart(fig):
+    """
+    st.plotly_chart mit Zeitmessung (Serialisierung der Grafik), im Debug-Modus mit Payload-Größe
+    Bei der ersten Grafik eines Durchlaufs wird zusätzlich die Zeit seit Skriptstart erfasst.
+    """
+    global first_chart_pending
+    counts = {'bytes': payload_bytes(fig)} if debug_mode else {}
+    with span('plotly_chart', traces=len(fig.data), **counts) as event:
+        st.plotly_chart(fig, width='stretch')
+        if first_chart_pending:
+            first_chart_pending = False
+            event['since_start_ms'] = round((time.perf_counter() - script_start) * 1000, 1)
+
+first_chart_pending = True
+
+# Versteckter Debug-Modus: ?debug=1 an die URL anhängen
+debug_mode = st.query_params.get("debug") == "1"
 
 # Main content - visualization only
 st.header("Visualisierung")
 
-df = load_data()
+with collect() as trace_events:
+    # Beim Kaltstart dominiert der Import von pandas; Titel und Sidebar sind zu diesem Zeitpunkt schon sichtbar
+    with st.spinner("Daten werden geladen …"):
+        with span('import_modules'):
+            import pandas as pd
+            from src.cache import cache_stats
+            from src.export import available_formats, export_bytes, file_name, mime_type
+            from src.figures import payload_bytes
+            from src.rankings import RANKING_CRITERIA
+            from src.shared import SharedDataset
+        with span('load_dataset'):
+            try:
+                visualizer = load_dataset().current()
+            except Exception as e:
+                st.error(f"Fehler beim Laden der Daten: {e}")
+                visualizer = None
 
-if df is None:
-    st.error("Daten konnten nicht geladen werden. Bitte überprüfen Sie, ob die Datei vorhanden ist.")
-    st.stop()
-else:
-    
-    # Prüfe Datentyp und zeige passende Visualisierungen
-    visualizer = DataVisualizer(df)
+    if visualizer is None:
+        st.error("Daten konnten nicht geladen werden. Bitte überprüfen Sie, ob die Datei vorhanden ist.")
+        st.stop()
+    else:
+        cube = visualizer.cube
     
-    # Spezielle Visualisierung für Migrationsdaten
-    if 'herkunftsgebiet_wegzugsgebiet' in df.columns:
-        st.subheader("Außenwanderung Konstanz 2010-2023")
+        # Spezielle Visualisierung für Migrationsdaten
+        if cube.years:
+            st.subheader(f"Außenwanderung Konstanz {cube.years[0]}-{cube.years[-1]}")
         
-        # Interesting facts and patterns
-        with st.expander("Interessante Fakten und Muster", expanded=False):
-            st.markdown("""
-            **Wichtige Erkenntnisse aus der Analyse:**
-            
-            **1. Ukraine-Krise 2022:**
-            - Im Jahr 2022 gab es einen dramatischen Anstieg der Zuzüge aus der Ukraine: **1.478 Personen** (vs. durchschnittlich ~20-50 in den Vorjahren)
-            - Das Migrationssaldo betrug **+1.253** (1.478 Zuzug - 225 Wegzug), was den größten Einzeljahreseffekt für ein Land darstellt
-            - Dies spiegelt die Fluchtbewegungen nach dem Beginn des Krieges wider
-            
-            **2. Geografische Nähe zu Schweiz:**
-            - Die Schweiz ist durchgehend das Land mit den höchsten Wegzügen (813 in 2023, 799 in 2022)
-            - Dies ist logisch, da Konstanz direkt an der Schweizer Grenze liegt und viele Menschen für Arbeit oder Lebensqualität in die Schweiz ziehen
+            # Interesting facts and patterns: Platz reservieren, gefüllt nach den Grafiken (erste Grafik zuerst)
+            insights_slot = st.container()
+        
+            if cube.quality is not None:
+                quality = cube.quality.summary()
+                with st.expander("Datenqualität beim Einlesen", expanded=quality['rejected'] > 0):
+                    st.caption(
+                        f"{quality['data_rows']} Datenzeilen, {quality['metadata_rows']} Metadatenzeilen, "
+                        f"{quality['ignored_rows']} ignorierte Zeilen · {quality['coerced']} fehlende Werte "
+                        f"('-', 'nan', leer) · {quality['rejected']} Zellen ohne Zahlenwert"
+                    )
+                    st.dataframe(cube.quality.to_frame(), width='stretch')
+        
+            available_years = visualizer.available_years()
+        
+            if available_years:
+                # Zeitraum für Chart 1 und 2 (Summen über den Präfixsummen-Index)
+                year_range = (available_years[0], available_years[-1])
+                if len(available_years) > 1:
+                    year_range = st.select_slider(
+                        "Zeitraum:",
+                        options=available_years,
+                        value=year_range
+                    )
+                range_summary = visualizer.range_summary(*year_range)
+                zuzug_col, wegzug_col, saldo_col = st.columns(3)
+                zuzug_col.metric(f"Zuzug {year_range[0]}-{year_range[1]}", f"{range_summary['Zuzug']:,.0f}",
+                                 help=f"Ø {range_summary['Zuzug/Jahr']:,.0f} pro Jahr")
+                wegzug_col.metric(f"Wegzug {year_range[0]}-{year_range[1]}", f"{range_summary['Wegzug']:,.0f}",
+                                  help=f"Ø {range_summary['Wegzug/Jahr']:,.0f} pro Jahr")
+                saldo_col.metric(f"Saldo {year_range[0]}-{year_range[1]}", f"{range_summary['Saldo']:+,.0f}",
+                                 help=f"Ø {range_summary['Saldo/Jahr']:+,.0f} pro Jahr")
+                
+                # Chart 1: Time series (jede Grafik wird erst beim Rendern berechnet)
+                fig_totals = visualizer.plot_totals(year_range)
+                show_chart(fig_totals)
             
-            **3. Regionale Migration innerhalb Deutschlands:**
-            - **Baden-Württemberg** ist der größte Zuzugsquelle (4.482 in 2023, 4.577 in 2022)
-            - **Deutschland (ohne BW)** folgt als zweitgrößte Quelle (1.737 in 2023)
-            - Dies zeigt die Bedeutung der Binnenmigration innerhalb Deutschlands
+                # Show raw data for this chart
+                with st.expander("Rohdaten: Gesamtmigration nach Jahren", expanded=False):
+                    summary_df = visualizer.totals_table()
+                    st.dataframe(summary_df, width='stretch')
+                    download_buttons(summary_df, "gesamtmigration", cube.fingerprint)
             
-            **4. Stabile europäische Migration:**
-            - Länder wie **Italien**, **Polen**, **Rumänien** und **Kroatien** zeigen kontinuierlich hohe Migrationszahlen
-            - Diese spiegeln die EU-Freizügigkeit und Arbeitsmigration wider
+                # Chart 2: Migration balance
+                show_chart(visualizer.plot_saldo(year_range))
             
-            **5. Langfristige Trends:**
-            - Die Gesamtzahl der Zuzüge schwankt zwischen ~6.000-7.000 Personen pro Jahr
-            - Das Migrationssaldo ist meist positiv, was auf ein Bevölkerungswachstum durch Migration hinweist
-            - Die COVID-19-Pandemie (2020-2021) zeigt leichte Rückgänge in der Migration
-            """)
-        
-        with st.spinner("Erstelle Visualisierungen..."):
-            figures, available_years = visualizer.plot_migration_data()
+                # Weitere Ansichten: nur die ausgewählte wird berechnet
+                view = st.radio(
+                    "Ansicht:",
+                    ["Top-Länder nach Jahr", "Top-Länder im Zeitraum", "Dynamik der Top-Länder", "Kontinente"],
+                    horizontal=True
+                )
             
-            if figures:
-                # Chart 1: Time series
-                if len(figures) > 0:
-                    st.plotly_chart(figures[0], use_container_width=True)
-                    
-                    # Show raw data for this chart
-                    with st.expander("Rohdaten: Gesamtmigration nach Jahren", expanded=False):
-                        # Extract data from chart
-                        years_data = figures[0].data[0].x
-                        zuzug_data = figures[0].data[0].y
-                        wegzug_data = figures[0].data[1].y
-                        
-                        summary_df = pd.DataFrame({
-                            'Jahr': years_data,
-                            'Zuzug': zuzug_data,
-                            'Wegzug': wegzug_data,
-                            'Saldo': [z - w for z, w in zip(zuzug_data, wegzug_data)]
-                        })
-                        st.dataframe(summary_df, use_container_width=True)
-                
-                # Chart 2: Migration balance
-                if len(figures) > 1:
-                    st.plotly_chart(figures[1], use_container_width=True)
+                if view == "Top-Länder nach Jahr":
+                    # Charts 3 and 4: Top N countries by Zuzug and Wegzug (with year selection)
+                    st.subheader("Top-Länder nach Zuzug und Wegzug")
                 
-                # Charts 3 and 4: Top 10 countries by Zuzug and Wegzug (with year selection)
-                st.subheader("Top 10 Länder nach Zuzug und Wegzug")
+                    # Dropdown for year selection
+                    year_col, n_col = st.columns([3, 1])
+                    with year_col:
+                        selected_year = st.selectbox(
+                            "Jahr auswählen:",
+                            available_years,
+                            index=len(available_years) - 1  # Default to last year
+                        )
+                    with n_col:
+                        top_n = st.number_input("Anzahl Länder:", min_value=3, max_value=30, value=10, step=1)
                 
-                # Dropdown for year selection
-                if available_years:
-                    selected_year = st.selectbox(
-                        "Jahr auswählen:",
-                        available_years,
-                        index=len(available_years) - 1  # Default to last year
-                    )
-                    
                     if selected_year:
                         try:
-                            fig_zuzug, fig_wegzug = visualizer.plot_top_countries_by_year(selected_year)
-                            
+                            fig_zuzug, fig_wegzug = visualizer.plot_top_countries_by_year(selected_year, int(top_n))
+                        
                             col1, col2 = st.columns(2)
-                            
+                        
                             with col1:
                                 if fig_zuzug is not None:
-                                    st.plotly_chart(fig_zuzug, use_container_width=True)
-                                    
-                                    with st.expander("Rohdaten: Top 10 Zuzug", expanded=False):
-                                        countries_z = fig_zuzug.data[0].y
-                                        values_z = fig_zuzug.data[0].x
-                                        zuzug_df = pd.DataFrame({
-                                            'Land': countries_z,
-                                            f'Zuzug {selected_year}': values_z
-                                        })
-                                        st.dataframe(zuzug_df, use_container_width=True)
+                                    show_chart(fig_zuzug)
+                                
+                                    with st.expander(f"Rohdaten: Top {top_n} Zuzug", expanded=False):
+                                        zuzug_df = visualizer.top_countries_table(selected_year, 'Zuzug', int(top_n))
+                                        st.dataframe(zuzug_df, width='stretch')
+                                        download_buttons(zuzug_df, f"top{top_n}_zuzug_{selected_year}", cube.fingerprint)
                                         st.caption(f"Anzahl der Zuzüge (Ankünfte) aus jedem Land im Jahr {selected_year}")
                                 else:
                                     st.warning("Keine Zuzug-Daten verfügbar für dieses Jahr")
-                            
+                        
                             with col2:
                                 if fig_wegzug is not None:
-                                    st.plotly_chart(fig_wegzug, use_container_width=True)
-                                    
-                                    with st.expander("Rohdaten: Top 10 Wegzug", expanded=False):
-                                        countries_w = fig_wegzug.data[0].y
-                                        values_w = fig_wegzug.data[0].x
-                                        wegzug_df = pd.DataFrame({
-                                            'Land': countries_w,
-                                            f'Wegzug {selected_year}': values_w
-                                        })
-                                        st.dataframe(wegzug_df, use_container_width=True)
+                                    show_chart(fig_wegzug)
+                                
+                                    with st.expander(f"Rohdaten: Top {top_n} Wegzug", expanded=False):
+                                        wegzug_df = visualizer.top_countries_table(selected_year, 'Wegzug', int(top_n))
+                                        st.dataframe(wegzug_df, width='stretch')
+                                        download_buttons(wegzug_df, f"top{top_n}_wegzug_{selected_year}", cube.fingerprint)
                                         st.caption(f"Anzahl der Fortzüge (Abgänge) in jedes Land im Jahr {selected_year}")
                                 else:
                                     st.warning("Keine Wegzug-Daten verfügbar für dieses Jahr")
                         except Exception as e:
                             st.error(f"Fehler beim Erstellen der Grafiken: {e}")
                             st.exception(e)
-                else:
-                    st.warning("Keine Jahre verfügbar")
+            
+                elif view == "Top-Länder im Zeitraum":
+                    # Top N Länder über den oben gewählten Zeitraum, dazu Vergleich mit einem zweiten Zeitraum
+                    st.subheader(f"Top-Länder im Zeitraum {year_range[0]}-{year_range[1]}")
+                    top_n = st.number_input("Anzahl Länder:", min_value=3, max_value=30, value=10, step=1,
+                                            key="range_top_n")
+                    
+                    fig_zuzug, fig_wegzug = visualizer.plot_top_countries_by_range(*year_range, int(top_n))
+                    col1, col2 = st.columns(2)
+                    for col, fig, direction in ((col1, fig_zuzug, 'Zuzug'), (col2, fig_wegzug, 'Wegzug')):
+                        with col:
+                            if fig is not None:
+                                show_chart(fig)
+                                with st.expander(f"Rohdaten: Top {top_n} {direction}", expanded=False):
+                                    range_df = visualizer.top_countries_range_table(*year_range, direction, int(top_n))
+                                    st.dataframe(range_df, width='stretch')
+                                    download_buttons(
+                                        range_df,
+                                        f"top{top_n}_{direction.lower()}_{year_range[0]}-{year_range[1]}",
+                                        cube.fingerprint
+                                    )
+                            else:
+                                st.warning(f"Keine {direction}-Daten verfügbar für diesen Zeitraum")
+                    
+                    if len(available_years) > 1:
+                        st.subheader("Zeitraum-Vergleich")
+                        compare_range = st.select_slider(
+                            "Vergleichszeitraum:",
+                            options=available_years,
+                            value=(available_years[0], available_years[len(available_years) // 2 - 1]),
+                            key="compare_range"
+                        )
+                        compare_summary = visualizer.range_summary(*compare_range)
+                        # Mittelwerte pro Jahr, damit unterschiedlich lange Zeiträume vergleichbar sind
+                        comparison = pd.DataFrame(
+                            {
+                                f"{compare_range[0]}-{compare_range[1]}": [compare_summary[k] for k in ('Zuzug/Jahr', 'Wegzug/Jahr', 'Saldo/Jahr')],
+                                f"{year_range[0]}-{year_range[1]}": [range_summary[k] for k in ('Zuzug/Jahr', 'Wegzug/Jahr', 'Saldo/Jahr')],
+                            },
+                            index=['Zuzug pro Jahr', 'Wegzug pro Jahr', 'Saldo pro Jahr']
+                        )
+                        comparison['Differenz'] = comparison.iloc[:, 1] - comparison.iloc[:, 0]
+                        st.dataframe(comparison.round(1), width='stretch')
                 
-                # Chart 5: Top countries dynamics
-                if len(figures) > 2:
-                    st.plotly_chart(figures[2], use_container_width=True)
-                    st.caption("**Hinweis:** Migrationssaldo = Zuzug - Wegzug. Positive Werte bedeuten Netto-Zuzug (mehr Menschen ziehen zu als weg), negative Werte bedeuten Netto-Wegzug.")
+                elif view == "Dynamik der Top-Länder":
+                    # Chart 5: Top countries dynamics (Auswahl nach Kriterium, Anzahl einstellbar)
+                    crit_col, k_col = st.columns([3, 1])
+                    with crit_col:
+                        criterion = st.selectbox(
+                            "Auswahl der Länder nach:",
+                            list(RANKING_CRITERIA),
+                            format_func=RANKING_CRITERIA.get
+                        )
+                    with k_col:
+                        top_k = int(st.number_input("Anzahl Länder:", min_value=1, max_value=20, value=5, step=1,
+                                                    key="dynamics_top_k"))
                     
-                    # Show raw data for dynamics chart
-                    with st.expander("Rohdaten: Migrationssaldo Top 5 Länder nach Jahren", expanded=False):
-                        # Extract data from chart
-                        years_dyn = figures[2].data[0].x
-                        countries_dyn = [trace.name for trace in figures[2].data]
-                        saldo_data = {country: trace.y for country, trace in zip(countries_dyn, figures[2].data)}
+                    fig_dynamics = visualizer.plot_top_dynamics(top_k, criterion)
+                    if fig_dynamics is not None:
+                        show_chart(fig_dynamics)
+                        st.caption("**Hinweis:** Migrationssaldo = Zuzug - Wegzug. Positive Werte bedeuten Netto-Zuzug (mehr Menschen ziehen zu als weg), negative Werte bedeuten Netto-Wegzug.")
+                    
+                        # Show raw data for dynamics chart
+                        with st.expander(f"Rohdaten: Migrationssaldo Top {top_k} Länder nach Jahren", expanded=False):
+                            dyn_df = visualizer.top_dynamics_table(top_k, criterion)
+                            st.dataframe(dyn_df, width='stretch')
+                            download_buttons(dyn_df, f"saldo_top{top_k}_dynamik_{criterion}", cube.fingerprint)
+                            example = next((i for i in visualizer.insights() if i['Art'] == 'saldo_effect'), None)
+                            st.caption("Migrationssaldo = Zuzug - Wegzug." + (f" Beispiel: {example['Text']}" if example else ""))
+                    else:
+                        st.info("Für die Dynamik werden mindestens zwei Jahre benötigt")
+                
+                else:
+                    # Kontinent-Ansicht: Summen und Saldo je Kontinent, Drill-down auf Länder
+                    continents = cube.continent_names()
+                    if continents:
+                        show_chart(visualizer.plot_continent_saldo())
+                        show_chart(visualizer.plot_continent_totals())
+                        
+                        with st.expander("Rohdaten: Migration nach Kontinenten", expanded=False):
+                            continent_df = visualizer.continent_table()
+                            st.dataframe(continent_df, width='stretch')
+                            download_buttons(continent_df, "migration_kontinente", cube.fingerprint)
                         
-                        dyn_df = pd.DataFrame({
-                            'Jahr': years_dyn,
-                            **{country: saldo_data[country] for country in countries_dyn}
-                        })
-                        st.dataframe(dyn_df, use_container_width=True)
-                        st.caption("Migrationssaldo = Zuzug - Wegzug. Beispiel: Ukraine 2022: 1478 Zuzug - 225 Wegzug = 1253 Saldo")
+                        st.subheader("Drill-down: Top-Länder eines Kontinents")
+                        cont_col, year_col = st.columns(2)
+                        with cont_col:
+                            selected_continent = st.selectbox("Kontinent auswählen:", continents)
+                        with year_col:
+                            continent_year = st.selectbox(
+                                "Jahr auswählen:",
+                                available_years,
+                                index=len(available_years) - 1,
+                                key="continent_year"
+                            )
+                        
+                        fig_zuzug, fig_wegzug = visualizer.plot_top_countries_by_year(
+                            continent_year, continent=selected_continent
+                        )
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            if fig_zuzug is not None:
+                                show_chart(fig_zuzug)
+                            else:
+                                st.info("Keine Zuzüge aus diesem Kontinent im gewählten Jahr")
+                        with col2:
+                            if fig_wegzug is not None:
+                                show_chart(fig_wegzug)
+                            else:
+                                st.info("Keine Wegzüge in diesen Kontinent im gewählten Jahr")
+                    else:
+                        st.info("Der Datensatz enthält keine Zeile 'Kontinent'")
             else:
                 st.warning("Konnte keine Visualisierungen erstellen")
+            
+            # Aus den Daten berechnet (src/insights.py), pro Datenversion gecacht
+            insights = visualizer.insights()
+            if insights:
+                with insights_slot.expander("Interessante Fakten und Muster", expanded=False):
+                    lines, category = [], None
+                    for insight in insights:
+                        if insight['Kategorie'] != category:
+                            category = insight['Kategorie']
+                            lines.append(f"\n**{category}:**")
+                        lines.append(f"- {insight['Text']}")
+                    st.markdown("\n".join(lines))
+                    st.caption("Automatisch berechnet: Abweichung vom Mittel der übrigen Jahre, Z-Score je Land, "
+                               "Veränderung zum Vorjahr und Steigung über die letzten Jahre.")
 
+if debug_mode:
+    with st.sidebar.expander("Debug: Laufzeiten", expanded=True):
+        if trace_events:
+            st.dataframe(pd.DataFrame(trace_events), width='stretch')
+            st.caption(f"Gesamt: {sum(e['duration_ms'] for e in trace_events):.1f} ms in {len(trace_events)} Messpunkten")
+            payload = sum(e.get('bytes', 0) for e in trace_events if e['span'] == 'plotly_chart')
+            st.caption(f"Grafiken: {payload / 1024:.1f} KB JSON an den Browser")
+        else:
+            st.caption("Keine Messpunkte in diesem Durchlauf (alles aus dem Cache)")
+    with st.sidebar.expander("Debug: Caches (prozessweit)", expanded=False):
+        st.dataframe(pd.DataFrame(cache_stats()), width='stretch')
@@ -0,0 +1,21 @@
+"""
+Gemeinsame Fixtures der Tests
+Aufruf aus dem Projektverzeichnis: python -m pytest
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+SOURCE = ROOT / 'data' / 'raw' / 'Aussenwanderung_nach_Herkunfts_Ziel-Staat_2010-2023_0_0.csv'
+
+
+@pytest.fixture
+def source() -> Path:
+    """Die mitgelieferte CSV-Datei"""
+    return SOURCE
@@ -0,0 +1,51 @@
+"""
+Layouterkennung aus der Stichprobe (src.adapters)
+"""
+
+import pandas as pd
+import pytest
+
+from src.adapters import Sample, detect_sample
+from src.cube import KEY_COL, MigrationCube
+from src.schema import read_typed
+
+
+def _sample(*rows, delimiter=';'):
+    return Sample([KEY_COL, '100_spanien', '200_china'], [list(row) for row in rows], delimiter)
+
+
+def test_plain_numbers_without_thousands():
+    adapter, schema = detect_sample(_sample(['2020_ Zuzug', '12', '3,5'], ['2020_ Wegzug', '-', '7']))
+
+    assert adapter.name == 'aussenwanderung'
+    assert (schema.decimal, schema.thousands) == (',', None)
+
+
+def test_dot_groups_set_thousands(tmp_path):
+    _, schema = detect_sample(_sample(['2020_ Zuzug', '1.234', '5'], ['2020_ Wegzug', '12,5', '2.000,25']))
+    assert (schema.decimal, schema.thousands) == (',', '.')
+
+    path = tmp_path / 'tausender.csv'
+    path.write_text(f"{KEY_COL};100_spanien;200_china\n2020_ Zuzug;1.234;5\n2020_ Wegzug;12,5;2.000,25\n",
+                    encoding='utf-8')
+    assert read_typed(path, schema).values.tolist() == [[[1234.0, 5.0], [12.5, 2000.25]]]
+
+
+def test_dot_decimals_rejected_with_decimal_comma():
+    with pytest.raises(ValueError, match='Zahlen'):
+        detect_sample(_sample(['2020_ Zuzug', '1.5', '2.25'], ['2020_ Wegzug', '3,5', '1.75']))
+
+
+def test_comma_delimited_uses_decimal_point():
+    _, schema = detect_sample(_sample(['2020_ Zuzug', '1.5', '2'], ['2020_ Wegzug', '3', '1.234'], delimiter=','))
+    assert (schema.decimal, schema.thousands) == ('.', None)
+
+
+def test_frame_with_float_cells():
+    frame = pd.DataFrame({KEY_COL: ['2020_ Zuzug', '2020_ Wegzug'], '100_spanien': [0.2, 12.5],
+                          '200_china': ['1.234', '5']})
+
+    _, schema = detect_sample(Sample.from_frame(frame))
+
+    assert (schema.decimal, schema.thousands) == (',', '.')
+    assert MigrationCube.from_dataframe(frame, schema.builder()).values.tolist() == [[[0.2, 1234.0], [12.5, 5.0]]]
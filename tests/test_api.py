@@ -0,0 +1,54 @@
+"""
+JSON-Schnittstelle (src.api.respond ohne HTTP-Schicht)
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from src.api import respond
+from src.cube import KEY_COL, MigrationCube
+from src.visualizer import DataVisualizer
+
+
+class Store:
+    """Ersatz für DataStore mit festem Visualizer"""
+
+    def __init__(self, visualizer: DataVisualizer):
+        self.visualizer = visualizer
+
+    def current(self) -> DataVisualizer:
+        return self.visualizer
+
+
+@pytest.fixture
+def store(source) -> Store:
+    return Store(DataVisualizer(pd.read_csv(source, sep=';')))
+
+
+def test_etag_and_304(store):
+    status, headers, body = respond(store, '/api/totals')
+    assert status == 200 and json.loads(body)[0]['Jahr'] == 2010
+
+    status, _, body = respond(store, '/api/totals', headers['ETag'])
+    assert (status, body) == (304, b'')
+
+
+def test_unknown_path_never_304(store):
+    _, headers, _ = respond(store, '/api/totals')
+    etag = headers['ETag'].replace('api/totals', 'api/unbekannt')
+
+    for if_none_match in (None, etag, '*'):
+        status, headers, body = respond(store, '/api/unbekannt', if_none_match)
+        assert status == 404
+        assert 'ETag' not in headers
+        assert 'Unbekannter Pfad' in json.loads(body)['error']
+
+
+def test_range_on_empty_dataset_is_404():
+    cube = MigrationCube.from_dataframe(pd.DataFrame({KEY_COL: ['Kontinent'], '100_spanien': ['Europa']}))
+    assert cube.years == []
+    status, _, body = respond(Store(DataVisualizer.from_cube(cube)), '/api/range')
+    assert status == 404
+    assert json.loads(body)['error'] == "Keine Jahresdaten im Datensatz"
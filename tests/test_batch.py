@@ -0,0 +1,36 @@
+"""
+Stapelverarbeitung (src.batch): ein fehlerhafter Datensatz bleibt auf sich beschränkt
+"""
+
+import json
+import shutil
+
+from src.batch import discover, run_batch
+
+
+def test_failing_dataset_is_isolated_and_reported(source, tmp_path):
+    raw_dir = tmp_path / 'raw'
+    raw_dir.mkdir()
+    good = raw_dir / 'gut.csv'
+    shutil.copy(source, good)
+    # Gültiges Layout (wird nicht übersprungen), aber ein doppelter Schlüssel scheitert erst beim Parsen
+    lines = source.read_text(encoding='utf-8').splitlines()
+    bad = raw_dir / 'doppelt.csv'
+    bad.write_text('\n'.join(lines[:4] + [lines[2]]) + '\n', encoding='utf-8')
+    assert discover(raw_dir) == {bad: None, good: None}
+
+    output = tmp_path / 'output'
+    report = run_batch([bad, good], output, workers=2, top_n=5, processed_dir=None)
+
+    assert (report['ok'], report['failed']) == (1, 1)
+    failed, ok = report['datasets']
+    assert failed['dataset'] == 'doppelt' and failed['status'] == 'failed'
+    assert failed['error'].startswith('ValueError:') and '2023_ Zuzug' in failed['error']
+    assert 'Traceback' in failed['traceback']
+    assert not (output / 'doppelt').exists()
+
+    assert ok['dataset'] == 'gut' and ok['status'] == 'ok' and ok['files'] > 0
+    assert (output / 'gut' / 'index.html').exists()
+    insights = json.loads((output / 'gut' / 'insights.json').read_text(encoding='utf-8'))
+    assert insights
+    json.dumps(report)  # Bericht ist als batch_report.json schreibbar
@@ -0,0 +1,105 @@
+"""
+Prozessweiter LRU-Cache: Budget, Verdrängung, Zähler und gleichzeitige Berechnung
+"""
+
+import threading
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+from src.cache import FIGURE_BYTES, TRACE_BYTES, LRUCache, sizeof
+
+
+def test_lru_eviction_and_counters():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'a' zuletzt genutzt, 'b' wird verdrängt
+    cache.put('c', 3)
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.get('b') is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5 and stats['entries'] == 2
+
+
+def test_memory_budget():
+    array = np.zeros(100)  # 800 Bytes
+    cache = LRUCache(max_bytes=2000)
+    cache.put('a', array)
+    cache.put('b', array.copy())
+    assert cache.bytes == 1600
+    cache.put('c', array.copy())
+    assert 'a' not in cache and len(cache) == 2 and cache.bytes == 1600
+
+    cache.put('big', np.zeros(1000))
+    assert 'big' not in cache and cache.stats()['rejected'] == 1 and len(cache) == 2
+
+    cache.resize(max_bytes=1000)
+    assert len(cache) == 1 and cache.bytes == 800 and cache.stats()['evictions'] == 2
+
+
+def test_figure_size_from_trace_data():
+    x = np.arange(50, dtype=np.float64)
+    figure = go.Figure([go.Scatter(x=x, y=x), go.Bar(x=x, y=x)])
+    size = sizeof(figure)
+    assert size >= FIGURE_BYTES + 2 * TRACE_BYTES + 4 * x.nbytes
+    assert size < FIGURE_BYTES + 2 * TRACE_BYTES + 4 * (x.nbytes + 200)
+
+
+def _concurrent(cache: LRUCache, key: str, build, threads: int = 8) -> list:
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(cache.get_or_build(key, build))) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def test_get_or_build_builds_once():
+    cache = LRUCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    assert _concurrent(cache, 'key', build) == ['value'] * 8
+    assert len(calls) == 1 and cache.get('key') == 'value'
+    assert not cache._building
+
+
+def test_get_or_build_shares_entries_over_budget():
+    cache = LRUCache(max_bytes=100)
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return np.zeros(1000)
+
+    results = _concurrent(cache, 'key', build)
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert len(calls) == 1 and 'key' not in cache
+    assert not cache._building
+
+
+def test_get_or_build_retries_after_failure():
+    cache = LRUCache()
+    attempts = []
+
+    def build():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("erster Versuch schlägt fehl")
+        return 'value'
+
+    try:
+        cache.get_or_build('key', build)
+    except RuntimeError:
+        pass
+    assert cache.get_or_build('key', build) == 'value' and len(attempts) == 2
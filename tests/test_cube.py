@@ -0,0 +1,271 @@
+"""
+Regressionstests für Würfel, Rankings und Einlesen
+
+Die erwarteten Grafiken stammen aus der ursprünglichen zeilenweisen Implementierung
+(tests/data/baseline_figures.json, erzeugt auf der mitgelieferten CSV).
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cube import KEY_COL, MigrationCube
+from src.rankings import get_top_n, rank_countries, ranking_cache, top_k
+from src.schema import read_typed
+from src.visualizer import DataVisualizer
+
+BASELINE = Path(__file__).parent / 'data' / 'baseline_figures.json'
+
+
+@pytest.fixture
+def frame(source) -> pd.DataFrame:
+    return pd.read_csv(source, sep=';')
+
+
+@pytest.fixture
+def baseline() -> dict:
+    return json.loads(BASELINE.read_text(encoding='utf-8'))
+
+
+def _traces(figure):
+    return [(trace.name, list(map(str, trace.x)), [round(float(y), 6) for y in trace.y]) for trace in figure.data]
+
+
+def test_charts_match_baseline(frame, baseline):
+    visualizer = DataVisualizer(frame)
+    figures, years = visualizer.plot_migration_data()
+
+    assert years == baseline['years']
+    assert [_traces(figure) for figure in figures] == [[tuple(t) for t in fig] for fig in baseline['figs']]
+    for year in years:
+        top = [(list(map(str, f.data[0].y)), list(map(float, f.data[0].x))) if f else None
+               for f in visualizer.plot_top_countries_by_year(year)]
+        assert top == [tuple(entry) if entry else None for entry in baseline[str(year)]]
+
+
+def test_tables_match_baseline(frame, baseline):
+    visualizer = DataVisualizer(frame)
+    (zuzug, wegzug), (saldo,), _ = baseline['figs']
+
+    totals = visualizer.totals_table()
+    assert totals['Jahr'].tolist() == baseline['years']
+    assert totals['Zuzug'].tolist() == zuzug[2]
+    assert totals['Wegzug'].tolist() == wegzug[2]
+    assert totals['Saldo'].tolist() == saldo[2]
+
+    for year in baseline['years']:
+        for direction, (names, values) in zip(('Zuzug', 'Wegzug'), baseline[str(year)]):
+            table = visualizer.top_countries_table(year, direction)
+            assert table['Land'].tolist() == names
+            assert table[f"{direction} {year}"].tolist() == values
+
+
+def test_top_k_orders_ties_by_position():
+    score = np.array([3.0, 5.0, 3.0, 5.0, 1.0, 3.0])
+
+    assert top_k(score, 3).tolist() == [1, 3, 0]
+    assert top_k(score, 4).tolist() == [1, 3, 0, 2]
+    assert top_k(score, 10).tolist() == [1, 3, 0, 2, 5, 4]
+    assert top_k(score, 0).tolist() == []
+    rows = np.vstack([score, score[::-1]])
+    assert top_k(rows, 2).tolist() == [[1, 3], [2, 4]]
+    # Gleiches Ergebnis wie eine stabile Sortierung absteigend
+    random = np.random.default_rng(0).integers(0, 5, size=(50, 40)).astype(float)
+    expected = np.argsort(-random, axis=1, kind='stable')[:, :7]
+    assert (top_k(random, 7) == expected).all()
+
+
+def _rows(year: int, zuzug: dict, wegzug: dict) -> pd.DataFrame:
+    return pd.DataFrame([
+        {KEY_COL: f"{year}_ Zuzug", **zuzug},
+        {KEY_COL: f"{year}_ Wegzug", **wegzug},
+    ])
+
+
+def test_append_rows_adds_year(frame):
+    cube = MigrationCube.from_dataframe(frame)
+    cube.totals(), cube.max_abs_saldo()
+    column = cube.countries[5]
+
+    assert cube.append_rows(_rows(2024, {column: 900}, {column: 100})) == [2024]
+    rebuilt = MigrationCube.from_dataframe(pd.concat([frame, _rows(2024, {column: 900}, {column: 100})]))
+
+    assert cube.years == rebuilt.years
+    np.testing.assert_array_equal(cube.values, rebuilt.values)
+    np.testing.assert_array_equal(cube.totals(), np.nansum(rebuilt.values, axis=2))
+    np.testing.assert_array_equal(cube.max_abs_saldo(), rebuilt.max_abs_saldo())
+    assert cube.fingerprint == rebuilt.fingerprint
+    assert cube.index.positions == rebuilt.index.positions
+
+
+def test_append_rows_numbers_new_keys_consecutively(frame):
+    cube = MigrationCube.from_dataframe(frame)
+    column = cube.countries[5]
+    last = max(cube.index.positions.values())
+    replaced = cube.index.row(2015, 'Wegzug')
+
+    # Ersetzte Zeile zwischen neuen Zeilen: nur die neuen Schlüssel verbrauchen Zeilennummern
+    rows = pd.concat([_rows(2024, {column: 1}, {column: 2}).iloc[:1],
+                      _rows(2015, {}, {column: 3}).iloc[1:],
+                      _rows(2024, {column: 1}, {column: 2}).iloc[1:],
+                      _rows(2025, {column: 4}, {column: 5})])
+    assert cube.append_rows(rows, replace=True) == [2015, 2024, 2025]
+
+    assert cube.index.row(2015, 'Wegzug') == replaced
+    assert [cube.index.row(year, direction) for year, direction in
+            [(2024, 'Zuzug'), (2024, 'Wegzug'), (2025, 'Zuzug'), (2025, 'Wegzug')]] == [last + 1, last + 2, last + 3, last + 4]
+    assert len(set(cube.index.positions.values())) == len(cube.index.positions)
+
+
+def test_append_rows_replace(frame):
+    cube = MigrationCube.from_dataframe(frame)
+    column = cube.countries[5]
+    old_fingerprint = cube.year_fingerprint(2015)
+    other_fingerprint = cube.year_fingerprint(2016)
+    cube.max_abs_saldo()
+
+    with pytest.raises(ValueError, match='bereits vorhanden'):
+        cube.append_rows(_rows(2015, {column: 1}, {column: 1}))
+    with pytest.raises(ValueError, match='Unbekannte Spalten'):
+        cube.append_rows(_rows(2030, {'999_atlantis': 1}, {'999_atlantis': 1}))
+
+    assert cube.append_rows(_rows(2015, {column: 1}, {column: 1}), replace=True) == [2015]
+    row = cube.values[cube.year_position(2015)]
+    assert row[:, 5].tolist() == [1.0, 1.0]
+    # Nicht gelieferte Spalten des ersetzten Jahres sind danach fehlend
+    assert np.isnan(np.delete(row, 5, axis=1)).all()
+    assert cube.year_fingerprint(2015) != old_fingerprint
+    assert cube.year_fingerprint(2016) == other_fingerprint
+    np.testing.assert_array_equal(cube.max_abs_saldo(), np.abs(cube.saldo()).max(axis=0))
+
+
+def test_quality_report_counts(tmp_path, source):
+    path = tmp_path / 'klein.csv'
+    path.write_text(
+        f"{KEY_COL};100_spanien;200_china;quelle\n"
+        "Kontinent;Europa;Asien;\n"
+        "2020_ Zuzug;1;-;Amt\n"
+        "Summe;5;6;\n"
+        "2020_ Wegzug;x;3,5;Amt\n",
+        encoding='utf-8',
+    )
+    cube = read_typed(path)
+
+    assert cube.quality.summary() == {'data_rows': 2, 'metadata_rows': 1, 'ignored_rows': 1, 'coerced': 1, 'rejected': 1}
+    assert cube.quality.to_frame().iloc[0][['Spalte', 'Werte', 'Fehlend', 'Abgelehnt']].tolist() == ['100_spanien', 1, 0, 1]
+    np.testing.assert_array_equal(cube.values, [[[1.0, np.nan], [np.nan, 3.5]]])
+    # Blockweise (Zeile 'Summe' zwischen den Datenzeilen in einem eigenen Block) gleiches Ergebnis
+    chunked = read_typed(path, chunksize=1)
+    assert chunked.quality.summary() == cube.quality.summary()
+    assert chunked.continents == cube.continents == ['Europa', 'Asien']
+    np.testing.assert_array_equal(chunked.values, cube.values)
+
+    shipped = read_typed(source).quality.summary()
+    assert shipped == {'data_rows': 28, 'metadata_rows': 1, 'ignored_rows': 0, 'coerced': 5, 'rejected': 0}
+
+
+def test_append_rows_uses_layout_of_cube():
+    frame = pd.DataFrame({'Jahr_Richtung': ['2020 Zuzüge', '2020 Fortzüge'], 'a': ['1.234', '2'], 'b': ['3', '4']})
+    visualizer = DataVisualizer(frame)
+    assert visualizer.cube.values[0, 0].tolist() == [1234.0, 3.0]
+
+    new = pd.DataFrame({'Jahr_Richtung': ['2021 Zuzüge', '2021 Fortzüge'], 'a': ['2.000', '5'], 'b': ['6', '7']})
+    assert visualizer.append_years(new) == [2021]
+    assert visualizer.cube.values[1].tolist() == [[2000.0, 6.0], [5.0, 7.0]]
+
+
+def test_append_years_refreshes_all_cached_rankings(frame):
+    visualizer = DataVisualizer(frame)
+    cube = visualizer.cube
+    column = cube.countries[5]
+    continent = cube.continent_names()[0]
+    for top_n, region in ((10, None), (3, None), (5, continent)):
+        visualizer.top_countries_table(2015, 'Zuzug', top_n, continent=region)
+    before = cube.year_fingerprint(2015)
+
+    visualizer.append_years(_rows(2015, {column: 99999}, {column: 0}), replace=True)
+
+    after = cube.year_fingerprint(2015)
+    assert after != before
+    for top_n, region in ((10, None), (3, None), (5, continent)):
+        assert all((before, 2015, d, top_n, region) not in ranking_cache for d in ('Zuzug', 'Wegzug', 'Saldo'))
+        assert (after, 2015, 'Zuzug', top_n, region) in ranking_cache
+    assert get_top_n(cube, 2015, 'Zuzug', 3)[0] == (5, 99999.0)
+
+
+@pytest.fixture
+def continents_frame() -> pd.DataFrame:
+    """Zwei Jahre, drei Länder auf zwei Kontinenten und eine Sammelspalte ohne Kontinent"""
+    return pd.DataFrame([
+        ['Kontinent', 'Europa', 'Asien', 'Europa', '.'],
+        ['2020_ Zuzug', '1', '2', '3', '4'],
+        ['2020_ Wegzug', '5', '-', '7', '8'],
+        ['2021_ Zuzug', '10', '20', '30', '40'],
+        ['2021_ Wegzug', '1', '2', '-', '4'],
+    ], columns=[KEY_COL, '100_a', '200_b', '300_c', 'sonstige_staaten'])
+
+
+def test_continent_totals_match_hand_grouping(continents_frame):
+    cube = MigrationCube.from_dataframe(continents_frame)
+
+    assert cube.continent_names() == ['Europa', 'Asien']
+    assert cube.continent_codes().tolist() == [0, 1, 0, -1]
+    # (Jahr, Richtung, Kontinent): Europa = 100_a + 300_c, Asien = 200_b, fehlende Werte als 0
+    assert cube.continent_totals().tolist() == [[[4.0, 2.0], [12.0, 0.0]], [[40.0, 20.0], [1.0, 2.0]]]
+    assert cube.continent_saldo().tolist() == [[-8.0, 2.0], [39.0, 18.0]]
+
+    table = DataVisualizer.from_cube(cube).continent_table()
+    assert table[['Jahr', 'Kontinent', 'Saldo']].values.tolist() == [
+        [2020, 'Europa', -8.0], [2020, 'Asien', 2.0], [2021, 'Europa', 39.0], [2021, 'Asien', 18.0]
+    ]
+
+    # Nach append_rows nur das neue Jahr ergänzt, die übrigen unverändert
+    cube.append_rows(_rows(2022, {'100_a': 1, '200_b': 2, 'sonstige_staaten': 9}, {'300_c': 3}))
+    assert cube.continent_totals()[2].tolist() == [[1.0, 2.0], [3.0, 0.0]]
+    assert cube.continent_saldo()[:2].tolist() == [[-8.0, 2.0], [39.0, 18.0]]
+
+
+@pytest.mark.parametrize('criterion, expected', [
+    # Saldo je Jahr: a 8/-19, b -8/30, c 0/-1; Sammelspalte nie im Ranking
+    ('max_abs_saldo', [(1, 30.0), (0, 19.0), (2, 1.0)]),
+    # Kumulierter Saldo nach Betrag, angezeigt mit Vorzeichen
+    ('cumulative_saldo', [(1, 22.0), (0, -11.0), (2, -1.0)]),
+    ('total_volume', [(1, 38.0), (0, 33.0), (2, 11.0)]),
+])
+def test_rank_countries_criteria(criterion, expected):
+    cube = MigrationCube.from_dataframe(pd.DataFrame([
+        ['Kontinent', 'Europa', 'Asien', 'Europa', '.'],
+        ['2020_ Zuzug', '10', '0', '5', '100'],
+        ['2020_ Wegzug', '2', '8', '5', '0'],
+        ['2021_ Zuzug', '1', '30', '-', '500'],
+        ['2021_ Wegzug', '20', '0', '1', '0'],
+    ], columns=[KEY_COL, '100_a', '200_b', '300_c', 'sonstige_staaten']))
+
+    assert rank_countries(cube, 5, criterion) == expected
+    assert rank_countries(cube, 2, criterion) == expected[:2]
+    assert rank_countries(cube, 5, criterion, continent='Europa') == [entry for entry in expected if entry[0] != 1]
+    with pytest.raises(ValueError, match='Unbekanntes Ranking-Kriterium'):
+        rank_countries(cube, 5, 'beliebig')
+
+
+def test_country_table_dimension(continents_frame):
+    table = MigrationCube.from_dataframe(continents_frame).country_table
+
+    assert len(table) == 4
+    assert table.codes.tolist() == [100, 200, 300, -1]
+    assert table.aggregate.tolist() == [False, False, False, True]
+    assert [table.id(column) for column in ['100_a', '300', 'sonstige_staaten']] == [0, 2, 3]
+    with pytest.raises(KeyError):
+        table.id('999')
+    assert [table.continent(country) for country in range(4)] == ['Europa', 'Asien', 'Europa', '']
+
+    frame = table.to_frame()
+    assert list(frame.columns) == ['ID', 'Code', 'Spalte', 'Name', 'Kontinent']
+    assert frame['ID'].tolist() == [0, 1, 2, 3]
+    assert frame['Code'].isna().tolist() == [False, False, False, True]
+    assert frame['Code'].iloc[:3].tolist() == [100, 200, 300]
+    assert frame['Name'].tolist() == ['A', 'B', 'C', 'Sonstige Staaten']
+    assert frame['Kontinent'].tolist() == ['Europa', 'Asien', 'Europa', '']
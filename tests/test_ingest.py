@@ -0,0 +1,176 @@
+"""
+Abgleich mit einem lokalen Ersatz-Server für das CKAN-Portal (package_list, package_show,
+eine Ressource mit ETag), mit beiden HTTP-Clients (aiohttp und urllib)
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import ingest
+
+DATASET = 'aussenwanderung'
+RESOURCE_PATH = '/files/aussenwanderung.csv'
+
+
+class StandIn:
+    """
+    CKAN-Ersatz: ein Datensatz mit einer CSV-Ressource
+
+    content und etag lassen sich im Test ändern; requests zählt die Abrufe der Ressource
+    mit ihrem If-None-Match-Header.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.etag = self.etag_for(content)
+        self.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def etag_for(content: bytes) -> str:
+        return f'"{hashlib.sha1(content).hexdigest()[:16]}"'
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b'', headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith('/api/3/action/package_list'):
+                    return self._send(200, json.dumps({'success': True, 'result': [DATASET]}).encode())
+                if self.path.startswith('/api/3/action/package_show'):
+                    resources = [{'url': stand_in.base_url + RESOURCE_PATH, 'format': 'CSV'}]
+                    return self._send(200, json.dumps({'success': True, 'result': {'resources': resources}}).encode())
+                if self.path == RESOURCE_PATH:
+                    condition = self.headers.get('If-None-Match')
+                    stand_in.requests.append(condition)
+                    if condition == stand_in.etag:
+                        return self._send(304, headers={'ETag': stand_in.etag})
+                    return self._send(200, stand_in.content, {'ETag': stand_in.etag})
+                self._send(404)
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+HAS_AIOHTTP = importlib.util.find_spec('aiohttp') is not None
+
+
+@pytest.fixture(params=[
+    pytest.param('aiohttp', marks=pytest.mark.skipif(not HAS_AIOHTTP, reason="aiohttp nicht installiert")),
+    'urllib',
+])
+def client(request, monkeypatch) -> str:
+    """Erzwingt den HTTP-Client, den sync() über ingest._client wählt"""
+    if request.param == 'aiohttp':
+        monkeypatch.setattr(ingest, '_client', ingest._AiohttpClient)
+    else:
+        monkeypatch.setattr(ingest, '_client', lambda concurrency: ingest._UrllibClient())
+    return request.param
+
+
+@pytest.fixture
+def stand_in(source, client):
+    server = StandIn(source.read_bytes())
+    yield server
+    server.close()
+
+
+def _sync(stand_in, raw_dir, datasets=None):
+    return asyncio.run(ingest.sync(datasets, stand_in.base_url, raw_dir, concurrency=2))
+
+
+def test_200_writes_file_and_manifest(stand_in, tmp_path, source):
+    changed = _sync(stand_in, tmp_path)
+
+    target = tmp_path / 'aussenwanderung.csv'
+    assert changed == [target]
+    assert target.read_bytes() == source.read_bytes()
+    entry = json.loads((tmp_path / ingest.MANIFEST_NAME).read_text(encoding='utf-8'))[stand_in.base_url + RESOURCE_PATH]
+    assert entry['etag'] == stand_in.etag
+    assert entry['sha256'] == hashlib.sha256(source.read_bytes()).hexdigest()
+    assert stand_in.requests == [None]
+    assert not list(tmp_path.glob('*.download'))
+
+
+def test_304_leaves_file_alone(stand_in, tmp_path):
+    _sync(stand_in, tmp_path, [DATASET])
+    target = tmp_path / 'aussenwanderung.csv'
+    mtime = target.stat().st_mtime_ns
+
+    assert _sync(stand_in, tmp_path, [DATASET]) == []
+    assert stand_in.requests == [None, stand_in.etag]
+    assert target.stat().st_mtime_ns == mtime
+
+
+def test_unchanged_sha256_skips_rebuild(stand_in, tmp_path, monkeypatch):
+    rebuilt = []
+    monkeypatch.setattr(ingest, 'rebuild', lambda paths: rebuilt.append(paths) or paths)
+
+    assert ingest.refresh([DATASET], stand_in.base_url, tmp_path, concurrency=2) == [tmp_path / 'aussenwanderung.csv']
+    assert len(rebuilt) == 1
+
+    # Neues ETag, gleicher Inhalt: 200, aber der Hash stimmt mit dem Manifest überein
+    stand_in.etag = '"neu"'
+    assert ingest.refresh([DATASET], stand_in.base_url, tmp_path, concurrency=2) == []
+    assert len(rebuilt) == 1
+    assert stand_in.requests[-1] != stand_in.etag
+    assert not list(tmp_path.glob('*.download'))
+
+
+def test_changed_content_is_replaced(stand_in, tmp_path):
+    _sync(stand_in, tmp_path)
+    stand_in.content = stand_in.content.replace(b'2023_ Zuzug;1737', b'2023_ Zuzug;1738')
+    stand_in.etag = stand_in.etag_for(stand_in.content)
+
+    assert _sync(stand_in, tmp_path) == [tmp_path / 'aussenwanderung.csv']
+    assert b'2023_ Zuzug;1738' in (tmp_path / 'aussenwanderung.csv').read_bytes()
+
+
+def test_failed_hash_removes_download(stand_in, tmp_path, monkeypatch):
+    def broken(path):
+        raise OSError("Lesefehler")
+    monkeypatch.setattr(ingest, '_sha256', broken)
+
+    assert _sync(stand_in, tmp_path) == []
+    assert not list(tmp_path.glob('*.download'))
+    assert not (tmp_path / 'aussenwanderung.csv').exists()
+
+
+def test_rebuild_continues_after_oserror(tmp_path, source, monkeypatch):
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    for path in (first, second):
+        path.write_bytes(source.read_bytes())
+    published = []
+
+    def publish(path):
+        if path == first:
+            raise OSError("kein Platz")
+        published.append(path)
+    monkeypatch.setattr('src.shared.publish', publish)
+
+    assert ingest.rebuild([first, second]) == [second]
+    assert published == [second]
@@ -0,0 +1,22 @@
+"""
+Automatisch berechnete Erkenntnisse (src.insights)
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.cube import KEY_COL, MigrationCube
+from src.insights import build_insights
+
+
+def test_only_aggregate_columns_omit_country_trends():
+    years = range(2010, 2020)
+    rows = [{KEY_COL: f"{year}_ {direction}", 'sonstige_staaten': value, 'unbekannt_ohne_angaben': 2 * value}
+            for year, value in zip(years, np.arange(10.0)) for direction in ('Zuzug', 'Wegzug')]
+    cube = MigrationCube.from_dataframe(pd.DataFrame(rows))
+    assert not cube.country_mask().any()
+
+    insights = build_insights(cube, cube.country_table.names)
+
+    trends = [insight for insight in insights if insight['Art'] == 'trend']
+    assert trends and all(insight['Land'] is None for insight in trends)
@@ -0,0 +1,88 @@
+"""
+Laufzeitmessung (src.instrumentation): Inhalt der Ereignisse, Sammeln je Thread und Hooks
+"""
+
+import threading
+
+import pandas as pd
+import pytest
+
+from src.cube import coerce_numeric
+from src.instrumentation import add_hook, collect, remove_hook, span
+
+
+@pytest.fixture
+def received():
+    events = []
+    add_hook(events.append)
+    yield events
+    remove_hook(events.append)
+
+
+def test_span_event_contents(received):
+    with collect() as events:
+        with span('stufe', cells=10) as event:
+            event['failed'] = 2
+    assert received == events == [event]
+    assert set(event) == {'span', 'cells', 'failed', 'duration_ms'}
+    assert (event['span'], event['cells'], event['failed']) == ('stufe', 10, 2)
+    assert event['duration_ms'] >= 0
+
+
+def test_span_emits_on_exception(received):
+    with pytest.raises(RuntimeError):
+        with span('fehler'):
+            raise RuntimeError("im Block")
+    assert [event['span'] for event in received] == ['fehler'] and 'duration_ms' in received[0]
+
+
+def test_collect_is_nested_and_per_thread():
+    with collect() as outer:
+        with span('aussen'):
+            with collect() as inner:
+                with span('innen'):
+                    pass
+        worker_events = []
+
+        def worker():
+            with collect() as events:
+                with span('anderer_thread'):
+                    pass
+            worker_events.extend(events)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    # Spans werden beim Verlassen gemeldet: 'innen' vor 'aussen'
+    assert [event['span'] for event in outer] == ['innen', 'aussen']
+    assert [event['span'] for event in inner] == ['innen']
+    assert [event['span'] for event in worker_events] == ['anderer_thread']
+    with span('nach_collect'):
+        pass
+    assert len(outer) == 2
+
+
+def test_hooks_registered_once_and_failures_isolated(received):
+    add_hook(received.append)  # zweite Registrierung wird ignoriert
+
+    def broken(event):
+        raise ValueError("kaputter Hook")
+
+    add_hook(broken)
+    try:
+        with span('stufe'):
+            pass
+    finally:
+        remove_hook(broken)
+    assert [event['span'] for event in received] == ['stufe']
+
+    remove_hook(received.append)
+    with span('ohne_hook'):
+        pass
+    assert len(received) == 1
+
+
+def test_stage_counters(received):
+    coerce_numeric(pd.DataFrame({'a': ['1.234', '-', 'x'], 'b': ['5', '', '6']}), thousands='.')
+    event, = [event for event in received if event['span'] == 'numeric_coercion']
+    assert (event['cells'], event['missing'], event['failed']) == (6, 2, 1)
@@ -0,0 +1,60 @@
+"""
+Präfixsummen-Index für Jahresbereiche (src.ranges)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cube import KEY_COL, MigrationCube
+from src.ranges import RangeIndex
+
+
+@pytest.fixture
+def cube() -> MigrationCube:
+    """Jahre 2019, 2021 und 2022 (2020 fehlt), zwei Länder, ein fehlender Wert"""
+    return MigrationCube.from_dataframe(pd.DataFrame([
+        ['2019_ Zuzug', '1', '2'],
+        ['2019_ Wegzug', '3', '4'],
+        ['2021_ Zuzug', '10', '-'],
+        ['2021_ Wegzug', '30', '40'],
+        ['2022_ Zuzug', '100', '200'],
+        ['2022_ Wegzug', '300', '400'],
+    ], columns=[KEY_COL, '100_a', '200_b']))
+
+
+def _expected(cube: MigrationCube, years) -> np.ndarray:
+    positions = [cube.year_position(year) for year in years]
+    return np.nansum(cube.values[positions], axis=0)
+
+
+@pytest.mark.parametrize('year_from, year_to, years', [
+    (2019, 2022, [2019, 2021, 2022]),   # alle Jahre
+    (2021, 2022, [2021, 2022]),         # Teilbereich
+    (2020, 2021, [2021]),               # beginnt im fehlenden Jahr
+    (2000, 2019, [2019]),               # beginnt vor dem ersten Jahr
+])
+def test_sums_match_direct_sum(cube, year_from, year_to, years):
+    index = RangeIndex(cube)
+    expected = _expected(cube, years)
+
+    assert index.n_years(year_from, year_to) == len(years)
+    np.testing.assert_array_equal(index.sum(year_from, year_to), expected)
+    np.testing.assert_array_equal(index.totals(year_from, year_to), expected.sum(axis=1))
+    np.testing.assert_array_equal(index.saldo(year_from, year_to), expected[0] - expected[1])
+    np.testing.assert_array_equal(index.mean(year_from, year_to), expected / len(years))
+
+
+@pytest.mark.parametrize('year_from, year_to', [(2020, 2020), (2023, 2030), (1990, 2000)])
+def test_ranges_without_years(cube, year_from, year_to):
+    index = RangeIndex(cube)
+
+    assert index.n_years(year_from, year_to) == 0
+    assert index.sum(year_from, year_to).tolist() == [[0.0, 0.0], [0.0, 0.0]]
+    assert index.totals(year_from, year_to).tolist() == [0.0, 0.0]
+    assert np.isnan(index.mean(year_from, year_to)).all()
+
+
+def test_reversed_range_raises(cube):
+    with pytest.raises(ValueError, match='Ungültiger Zeitraum'):
+        RangeIndex(cube).sum(2022, 2019)
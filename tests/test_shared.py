@@ -0,0 +1,65 @@
+"""
+Geteilte Segmente (src.shared)
+"""
+
+import os
+import shutil
+import stat
+
+import numpy as np
+import pytest
+
+from src.insights import build_insights
+from src.shared import SharedDataset, attach, pointer_path, publish, segment_name
+from src.storage import UMASK, load_cube
+
+
+def test_start_republishes_changed_source(tmp_path, source):
+    raw = tmp_path / source.name
+    shutil.copy(source, raw)
+    processed = tmp_path / 'processed'
+    first = SharedDataset(raw, processed)
+    assert first.segment == segment_name(raw)
+
+    # Quelle geändert, ohne publish: der Zeiger zeigt noch auf das alte Segment
+    raw.write_bytes(raw.read_bytes().replace(b'2023_ Zuzug;', b'2023_ Zuzug; ', 1))
+    assert pointer_path(raw, processed).read_text(encoding='utf-8') == first.segment
+
+    second = SharedDataset(raw, processed)
+    assert second.segment == segment_name(raw) != first.segment
+    assert pointer_path(raw, processed).read_text(encoding='utf-8') == second.segment
+
+
+def test_publish_keeps_segments_of_other_sources(tmp_path, source):
+    processed = tmp_path / 'processed'
+    raw, other = tmp_path / 'daten.csv', tmp_path / 'daten.2023.csv'
+    shutil.copy(source, raw)
+    shutil.copy(source, other)
+    other_segment = publish(other, processed)
+
+    segments = []
+    for extra in (b'', b' ', b'  '):
+        raw.write_bytes(source.read_bytes().replace(b'2023_ Zuzug;', b'2023_ Zuzug;' + extra, 1))
+        segments.append(publish(raw, processed))
+
+    # Vorgänger bleibt, ältere Segmente derselben Quelle werden entfernt, andere Quellen nicht
+    assert [segment.exists() for segment in segments] == [False, True, True]
+    assert other_segment.exists()
+
+
+def test_attached_segment_serves_precomputed_insights(tmp_path, source):
+    segment = publish(source, tmp_path)
+    cube = attach(segment)
+    assert isinstance(cube.values, np.memmap)
+
+    expected = build_insights(load_cube(source, None), cube.country_table.names)
+    assert cube.insights == expected
+    assert SharedDataset(source, tmp_path).current().insights() == expected
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="Dateirechte nur unter POSIX")
+def test_segment_and_pointer_readable_by_other_users(tmp_path, source):
+    segment = publish(source, tmp_path)
+    assert stat.S_IMODE(segment.stat().st_mode) == 0o755 & ~UMASK
+    assert stat.S_IMODE(pointer_path(source, tmp_path).stat().st_mode) == 0o644 & ~UMASK
+    assert all(stat.S_IMODE(path.stat().st_mode) & 0o044 == 0o044 & ~UMASK for path in segment.iterdir())
@@ -0,0 +1,39 @@
+"""
+Cache der geparsten Datensätze (src.storage)
+"""
+
+import os
+import shutil
+import stat
+
+import pytest
+
+from src.storage import UMASK, cache_path, load_cube
+
+
+def test_remove_stale_keeps_other_sources(tmp_path, source):
+    raw = tmp_path / 'daten.csv'
+    shutil.copy(source, raw)
+    processed = tmp_path / 'processed'
+    processed.mkdir()
+    stale = processed / 'daten.0123456789abcdef.v1.npz'
+    others = [
+        processed / 'daten.2023.0123456789abcdef.v1.npz',   # Quelle 'daten.2023.csv'
+        processed / 'daten.extra.npz',
+        processed / 'daten.0123456789abcdef.v1.npz.bak',
+    ]
+    for path in [stale] + others:
+        path.write_bytes(b'')
+
+    load_cube(raw, processed)
+
+    assert cache_path(raw, processed).exists()
+    assert not stale.exists()
+    assert all(path.exists() for path in others)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="Dateirechte nur unter POSIX")
+def test_cache_file_readable_by_other_users(tmp_path, source):
+    load_cube(source, tmp_path)
+    mode = stat.S_IMODE(cache_path(source, tmp_path).stat().st_mode)
+    assert mode == 0o644 & ~UMASK
@@ -0,0 +1,57 @@
+"""
+Tests für das chunkweise Einlesen: gleicher Würfel, gleiche Summen und Rankings wie beim vollständigen Lesen
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.generate import generate_csv
+from src.cache import LRUCache
+from src.rankings import RANKING_CRITERIA, compute_rankings, get_top_n, rank_countries
+from src.schema import read_typed
+from src.storage import load_cube
+from src.streaming import measure, read_cube_chunked
+
+
+@pytest.fixture
+def synthetic(tmp_path):
+    return generate_csv(tmp_path / 'synthetic.csv', n_countries=40, n_years=9, missing_rate=0.1)
+
+
+@pytest.mark.parametrize('chunksize', [1, 3, 7, 1000])
+def test_chunked_matches_full_read(synthetic, chunksize):
+    full = read_typed(synthetic)
+    cache = LRUCache()
+    streamed = read_cube_chunked(synthetic, chunksize, cache=cache)
+
+    assert streamed.years == full.years
+    assert streamed.countries == full.countries and streamed.continents == full.continents
+    assert streamed.index.positions == full.index.positions
+    np.testing.assert_array_equal(streamed.values, full.values)
+    np.testing.assert_array_equal(streamed.totals(), full.totals())
+    for direction in ('Zuzug', 'Wegzug'):
+        np.testing.assert_array_equal(streamed.column_sums(direction), full.column_sums(direction))
+    np.testing.assert_array_equal(streamed.max_abs_saldo(), full.max_abs_saldo())
+    for criterion in RANKING_CRITERIA:
+        assert rank_countries(streamed, 5, criterion) == rank_countries(full, 5, criterion)
+
+    # Die beim Lesen berechneten Rankings liegen im Cache und stimmen mit der Neuberechnung überein
+    expected = compute_rankings(full)
+    assert len(cache) == len(expected)
+    for (year, direction), ranking in expected.items():
+        assert get_top_n(streamed, year, direction, cache=cache) == ranking
+    assert cache.misses == 0
+    assert streamed.quality.summary() == full.quality.summary()
+
+
+def test_load_cube_streams_large_files(synthetic, monkeypatch):
+    monkeypatch.setattr('src.storage.STREAMING_MIN_MB', 0)
+    monkeypatch.setattr('src.storage.DEFAULT_CHUNKSIZE', 4)
+    streamed = load_cube(synthetic, processed_dir=None)
+    np.testing.assert_array_equal(streamed.values, read_typed(synthetic).values)
+
+
+def test_measure_reports_memory_of_the_read(synthetic):
+    result = measure(synthetic, chunksize=4)
+    assert result['years'] == 9 and result['columns'] == 42
+    assert result['peak_traced_mb'] >= result['cube_mb']
@@ -0,0 +1,18 @@
+"""
+Grafiken und Tabellen des DataVisualizer
+"""
+
+import pandas as pd
+
+from src.cube import KEY_COL
+from src.visualizer import DataVisualizer
+
+
+def test_saldo_labels_sign_only_positive():
+    rows = []
+    for year, (zuzug, wegzug) in zip(range(2020, 2024), [(5, 5), (7, 3), (2, 9), ('-', '-')]):
+        rows += [{KEY_COL: f"{year}_ Zuzug", '100_spanien': zuzug}, {KEY_COL: f"{year}_ Wegzug", '100_spanien': wegzug}]
+
+    trace = DataVisualizer(pd.DataFrame(rows)).plot_saldo().data[0]
+
+    assert list(trace.text) == ['0', '+4', '-7', '0']